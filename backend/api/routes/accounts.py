@@ -499,7 +499,7 @@ async def check_accounts_status(
                 seen.add(normalized)
                 names.append(normalized)
         else:
-            names = [item.get("name", "") for item in service.list_accounts()]
+            names = [item.get("name", "") for item in await service.async_list_accounts()]
             names = [n for n in names if n]
 
         timeout_seconds = max(1.0, min(float(request.timeout_seconds or 8.0), 20.0))
@@ -679,7 +679,7 @@ async def update_account(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     service = get_telegram_service()
-    accounts = service.list_accounts(force_refresh=True)
+    accounts = await service.async_list_accounts(force_refresh=True)
     current_account = next(
         (
             acc
@@ -731,7 +731,7 @@ async def update_account(
         updated = next(
             (
                 acc
-                for acc in service.list_accounts(force_refresh=True)
+                for acc in await service.async_list_accounts(force_refresh=True)
                 if acc.get("name") == target_account_name
             ),
             None,
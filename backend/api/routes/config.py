@@ -20,7 +20,7 @@ def _clear_sign_task_cache() -> None:
     try:
         from backend.services.sign_tasks import get_sign_task_service
 
-        get_sign_task_service()._tasks_cache = None
+        get_sign_task_service()._invalidate_tasks_cache()
     except Exception:
         # Best-effort cache invalidation; import should still succeed.
         pass
@@ -348,6 +348,76 @@ async def test_ai_connection(current_user: User = Depends(get_current_user)):
         return AITestResponse(success=False, message=f"AI test failed: {str(e)}")
 
 
+@router.get("/ai/metrics")
+def get_ai_metrics(current_user: User = Depends(get_current_user)):
+    """AI 调用的分模型耗时统计与答案缓存命中情况"""
+    from backend.core.config import get_settings
+    from tg_signer.ai_cache import get_ai_answer_cache
+    from tg_signer.ai_gateway import get_ai_gateway
+
+    gateway = get_ai_gateway()
+    return {
+        "max_concurrency": gateway.max_concurrency,
+        "request_timeout": gateway.request_timeout,
+        "hedge_after_seconds": gateway.hedge_after,
+        "models": gateway.metrics(),
+        "cache": get_ai_answer_cache(get_settings().resolve_workdir()).stats(),
+    }
+
+
+@router.get("/notifications/metrics")
+def get_notification_metrics(current_user: User = Depends(get_current_user)):
+    """通知发件箱的积压数量、投递耗时、重试/限流与失败汇总统计"""
+    from backend.services.failure_digest import get_failure_digest
+    from backend.services.notification_outbox import get_notification_outbox
+
+    metrics = get_notification_outbox().metrics()
+    metrics["failure_digest"] = get_failure_digest().stats()
+    return metrics
+
+
+@router.get("/memory/metrics")
+def get_memory_metrics(current_user: User = Depends(get_current_user)):
+    """内存回收统计：RSS、回收次数、gc 暂停耗时与归还的字节数"""
+    from backend.utils.memory import get_memory_trimmer
+
+    return get_memory_trimmer().stats()
+
+
+@router.get("/keyword-monitor/metrics")
+def get_keyword_monitor_metrics(current_user: User = Depends(get_current_user)):
+    """关键词监听各账号收到/分发/丢弃的更新数"""
+    from backend.services.keyword_monitor import get_keyword_monitor_service
+
+    return {"accounts": get_keyword_monitor_service().update_metrics()}
+
+
+@router.get("/avatars/metrics")
+def get_avatar_metrics(current_user: User = Depends(get_current_user)):
+    """头像缓存命中、合并请求与下载统计"""
+    from backend.services.avatars import get_avatar_service
+
+    return get_avatar_service().stats()
+
+
+@router.get("/media-sessions/metrics")
+def get_media_session_metrics(current_user: User = Depends(get_current_user)):
+    """媒体 DC 会话连接池：近一小时新建数、恢复/复用/过期次数"""
+    from tg_signer.media_sessions import get_media_session_pool
+
+    return get_media_session_pool().stats()
+
+
+@router.get("/loop/metrics")
+def get_loop_metrics(
+    top: int = 10, current_user: User = Depends(get_current_user)
+):
+    """事件循环延迟分位数，以及阻塞事件循环最久的调用位置"""
+    from backend.utils.loop_monitor import get_loop_monitor
+
+    return get_loop_monitor().report(top=max(1, min(top, 50)))
+
+
 @router.delete("/ai", response_model=AIConfigSaveResponse)
 def delete_ai_config(current_user: User = Depends(get_current_user)):
     try:
@@ -12,6 +12,8 @@ from fastapi import (
     Depends,
     HTTPException,
     Query,
+    Request,
+    Response,
     WebSocket,
     WebSocketDisconnect,
     status,
@@ -29,10 +31,14 @@ from sqlalchemy.orm import Session
 from backend.core.auth import get_current_user, verify_token
 from backend.core.database import get_db
 from backend.services.sign_tasks import get_sign_task_service
+from backend.utils.file_io import run_io
 from backend.utils.names import validate_storage_name
 
 router = APIRouter()
 
+# 头像变化不频繁，浏览器缓存一天，之后用 ETag 重新验证
+_AVATAR_CACHE_CONTROL = "private, max-age=86400"
+
 
 def _model_dump(model: BaseModel) -> Dict[str, Any]:
     dumper = getattr(model, "model_dump", None)
@@ -172,6 +178,18 @@ class RunTaskStatusResult(BaseModel):
     finished_at: Optional[str] = None
 
 
+class ChatLatencyStat(BaseModel):
+    chat_id: int
+    action_type: str
+    count: float
+    timeouts: float = 0.0
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+    max: float = 0.0
+    timeout: float
+
+
 class TaskHistoryItem(BaseModel):
     time: str
     success: bool
@@ -181,16 +199,17 @@ class TaskHistoryItem(BaseModel):
     flow_line_count: int = 0
     account_name: str = ""
     last_target_message: str = ""
+    fire_offset: Optional[float] = None
 
 
 @router.get("", response_model=List[SignTaskOut])
-def list_sign_tasks(
+async def list_sign_tasks(
     account_name: Optional[str] = None,
     aggregate: bool = Query(False),
     force_refresh: bool = Query(False),
     current_user=Depends(get_current_user),
 ):
-    return get_sign_task_service().list_tasks(
+    return await get_sign_task_service().async_list_tasks(
         account_name=account_name,
         aggregate=aggregate,
         force_refresh=force_refresh,
@@ -469,7 +488,7 @@ def get_sign_task_logs(
 
 
 @router.get("/{task_name}/history", response_model=List[TaskHistoryItem])
-def get_sign_task_history(
+async def get_sign_task_history(
     task_name: str,
     account_name: Optional[str] = None,
     limit: int = Query(20, ge=1, le=200),
@@ -478,7 +497,8 @@ def get_sign_task_history(
     try:
         # Treat empty string and wildcard as None (aggregate mode)
         effective_account = account_name if (account_name and account_name != "*") else None
-        task = get_sign_task_service().get_task(
+        task = await run_io(
+            get_sign_task_service().get_task,
             task_name,
             account_name=effective_account,
             aggregate=effective_account is None,
@@ -486,7 +506,7 @@ def get_sign_task_history(
         if not task:
             raise HTTPException(status_code=404, detail=f"任务 {task_name} 不存在")
 
-        return get_sign_task_service().get_task_history_logs(
+        return await get_sign_task_service().async_get_task_history_logs(
             task_name=task_name,
             account_name=effective_account,
             limit=limit,
@@ -503,15 +523,29 @@ def get_sign_task_history(
 @router.get("/chats/{account_name}", response_model=List[ChatOut])
 async def get_account_chats(
     account_name: str,
+    response: Response,
     force_refresh: bool = False,
+    wait: bool = False,
     current_user=Depends(get_current_user),
 ):
+    """
+    返回缓存的 Chat 列表，不等待 Telegram。
+
+    没有缓存或 force_refresh 时在后台刷新（同一账号合并为一次，让路给正在运行的任务），
+    刷新结果通过 /chats/{account_name}/ws 推送；X-Chats-Refreshing: 1 表示刷新进行中。
+    wait=true 保留旧的阻塞行为。
+    """
     try:
         account_name = validate_storage_name(account_name, field_name="account_name")
-        return await get_sign_task_service().get_account_chats(
+        service = get_sign_task_service()
+        chats = await service.get_account_chats(
             account_name,
             force_refresh=force_refresh,
+            wait=wait,
         )
+        if service.is_chat_refresh_pending(account_name):
+            response.headers["X-Chats-Refreshing"] = "1"
+        return chats
     except ValueError as e:
         detail = str(e)
         if (
@@ -528,6 +562,51 @@ async def get_account_chats(
         raise HTTPException(status_code=500, detail=f"获取对话列表失败: {str(e)}")
 
 
+@router.websocket("/chats/{account_name}/ws")
+async def account_chats_ws(
+    websocket: WebSocket,
+    account_name: str,
+    token: str = Query(...),
+    db: Session = Depends(get_db),
+):
+    """推送后台刷新完成的 Chat 列表：{"type": "chats", "data": [...]} 或 {"type": "error"}"""
+    try:
+        user = verify_token(token, db)
+        if not user:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        account_name = validate_storage_name(account_name, field_name="account_name")
+    except Exception:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+
+    service = get_sign_task_service()
+    queue = service.subscribe_chat_updates(account_name)
+    try:
+        await websocket.send_json(
+            {"type": "status", "refreshing": service.is_chat_refresh_pending(account_name)}
+        )
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=30)
+            except asyncio.TimeoutError:
+                await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_json(payload)
+    except WebSocketDisconnect:
+        pass
+    except Exception:
+        pass
+    finally:
+        service.unsubscribe_chat_updates(account_name, queue)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
 @router.get("/chats/{account_name}/search", response_model=ChatSearchResponse)
 def search_account_chats(
     account_name: str,
@@ -550,101 +629,58 @@ def search_account_chats(
         raise HTTPException(status_code=500, detail=f"搜索对话列表失败: {str(e)}")
 
 
+@router.get("/chats/{account_name}/latency", response_model=List[ChatLatencyStat])
+def get_account_chat_latency(
+    account_name: str,
+    chat_id: Optional[int] = None,
+    current_user=Depends(get_current_user),
+):
+    """各 Chat 的机器人响应耗时统计与自适应超时"""
+    try:
+        account_name = validate_storage_name(account_name, field_name="account_name")
+        return get_sign_task_service().get_chat_latency_stats(
+            account_name, chat_id=chat_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取响应耗时统计失败: {str(e)}")
+
+
 @router.get("/chats/{account_name}/avatar/{chat_id}")
 async def get_chat_avatar(
     account_name: str,
     chat_id: int,
+    request: Request,
     current_user=Depends(get_current_user),
 ):
-    """获取 Chat 对象的头像（带本地缓存）
+    """获取 Chat 对象的头像（内存 LRU + 本地缓存，带 ETag）
 
     Cache strategy: avatar is keyed by chat_id only since the same chat
     has the same avatar regardless of which account fetches it.
-    If the requested account can't find the chat, fall back to trying
-    other available accounts.
+    On a miss the download is queued once per chat_id; if the requested
+    account can't fetch it, a few accounts whose chat cache contains the
+    chat are tried instead.
     """
-    import time
-    from pathlib import Path
-
-    from fastapi.responses import FileResponse, Response
-
-    from backend.core.config import get_settings
+    from backend.services.avatars import get_avatar_service
 
     try:
         account_name = validate_storage_name(account_name, field_name="account_name")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    settings = get_settings()
-    avatar_cache_dir = settings.resolve_workdir() / "avatars" / "chats"
-    avatar_cache_dir.mkdir(parents=True, exist_ok=True)
-
-    # Use chat_id-based cache (avatar is global per chat, not per account)
-    cache_file = avatar_cache_dir / f"chat_{chat_id}.jpg"
-    no_avatar_marker = avatar_cache_dir / f"chat_{chat_id}.no_avatar"
-
-    # Legacy account-specific cache files (for backward compatibility)
-    legacy_cache_file = avatar_cache_dir / f"{account_name}_{chat_id}.jpg"
-
-    # If no-avatar marker is recent (7 days), return 404
-    if no_avatar_marker.exists():
-        age = time.time() - no_avatar_marker.stat().st_mtime
-        if age < 604800:
-            raise HTTPException(status_code=404, detail="No avatar available")
-        else:
-            no_avatar_marker.unlink(missing_ok=True)
-
-    # If chat-level cache exists and is fresh, use it
-    if cache_file.exists():
-        age = time.time() - cache_file.stat().st_mtime
-        if age < 604800:
-            return FileResponse(cache_file, media_type="image/jpeg")
-
-    # If legacy account-specific cache exists, migrate it to chat-level
-    if legacy_cache_file.exists():
-        age = time.time() - legacy_cache_file.stat().st_mtime
-        if age < 604800:
-            try:
-                import shutil
-                shutil.copy2(legacy_cache_file, cache_file)
-            except Exception:
-                pass
-            return FileResponse(cache_file, media_type="image/jpeg")
-
-    # Try to download avatar - first with the requested account, then fall back
-    from backend.services.telegram import get_telegram_service
-    from backend.utils.tg_session import list_account_names
-
-    telegram_service = get_telegram_service()
-    accounts_to_try = [account_name]
-    # Add other accounts as fallback
-    try:
-        all_accounts = list_account_names()
-        for acc in all_accounts:
-            if acc and acc != account_name and acc not in accounts_to_try:
-                accounts_to_try.append(acc)
-    except Exception:
-        pass
-
-    for try_account in accounts_to_try:
-        try:
-            avatar_bytes = await telegram_service.download_chat_avatar(
-                try_account, chat_id
-            )
-            if avatar_bytes:
-                cache_file.write_bytes(avatar_bytes)
-                no_avatar_marker.unlink(missing_ok=True)
-                return Response(content=avatar_bytes, media_type="image/jpeg")
-        except Exception:
-            continue
-
-    # No account could fetch the avatar - mark as no avatar
-    try:
-        no_avatar_marker.write_text("")
-    except Exception:
-        pass
+    avatar = await get_avatar_service().get_avatar(account_name, chat_id)
+    if avatar is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No avatar available",
+            headers={"Cache-Control": "private, max-age=300"},
+        )
 
-    raise HTTPException(status_code=404, detail="No avatar available")
+    headers = {"ETag": avatar.etag, "Cache-Control": _AVATAR_CACHE_CONTROL}
+    if avatar.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=avatar.data, media_type="image/jpeg", headers=headers)
 
 
 @router.websocket("/ws/{task_name}")
@@ -2,9 +2,9 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import importlib
 import logging
 import os
-import sqlite3
 from pathlib import Path
 from urllib.parse import urlsplit, urlunsplit
 
@@ -14,38 +14,22 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
-# Monkeypatch sqlite3.connect to increase default timeout
-_original_sqlite3_connect = sqlite3.connect
-
-
-def _patched_sqlite3_connect(*args, **kwargs):
-    # Force timeout to be at least 10 seconds, even if Pyrogram sets it to 1
-    if "timeout" in kwargs:
-        if kwargs["timeout"] < 10:
-            kwargs["timeout"] = 10
-    else:
-        kwargs["timeout"] = 30
-    return _original_sqlite3_connect(*args, **kwargs)
-
-
-sqlite3.connect = _patched_sqlite3_connect
-
-from backend.api import router as api_router  # noqa: E402
-from backend.core.config import get_settings  # noqa: E402
-from backend.core.database import (  # noqa: E402
+from backend.api import router as api_router
+from backend.core.config import get_settings
+from backend.core.database import (
     Base,
     get_engine,
     get_session_local,
     init_engine,
 )
-from backend.scheduler import (  # noqa: E402
+from backend.scheduler import (
     init_scheduler,
     shutdown_scheduler,
     sync_jobs,
 )
-from backend.services.users import ensure_admin  # noqa: E402
-from backend.utils.paths import ensure_data_dirs  # noqa: E402
-from tg_signer.async_utils import create_logged_task  # noqa: E402
+from backend.services.users import ensure_admin
+from backend.utils.paths import ensure_data_dirs
+from tg_signer.async_utils import create_logged_task
 
 
 # Silence /health check logs
@@ -178,22 +162,42 @@ async def on_startup() -> None:
     with get_session_local()() as db:
         ensure_admin(db)
     await init_scheduler(sync_on_startup=False)
+    from backend.services.notification_outbox import get_notification_outbox
+
+    get_notification_outbox().start()
+    from backend.utils.loop_monitor import get_loop_monitor
 
-    # Pre-export session strings from .session files to avoid SQLite locks during task execution
-    _pre_export_session_strings()
+    get_loop_monitor().start()
+
+    _cleanup_wildcard_task_dir()
 
     async def _post_startup() -> None:
+        from backend.utils.file_io import run_io
+
+        logger = logging.getLogger("backend.startup")
         try:
             await sync_jobs()
+        except Exception as exc:
+            logger.error(f"Delayed scheduler sync failed: {exc}")
+        finally:
+            # 调度已就绪即可对外服务；关键词监听连接 Telegram 可能较慢，不阻塞就绪
+            app.state.ready = True
+
+        try:
+            # keyword_monitor 会加载 Pyrogram，放到 IO 线程中导入，避免阻塞事件循环
+            await run_io(importlib.import_module, "backend.services.keyword_monitor")
             from backend.services.keyword_monitor import get_keyword_monitor_service
 
             await get_keyword_monitor_service().restart_from_tasks()
         except Exception as exc:
-            logging.getLogger("backend.startup").error(
-                f"Delayed scheduler sync failed: {exc}"
-            )
-        finally:
-            app.state.ready = True
+            logger.error(f"Keyword monitor startup failed: {exc}")
+
+        # 在 IO 线程中预导出 session_string；任务首次使用时也会按需导出，
+        # 这里只是提前预热，不阻塞启动
+        try:
+            await run_io(_pre_export_session_strings)
+        except Exception as exc:
+            logger.warning(f"Session string pre-export failed: {exc}")
 
     app.state.startup_task = create_logged_task(
         _post_startup(),
@@ -202,17 +206,9 @@ async def on_startup() -> None:
     )
 
 
-def _pre_export_session_strings() -> None:
-    """Export session strings from all .session files at startup to enable in-memory mode."""
-    from backend.utils.tg_session import (
-        get_session_mode,
-        load_session_string_file,
-    )
-
-    session_dir = settings.resolve_session_dir()
+def _cleanup_wildcard_task_dir() -> None:
+    """Clean up any stray "*" directories (legacy bug from update_task wildcard handling)."""
     logger = logging.getLogger("backend.startup")
-
-    # Clean up any stray "*" directories (legacy bug from update_task wildcard handling)
     try:
         signs_dir = settings.resolve_workdir() / "signs"
         wildcard_dir = signs_dir / "*"
@@ -223,14 +219,25 @@ def _pre_export_session_strings() -> None:
     except Exception as exc:
         logger.warning(f"Failed to clean wildcard dir: {exc}")
 
+
+def _pre_export_session_strings() -> None:
+    """Warm .session_string caches from .session files in the background (runs in a worker thread)."""
+    from backend.utils.tg_session import (
+        get_session_mode,
+        list_session_accounts,
+        load_session_string_file,
+    )
+
     # Only needed in file mode - string mode already has session strings
     if get_session_mode() == "string":
         return
 
-    # Export for all accounts that have .session files
+    session_dir = settings.resolve_session_dir()
+    logger = logging.getLogger("backend.startup")
+
+    # Export for all accounts that have .session files (or rows in the shared session DB)
     exported = 0
-    for session_file in session_dir.glob("*.session"):
-        account_name = session_file.stem
+    for account_name in list_session_accounts(session_dir):
         # load_session_string_file will auto-export if .session_string doesn't exist
         result = load_session_string_file(session_dir, account_name)
         if result:
@@ -248,18 +255,56 @@ async def on_shutdown() -> None:
         with contextlib.suppress(asyncio.CancelledError):
             await startup_task
     shutdown_scheduler()
+    try:
+        from backend.utils.loop_monitor import get_loop_monitor
+
+        await get_loop_monitor().stop()
+    except Exception:
+        pass
     try:
         from backend.services.keyword_monitor import get_keyword_monitor_service
 
         await get_keyword_monitor_service().stop()
     except Exception:
         pass
+    try:
+        from backend.services.avatars import get_avatar_service
+
+        await get_avatar_service().stop()
+    except Exception:
+        pass
     try:
         from tg_signer.core import close_all_clients
+        from tg_signer.session_storage import close_shared_session_dbs
 
         await close_all_clients()
+        close_shared_session_dbs()
+    except Exception:
+        pass
+    try:
+        from backend.services.failure_digest import get_failure_digest
+        from backend.services.notification_outbox import get_notification_outbox
+
+        await get_failure_digest().flush_all()
+        await get_notification_outbox().stop()
+    except Exception:
+        pass
+    try:
+        from tg_signer.ai_gateway import get_ai_gateway
+
+        await get_ai_gateway().aclose()
     except Exception:
         pass
+    try:
+        from tg_signer.ai_cache import flush_ai_answer_caches
+
+        flush_ai_answer_caches()
+    except Exception:
+        pass
+    # 等待排队中的历史/配置写入完成
+    from backend.utils.file_io import shutdown_io_executor
+
+    shutdown_io_executor()
     from backend.utils.memory import trim_memory
 
-    trim_memory()
+    trim_memory(force=True)
@@ -1,7 +1,17 @@
 from backend.models.account import Account
 from backend.models.login_log import LoginLog
+from backend.models.notification_outbox import NotificationOutbox
+from backend.models.scheduler_job_state import SchedulerJobState
 from backend.models.task import Task
 from backend.models.task_log import TaskLog
 from backend.models.user import User
 
-__all__ = ["Account", "LoginLog", "Task", "TaskLog", "User"]
+__all__ = [
+    "Account",
+    "LoginLog",
+    "NotificationOutbox",
+    "SchedulerJobState",
+    "Task",
+    "TaskLog",
+    "User",
+]
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from backend.core.database import Base
+from backend.utils.time import utc_now_naive
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # telegram / http
+    kind = Column(String(20), nullable=False)
+    # 限流与合并发送的目标标识，例如 "telegram:<bot>:<chat>:<thread>" 或 "http:<host>"
+    destination = Column(String(255), nullable=False, index=True)
+    payload = Column(Text, nullable=False)
+    # pending / failed，投递成功后直接删除
+    status = Column(String(20), default="pending", nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=utc_now_naive, nullable=False, index=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=utc_now_naive, nullable=False)
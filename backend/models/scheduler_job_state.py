@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, String
+
+from backend.core.database import Base
+from backend.utils.time import utc_now_naive
+
+
+class SchedulerJobState(Base):
+    __tablename__ = "scheduler_job_state"
+
+    job_id = Column(String(255), primary_key=True)
+    last_fire_time = Column(DateTime, nullable=True)
+    updated_at = Column(
+        DateTime, default=utc_now_naive, onupdate=utc_now_naive, nullable=False
+    )
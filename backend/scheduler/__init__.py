@@ -1,26 +1,58 @@
 from __future__ import annotations
 
-from datetime import datetime
-
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
 from sqlalchemy.orm import Session
 
-from backend.core.database import get_session_local
+from backend.core.database import get_engine, get_session_local
 from backend.models.task import Task
+from backend.scheduler.catchup import catch_up_missed_jobs, record_job_fired
+from backend.scheduler.prewarm import (
+    LeadTrigger,
+    get_prewarm_seconds,
+    resolve_fire_target,
+)
+from backend.scheduler.range_plan import (
+    compute_next_run,
+    discard_planned_run,
+    get_planned_run,
+    load_plans,
+    save_planned_run,
+)
 from backend.services.tasks import run_task_once
+from backend.utils.file_io import run_io
 from backend.utils.memory import trim_memory
 
 scheduler: AsyncIOScheduler | None = None
 
+# 允许任务延迟 1 小时执行
+_MISFIRE_GRACE_SECONDS = 3600
+
+# 随机时间段任务：job_id -> (account_name, task_name, range_start, range_end)
+_range_jobs: Dict[str, Tuple[str, str, str, str]] = {}
+
+
+def _trigger_unchanged(job, trigger) -> bool:
+    return (
+        job is not None
+        and type(job.trigger) is type(trigger)
+        and str(job.trigger) == str(trigger)
+    )
 
-def _parse_clock_time(value: str):
-    for fmt in ("%H:%M:%S", "%H:%M"):
-        try:
-            return datetime.strptime(value, fmt).time()
-        except ValueError:
-            continue
-    raise ValueError(f"Invalid clock time: {value}")
+
+def _forget_range_job(job_id: str) -> None:
+    spec = _range_jobs.pop(job_id, None)
+    if spec is not None:
+        discard_planned_run(spec[0], spec[1])
 
 
 def create_cron_trigger(cron_str: str) -> CronTrigger:
@@ -50,6 +82,15 @@ def create_cron_trigger(cron_str: str) -> CronTrigger:
     return CronTrigger.from_crontab(cron_str)
 
 
+def create_sign_task_trigger(cron_str: str, execution_mode: str = "fixed"):
+    """签到任务 trigger：固定时间模式在开启预热时提前触发"""
+    trigger = create_cron_trigger(cron_str)
+    lead_seconds = get_prewarm_seconds()
+    if execution_mode == "fixed" and lead_seconds > 0:
+        return LeadTrigger(trigger, lead_seconds)
+    return trigger
+
+
 async def _job_run_task(task_id: int) -> None:
     db: Session = get_session_local()()
     try:
@@ -66,70 +107,47 @@ async def _job_run_task(task_id: int) -> None:
 
 async def _job_run_sign_task(account_name: str, task_name: str) -> None:
     """运行签到任务的 Job 包装器"""
-    import asyncio
-    import logging
-    import random
-    from datetime import datetime, timedelta
-
     from backend.services.sign_tasks import get_sign_task_service
 
     logger = logging.getLogger("backend.scheduler")
     try:
         logger.info(f"Scheduler: 正在运行签到任务 {task_name} (账号: {account_name})")
 
-        # 获取任务配置，检查是否为随机时间段模式
         sign_task_service = get_sign_task_service()
         task_config = sign_task_service.get_task(task_name, account_name)
-        if task_config and task_config.get("execution_mode") == "range":
+        fire_at = None
+        execution_mode = (task_config or {}).get("execution_mode") or "fixed"
+        if task_config and execution_mode == "fixed" and task_config.get("sign_at"):
+            lead_seconds = get_prewarm_seconds()
+            try:
+                target = resolve_fire_target(
+                    create_cron_trigger(task_config["sign_at"]), lead_seconds
+                )
+            except Exception as e:
+                logger.warning(f"Scheduler: 计算任务 {task_name} 预热目标时间失败: {e}")
+                target = None
+            if target is not None:
+                fire_at = target.timestamp()
+                logger.info(
+                    f"Scheduler: 任务 {task_name} 预热中，目标时间 {target.isoformat()}"
+                )
+        if task_config and execution_mode == "range":
             range_start_str = task_config.get("range_start")
             range_end_str = task_config.get("range_end")
-
             if range_start_str and range_end_str:
-                try:
-                    # 解析时间
-                    start_time = _parse_clock_time(range_start_str)
-                    end_time = _parse_clock_time(range_end_str)
-
-                    # 转换为当前日期的 datetime
-                    now = datetime.now()
-                    start_dt = now.replace(
-                        hour=start_time.hour,
-                        minute=start_time.minute,
-                        second=start_time.second,
-                        microsecond=0,
-                    )
-                    end_dt = now.replace(
-                        hour=end_time.hour,
-                        minute=end_time.minute,
-                        second=end_time.second,
-                        microsecond=0,
-                    )
-
-                    # 如果结束时间小于开始时间，假设是第二天（虽然CRON触发通常在开始时间，这里做个防御）
-                    if end_dt < start_dt:
-                        end_dt += timedelta(days=1)
-
-                    # 计算总秒数
-                    total_seconds = (end_dt - start_dt).total_seconds()
-
-                    if total_seconds > 0:
-                        # 生成随机延迟
-                        delay_seconds = random.uniform(0, total_seconds)
-                        logger.info(
-                            f"Scheduler: 任务 {task_name} 设置为随机时间段模式 ({range_start_str} - {range_end_str})"
-                        )
-                        logger.info(
-                            f"Scheduler: 将随机等待 {int(delay_seconds)} 秒 ({delay_seconds / 60:.2f} 分钟) 后执行"
-                        )
-
-                        await asyncio.sleep(delay_seconds)
-
-                except Exception as e:
-                    logger.error(f"Scheduler: 计算随机时间段延迟失败: {e}，将立即执行")
-
-        # run_task_with_logs 是 async 的，我们使用它
-        sign_task_service = get_sign_task_service()
-        result = await sign_task_service.run_task_with_logs(account_name, task_name)
+                # 本轮是一次性 job，先排好下一个时间段，再执行本轮
+                schedule_range_task_job(
+                    account_name,
+                    task_name,
+                    range_start_str,
+                    range_end_str,
+                    reuse_plan=False,
+                    next_window=True,
+                )
+
+        result = await sign_task_service.run_task_with_logs(
+            account_name, task_name, fire_at=fire_at
+        )
         if result.get("success"):
             logger.info(f"Scheduler: 任务 {task_name} 执行成功")
         else:
@@ -140,6 +158,78 @@ async def _job_run_sign_task(account_name: str, task_name: str) -> None:
         trim_memory()
 
 
+def schedule_range_task_job(
+    account_name: str,
+    task_name: str,
+    range_start: str,
+    range_end: str,
+    reuse_plan: bool = True,
+    next_window: bool = False,
+    plans: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[datetime]:
+    """
+    随机时间段任务：确定本轮执行时间并注册一次性 date trigger。
+
+    reuse_plan 为 True 时沿用已持久化且仍有效的执行时间（重启、重新同步）；
+    next_window 为 True 时跳过当前所在的时间段（本轮刚执行）；
+    plans 为预先读取的计划，批量同步时避免重复读取文件。
+    """
+    if scheduler is None:
+        return None
+
+    logger = logging.getLogger("backend.scheduler")
+    job_id = f"sign-{account_name}-{task_name}"
+    now = datetime.now(scheduler.timezone)
+    misfire_grace = timedelta(seconds=_MISFIRE_GRACE_SECONDS)
+
+    run_at = (
+        get_planned_run(account_name, task_name, range_start, range_end, plans)
+        if reuse_plan
+        else None
+    )
+    existing = scheduler.get_job(job_id)
+    if (
+        run_at is not None
+        and existing is not None
+        and isinstance(existing.trigger, DateTrigger)
+        and existing.trigger.run_date == run_at
+    ):
+        # job store 中已是同一计划（可能已被安排补跑），保持不动
+        _range_jobs[job_id] = (account_name, task_name, range_start, range_end)
+        return existing.next_run_time
+    if run_at is not None and run_at.tzinfo is None:
+        run_at = run_at.replace(tzinfo=now.tzinfo)
+    if run_at is None or run_at < now - misfire_grace:
+        run_at = compute_next_run(range_start, range_end, now, next_window=next_window)
+        save_planned_run(account_name, task_name, range_start, range_end, run_at)
+
+    scheduler.add_job(
+        _job_run_sign_task,
+        trigger=DateTrigger(run_date=run_at),
+        id=job_id,
+        args=[account_name, task_name],
+        replace_existing=True,
+    )
+    _range_jobs[job_id] = (account_name, task_name, range_start, range_end)
+    logger.info(
+        f"Scheduler: 任务 {task_name} ({range_start} - {range_end}) 下次执行时间 {run_at.isoformat()}"
+    )
+    return run_at
+
+
+def _on_job_missed(event) -> None:
+    """一次性 job 错过执行窗口后不会再触发，这里补排下一轮"""
+    spec = _range_jobs.get(event.job_id)
+    if spec is None:
+        return
+    try:
+        schedule_range_task_job(*spec, reuse_plan=False)
+    except Exception as e:
+        logging.getLogger("backend.scheduler").error(
+            f"Scheduler: 重新排期任务 {event.job_id} 失败: {e}"
+        )
+
+
 async def _job_maintenance() -> None:
     """每日维护任务：清理旧日志等"""
     db: Session = get_session_local()()
@@ -175,11 +265,12 @@ async def sync_jobs() -> None:
     try:
         # 1. 同步数据库任务
         tasks = db.query(Task).filter(Task.enabled).all()
-        existing_ids = {
-            job.id
+        existing_jobs = {
+            job.id: job
             for job in scheduler.get_jobs()
             if job.id.startswith("db-") or job.id.startswith("sign-")
         }
+        existing_ids = set(existing_jobs)
         desired_ids = set()
 
         for task in tasks:
@@ -188,6 +279,9 @@ async def sync_jobs() -> None:
 
             try:
                 trigger = create_cron_trigger(task.cron)
+                if _trigger_unchanged(existing_jobs.get(job_id), trigger):
+                    # 保留持久化的 next_run_time（含补跑安排）
+                    continue
                 if job_id in existing_ids:
                     scheduler.reschedule_job(job_id, trigger=trigger)
                 else:
@@ -205,8 +299,10 @@ async def sync_jobs() -> None:
         # 使用缓存的任务列表，减少 I/O
         sign_task_service = get_sign_task_service()
         # Expand wildcard tasks for newly added accounts
-        sign_task_service._expand_wildcard_tasks()
-        sign_tasks = sign_task_service.list_tasks(force_refresh=True)
+        await sign_task_service.async_expand_wildcard_tasks()
+        sign_tasks = await sign_task_service.async_list_tasks(force_refresh=True)
+        # 随机时间段计划只读取一次
+        range_plans = await run_io(load_plans)
         for st in sign_tasks:
             account_name = str(st.get("account_name") or "").strip()
             task_name = str(st.get("name") or "").strip()
@@ -221,18 +317,37 @@ async def sync_jobs() -> None:
             if not st.get("enabled", True):
                 if job_id in existing_ids:
                     scheduler.remove_job(job_id)
+                _forget_range_job(job_id)
                 continue
 
             if st.get("execution_mode") == "listen":
                 if job_id in existing_ids:
                     scheduler.remove_job(job_id)
+                _forget_range_job(job_id)
                 continue
 
             try:
-                trigger = create_cron_trigger(st["sign_at"])
+                if (
+                    st.get("execution_mode") == "range"
+                    and st.get("range_start")
+                    and st.get("range_end")
+                ):
+                    schedule_range_task_job(
+                        account_name,
+                        task_name,
+                        st["range_start"],
+                        st["range_end"],
+                        plans=range_plans,
+                    )
+                    continue
+                _forget_range_job(job_id)
                 if st.get("execution_mode") == "range" and st.get("range_start"):
-                    trigger = create_cron_trigger(st["range_start"])
+                    trigger = create_sign_task_trigger(st["range_start"], "range")
+                else:
+                    trigger = create_sign_task_trigger(st["sign_at"])
 
+                if _trigger_unchanged(existing_jobs.get(job_id), trigger):
+                    continue
                 if job_id in existing_ids:
                     scheduler.reschedule_job(job_id, trigger=trigger)
                 else:
@@ -250,6 +365,7 @@ async def sync_jobs() -> None:
         # remove obsolete jobs
         for job_id in existing_ids - desired_ids:
             scheduler.remove_job(job_id)
+            _forget_range_job(job_id)
     finally:
         db.close()
 
@@ -260,15 +376,31 @@ async def init_scheduler(sync_on_startup: bool = True) -> AsyncIOScheduler:
         from backend.core.config import get_settings
 
         settings = get_settings()
+        # job 默认持久化到应用数据库，重启后保留 next_run_time
+        if os.getenv("SCHEDULER_PERSIST_JOBS", "1") == "0":
+            jobstore = MemoryJobStore()
+        else:
+            jobstore = SQLAlchemyJobStore(engine=get_engine())
         scheduler = AsyncIOScheduler(
             timezone=settings.timezone,
+            jobstores={"default": jobstore},
             job_defaults={
-                "misfire_grace_time": 3600,  # 允许任务延迟 1 小时执行
+                "misfire_grace_time": _MISFIRE_GRACE_SECONDS,
                 "coalesce": True,  # 合并积压的执行
                 "max_instances": 10,  # 增加并发实例数，避免多账号任务相互阻塞
             },
         )
-        scheduler.start()
+        scheduler.add_listener(_on_job_missed, EVENT_JOB_MISSED)
+        scheduler.add_listener(record_job_fired, EVENT_JOB_SUBMITTED)
+        # 先暂停启动，处理停机期间错过的 job 后再恢复
+        scheduler.start(paused=True)
+        try:
+            catch_up_missed_jobs(scheduler)
+        except Exception as e:
+            logging.getLogger("backend.scheduler").error(
+                f"Scheduler: 处理错过的任务失败: {e}"
+            )
+        scheduler.resume()
 
         # 添加每日凌晨 3 点执行的维护任务
         scheduler.add_job(
@@ -291,7 +423,12 @@ def shutdown_scheduler() -> None:
 
 
 def add_or_update_sign_task_job(
-    account_name: str, task_name: str, cron_expression: str, enabled: bool = True
+    account_name: str,
+    task_name: str,
+    cron_expression: str,
+    enabled: bool = True,
+    execution_mode: str = "fixed",
+    range_end: str = "",
 ) -> None:
     """动态添加或更新签到任务 Job"""
     global scheduler
@@ -306,7 +443,14 @@ def add_or_update_sign_task_job(
 
     try:
         cron = cron_expression
-        trigger = create_cron_trigger(cron)
+        if execution_mode == "range" and range_end:
+            run_at = schedule_range_task_job(account_name, task_name, cron, range_end)
+            logging.getLogger("backend.scheduler").info(
+                f"Scheduler: 已添加/更新任务 {job_id} -> {run_at}"
+            )
+            return
+        _forget_range_job(job_id)
+        trigger = create_sign_task_trigger(cron, execution_mode or "fixed")
 
         # 总是使用 replace_existing=True 来覆盖旧的
         scheduler.add_job(
@@ -328,6 +472,7 @@ def remove_sign_task_job(account_name: str, task_name: str) -> None:
         return
 
     job_id = f"sign-{account_name}-{task_name}"
+    _forget_range_job(job_id)
     try:
         if scheduler.get_job(job_id):
             scheduler.remove_job(job_id)
@@ -0,0 +1,149 @@
+"""
+持久化 job store 的补偿执行
+
+job 持久化在应用 SQLite 中，重启后 next_run_time 仍然保留。停机期间错过的
+签到在启动时只补跑一次，并按间隔错开，避免所有账号同时执行。
+
+每次触发时在 scheduler_job_state 表记录触发时间（写入在文件 I/O 线程池中执行）。
+如果进程在提交 job 之后、job store 更新 next_run_time 之前退出，重启后该次触发
+已有记录，不会再补跑一遍。
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from apscheduler.schedulers.base import BaseScheduler
+
+from backend.core.database import get_session_local
+from backend.models.scheduler_job_state import SchedulerJobState
+from backend.utils.file_io import get_io_executor
+from tg_signer.utils import read_float_env
+
+logger = logging.getLogger("backend.scheduler")
+
+# 只有这些前缀的 job 会被补跑（系统维护等任务直接跳到下一次）
+CATCH_UP_JOB_PREFIXES = ("sign-", "db-")
+
+
+def get_catch_up_window() -> timedelta:
+    """错过时间在该窗口内才补跑，默认 24 小时；0 表示关闭补跑"""
+    return timedelta(
+        hours=read_float_env("SCHEDULER_CATCHUP_WINDOW_HOURS", 24, 0.0)
+    )
+
+
+def get_catch_up_spread() -> float:
+    """补跑任务之间的间隔秒数"""
+    return read_float_env("SCHEDULER_CATCHUP_SPREAD_SECONDS", 20, 0.0)
+
+
+def _to_utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def store_fire_time(job_id: str, fired_at: datetime) -> None:
+    try:
+        with get_session_local()() as db:
+            state = db.get(SchedulerJobState, job_id)
+            if state is None:
+                state = SchedulerJobState(job_id=job_id)
+                db.add(state)
+            state.last_fire_time = _to_utc_naive(fired_at)
+            db.commit()
+    except Exception as e:
+        logger.debug(f"Scheduler: 记录 {job_id} 触发时间失败: {e}")
+
+
+def record_job_fired(event) -> None:
+    """EVENT_JOB_SUBMITTED 监听器：在线程池中记录每个 job 的最近触发时间"""
+    run_times = getattr(event, "scheduled_run_times", None) or []
+    if not run_times:
+        return
+    get_io_executor().submit(store_fire_time, event.job_id, max(run_times))
+
+
+def load_fire_times(job_ids: Iterable[str]) -> Dict[str, datetime]:
+    """job_id -> 最近一次触发时间（UTC，naive）"""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return {}
+    try:
+        with get_session_local()() as db:
+            rows = (
+                db.query(SchedulerJobState)
+                .filter(SchedulerJobState.job_id.in_(job_ids))
+                .all()
+            )
+            return {
+                row.job_id: row.last_fire_time
+                for row in rows
+                if row.last_fire_time is not None
+            }
+    except Exception as e:
+        logger.debug(f"Scheduler: 读取 job 触发记录失败: {e}")
+        return {}
+
+
+def catch_up_missed_jobs(
+    scheduler: BaseScheduler, now: Optional[datetime] = None
+) -> int:
+    """
+    处理 job store 中 next_run_time 已过期的 job，需在 scheduler 暂停时调用。
+
+    窗口内错过的签到改为在 now 之后错开补跑一次（之后按 trigger 正常计算下一次）；
+    超出窗口、或该次已有触发记录的直接跳到下一次触发时间。返回补跑的 job 数量。
+    """
+    now = now or datetime.now(scheduler.timezone)
+    window = get_catch_up_window()
+    spread = get_catch_up_spread()
+
+    missed = sorted(
+        (
+            job
+            for job in scheduler.get_jobs()
+            if job.next_run_time is not None and job.next_run_time <= now
+        ),
+        key=lambda job: job.next_run_time,
+    )
+    fire_times = load_fire_times(job.id for job in missed)
+
+    caught_up = 0
+    for job in missed:
+        missed_at = job.next_run_time
+        last_fired = fire_times.get(job.id)
+        already_fired = last_fired is not None and last_fired >= _to_utc_naive(missed_at)
+        try:
+            if (
+                window > timedelta(0)
+                and job.id.startswith(CATCH_UP_JOB_PREFIXES)
+                and now - missed_at <= window
+                and not already_fired
+            ):
+                delay = caught_up * spread + random.uniform(0, spread)
+                job.modify(next_run_time=now + timedelta(seconds=delay))
+                caught_up += 1
+                logger.info(
+                    f"Scheduler: 补跑错过的任务 {job.id} (原定 {missed_at.isoformat()})，"
+                    f"{delay:.0f} 秒后执行"
+                )
+                continue
+
+            next_run_time = job.trigger.get_next_fire_time(None, now)
+            if next_run_time is None or next_run_time <= now:
+                job.remove()
+                logger.info(f"Scheduler: 任务 {job.id} 已过期，移除")
+            else:
+                job.modify(next_run_time=next_run_time)
+                logger.info(
+                    f"Scheduler: 跳过错过的任务 {job.id} (原定 {missed_at.isoformat()})"
+                )
+        except Exception as e:
+            logger.error(f"Scheduler: 处理错过的任务 {job.id} 失败: {e}")
+
+    return caught_up
@@ -0,0 +1,72 @@
+"""
+签到任务预热调度
+
+固定时间任务在 sign_at 之前 N 秒触发：提前完成连接、鉴权与目标会话解析，
+再等待到目标时间发送首个动作。
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from apscheduler.triggers.base import BaseTrigger
+
+_PREWARM_SECONDS_ENV = "SIGN_TASK_PREWARM_SECONDS"
+
+
+def get_prewarm_seconds() -> float:
+    """提前预热的秒数，0 表示关闭预热（默认）"""
+    raw = os.getenv(_PREWARM_SECONDS_ENV)
+    if raw is None:
+        return 0.0
+    try:
+        return min(max(float(raw), 0.0), 300.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LeadTrigger(BaseTrigger):
+    """在被包装 trigger 的每次触发时间之前 ``lead_seconds`` 秒触发"""
+
+    def __init__(self, trigger: BaseTrigger, lead_seconds: float):
+        self.trigger = trigger
+        self.lead_seconds = float(lead_seconds)
+
+    @property
+    def timezone(self):
+        return getattr(self.trigger, "timezone", None)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        lead = timedelta(seconds=self.lead_seconds)
+        previous_target = previous_fire_time + lead if previous_fire_time else None
+        next_target = self.trigger.get_next_fire_time(previous_target, now + lead)
+        if next_target is None:
+            return None
+        return next_target - lead
+
+    def __str__(self) -> str:
+        return f"lead[{self.lead_seconds:g}s, {self.trigger}]"
+
+    def __repr__(self) -> str:
+        return f"<LeadTrigger (lead_seconds={self.lead_seconds!r}, trigger={self.trigger!r})>"
+
+
+def resolve_fire_target(
+    trigger: BaseTrigger, lead_seconds: float, now: Optional[datetime] = None
+) -> Optional[datetime]:
+    """
+    在预热 job 内部计算本次对应的目标时间。
+
+    如果 job 触发过晚（已经错过目标时间），返回 None，调用方应立即执行。
+    """
+    if lead_seconds <= 0:
+        return None
+    now = now or datetime.now(getattr(trigger, "timezone", None))
+    target = trigger.get_next_fire_time(None, now)
+    if target is None:
+        return None
+    if (target - now).total_seconds() > lead_seconds + 1:
+        return None
+    return target
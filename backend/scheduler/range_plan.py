@@ -0,0 +1,150 @@
+"""
+随机时间段任务的执行计划
+
+range 模式在调度时就确定本轮随机执行时间，并注册为一次性 date trigger，
+job 内部不再 sleep。计划持久化到 workdir/range_schedule.json，重启后沿用
+同一执行时间。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from tg_signer.utils import atomic_write_json
+
+logger = logging.getLogger("backend.scheduler")
+
+_PLAN_FILENAME = "range_schedule.json"
+_plan_lock = threading.Lock()
+
+
+def _plan_file() -> Path:
+    from backend.core.config import get_settings
+
+    return get_settings().resolve_workdir() / _PLAN_FILENAME
+
+
+def _plan_key(account_name: str, task_name: str) -> str:
+    return f"{account_name}/{task_name}"
+
+
+def load_plans() -> Dict[str, Dict[str, Any]]:
+    path = _plan_file()
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception as e:
+        logger.warning(f"Scheduler: 读取随机时间段计划失败: {e}")
+        return {}
+
+
+def _parse_clock_time(value: str):
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid clock time: {value}")
+
+
+def compute_next_run(
+    range_start: str, range_end: str, now: datetime, *, next_window: bool = False
+) -> datetime:
+    """
+    随机取一个执行时间。
+
+    now 落在某个时间段内时，在该时间段剩余的部分中选取；next_window 为 True
+    （本轮刚执行过）时跳过当前时间段，从 now 之后开始的下一个时间段中选取。
+    """
+    start_time = _parse_clock_time(range_start)
+    end_time = _parse_clock_time(range_end)
+
+    today_start = now.replace(
+        hour=start_time.hour,
+        minute=start_time.minute,
+        second=start_time.second,
+        microsecond=0,
+    )
+    # 跨天的时间段可能从昨天开始，因此从昨天开始依次检查
+    for offset in (-1, 0, 1):
+        start_dt = today_start + timedelta(days=offset)
+        end_dt = start_dt.replace(
+            hour=end_time.hour,
+            minute=end_time.minute,
+            second=end_time.second,
+        )
+        # 结束时间早于开始时间视为跨天
+        if end_dt < start_dt:
+            end_dt += timedelta(days=1)
+        if end_dt <= now or (next_window and start_dt <= now):
+            continue
+        lower = max(start_dt, now)
+        total_seconds = (end_dt - lower).total_seconds()
+        return lower + timedelta(seconds=random.uniform(0, total_seconds))
+    raise ValueError(f"Invalid time range: {range_start} - {range_end}")
+
+
+def get_planned_run(
+    account_name: str,
+    task_name: str,
+    range_start: str,
+    range_end: str,
+    plans: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[datetime]:
+    """
+    读取已持久化的执行时间；时间段配置已变化时视为无效。
+
+    批量调度时可传入 load_plans() 的结果，避免每个任务都重新读取文件。
+    """
+    if plans is None:
+        with _plan_lock:
+            plans = load_plans()
+    plan = plans.get(_plan_key(account_name, task_name))
+    if not plan:
+        return None
+    if plan.get("range_start") != range_start or plan.get("range_end") != range_end:
+        return None
+    try:
+        return datetime.fromisoformat(plan["run_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def save_planned_run(
+    account_name: str,
+    task_name: str,
+    range_start: str,
+    range_end: str,
+    run_at: datetime,
+) -> None:
+    with _plan_lock:
+        plans = load_plans()
+        plans[_plan_key(account_name, task_name)] = {
+            "range_start": range_start,
+            "range_end": range_end,
+            "run_at": run_at.isoformat(),
+        }
+        try:
+            atomic_write_json(_plan_file(), plans, indent=2)
+        except Exception as e:
+            logger.warning(f"Scheduler: 保存随机时间段计划失败: {e}")
+
+
+def discard_planned_run(account_name: str, task_name: str) -> None:
+    with _plan_lock:
+        plans = load_plans()
+        if plans.pop(_plan_key(account_name, task_name), None) is None:
+            return
+        try:
+            atomic_write_json(_plan_file(), plans, indent=2)
+        except Exception as e:
+            logger.warning(f"Scheduler: 保存随机时间段计划失败: {e}")
@@ -0,0 +1,309 @@
+"""
+Chat 头像服务
+
+头像按 chat_id 缓存（同一个 chat 不论由哪个账号获取头像都一样）：
+
+- 内存 LRU 保存热点头像，命中时不访问磁盘；
+- 磁盘缓存与“无头像”标记在 IO 线程中读取，不阻塞事件循环；
+- 同一 chat_id 的并发请求合并为一次下载（single-flight）；
+- 下载由后台队列执行，不持有账号运行锁，避免挡住定时任务；
+- 回退账号只从 chats_cache.json 中确实包含该 chat 的账号里挑选，且有上限；
+- “无头像”标记只在确认没有头像时写入，下载异常或超时不会被当成无头像。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import shutil
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from backend.core.config import get_settings
+from backend.utils.file_io import run_io
+from backend.utils.tg_session import list_account_names
+from tg_signer.async_utils import create_logged_task
+from tg_signer.chat_directory import get_chat_directory
+from tg_signer.utils import atomic_write_bytes, read_float_env, read_int_env
+
+logger = logging.getLogger("backend.avatars")
+
+# 磁盘缓存与“无头像”标记的有效期
+AVATAR_TTL_SECONDS = 7 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class Avatar:
+    data: bytes
+    etag: str
+
+
+def _make_avatar(data: bytes) -> Avatar:
+    return Avatar(data=data, etag=f'"{hashlib.sha1(data).hexdigest()[:20]}"')
+
+
+class AvatarService:
+    def __init__(self, cache_dir: Optional[Path] = None, signs_dir: Optional[Path] = None):
+        settings = get_settings()
+        workdir = settings.resolve_workdir()
+        self.cache_dir = cache_dir or workdir / "avatars" / "chats"
+        self.signs_dir = signs_dir or workdir / "signs"
+        self.memory_limit = read_int_env("AVATAR_MEMORY_CACHE_KB", 8192, 0) * 1024
+        self.fallback_limit = read_int_env("AVATAR_FALLBACK_ACCOUNTS", 3, 0)
+        self.workers = read_int_env("AVATAR_FETCH_WORKERS", 2, 1)
+        self.wait_timeout = read_float_env("AVATAR_FETCH_WAIT_SECONDS", 20.0, 0.0)
+        self.fetch_timeout = read_float_env("AVATAR_FETCH_TIMEOUT_SECONDS", 30.0, 1.0)
+
+        self._lru: "OrderedDict[int, Avatar]" = OrderedDict()
+        self._lru_bytes = 0
+        # chat_id -> 确认无头像的时间（与磁盘标记一致，命中时免去 stat）
+        self._missing: Dict[int, float] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.downloads = 0
+        self.download_attempts = 0
+        self.not_found = 0
+        self.transient_failures = 0
+        self.queue_full = 0
+
+    # ---- 内存 LRU ----
+
+    def _lru_get(self, chat_id: int) -> Optional[Avatar]:
+        avatar = self._lru.get(chat_id)
+        if avatar is not None:
+            self._lru.move_to_end(chat_id)
+        return avatar
+
+    def _lru_put(self, chat_id: int, avatar: Avatar) -> None:
+        if len(avatar.data) > self.memory_limit:
+            return
+        previous = self._lru.pop(chat_id, None)
+        if previous is not None:
+            self._lru_bytes -= len(previous.data)
+        self._lru[chat_id] = avatar
+        self._lru_bytes += len(avatar.data)
+        while self._lru_bytes > self.memory_limit and self._lru:
+            _, evicted = self._lru.popitem(last=False)
+            self._lru_bytes -= len(evicted.data)
+
+    # ---- 磁盘缓存（IO 线程） ----
+
+    def _cache_file(self, chat_id: int) -> Path:
+        return self.cache_dir / f"chat_{chat_id}.jpg"
+
+    def _marker_file(self, chat_id: int) -> Path:
+        return self.cache_dir / f"chat_{chat_id}.no_avatar"
+
+    def _read_disk(self, account_name: str, chat_id: int) -> Tuple[Optional[bytes], bool]:
+        """返回 (头像字节, 是否有有效的无头像标记)"""
+        now = time.time()
+        marker = self._marker_file(chat_id)
+        try:
+            if now - marker.stat().st_mtime < AVATAR_TTL_SECONDS:
+                return None, True
+            marker.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+
+        cache_file = self._cache_file(chat_id)
+        # 兼容旧版按账号命名的缓存文件
+        legacy_file = self.cache_dir / f"{account_name}_{chat_id}.jpg"
+        for path in (cache_file, legacy_file):
+            try:
+                if now - path.stat().st_mtime >= AVATAR_TTL_SECONDS:
+                    continue
+                data = path.read_bytes()
+            except OSError:
+                continue
+            if path is legacy_file:
+                with contextlib.suppress(OSError):
+                    shutil.copy2(legacy_file, cache_file)
+            return data, False
+        return None, False
+
+    def _write_disk(self, chat_id: int, data: Optional[bytes]) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if data:
+            atomic_write_bytes(self._cache_file(chat_id), data)
+            self._marker_file(chat_id).unlink(missing_ok=True)
+        else:
+            self._marker_file(chat_id).write_text("")
+
+    def _fallback_accounts(self, account_name: str, chat_id: int) -> List[str]:
+        """chats_cache.json 中包含该 chat 的其他账号，最多 fallback_limit 个"""
+        if self.fallback_limit <= 0:
+            return []
+        candidates = get_chat_directory(self.signs_dir).accounts_with_chat(
+            chat_id, exclude=account_name
+        )
+        if not candidates:
+            return []
+        known = set(list_account_names())
+        return [name for name in candidates if name in known][: self.fallback_limit]
+
+    # ---- 对外接口 ----
+
+    async def get_avatar(self, account_name: str, chat_id: int) -> Optional[Avatar]:
+        """返回头像；没有头像或在等待时间内未下载完成时返回 None"""
+        avatar = self._lru_get(chat_id)
+        if avatar is not None:
+            self.memory_hits += 1
+            return avatar
+        missing_at = self._missing.get(chat_id)
+        if missing_at is not None and time.time() - missing_at < AVATAR_TTL_SECONDS:
+            return None
+
+        data, marked_missing = await run_io(self._read_disk, account_name, chat_id)
+        if marked_missing:
+            self._missing[chat_id] = time.time()
+            return None
+        if data:
+            self.disk_hits += 1
+            avatar = _make_avatar(data)
+            self._lru_put(chat_id, avatar)
+            return avatar
+
+        future = self._inflight.get(chat_id)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            if not self._enqueue(account_name, chat_id, future):
+                return None
+        try:
+            # shield：等待超时不影响后台下载，下次请求可直接命中缓存
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _enqueue(self, account_name: str, chat_id: int, future: asyncio.Future) -> bool:
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((account_name, chat_id))
+        except asyncio.QueueFull:
+            self.queue_full += 1
+            return False
+        self._inflight[chat_id] = future
+        return True
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=read_int_env("AVATAR_QUEUE_SIZE", 256, 1))
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(
+                create_logged_task(
+                    self._worker(),
+                    logger=logger,
+                    description="avatar fetch worker",
+                )
+            )
+
+    async def _worker(self) -> None:
+        while True:
+            account_name, chat_id = await self._queue.get()
+            avatar: Optional[Avatar] = None
+            try:
+                avatar = await self._fetch(account_name, chat_id)
+            except Exception as exc:
+                logger.debug("Avatar fetch failed for %s: %s", chat_id, exc)
+            finally:
+                future = self._inflight.pop(chat_id, None)
+                if future is not None and not future.done():
+                    future.set_result(avatar)
+                self._queue.task_done()
+
+    async def _fetch(self, account_name: str, chat_id: int) -> Optional[Avatar]:
+        from backend.services.telegram import get_telegram_service
+
+        telegram_service = get_telegram_service()
+        candidates = [account_name]
+        fallbacks_loaded = False
+        # 只有所有尝试都确认“没有头像”才写入无头像标记；
+        # 异常与超时（例如与 close_client_by_name 竞争）只算临时失败
+        transient_error = False
+        index = 0
+        while index < len(candidates):
+            candidate = candidates[index]
+            index += 1
+            self.download_attempts += 1
+            try:
+                data = await asyncio.wait_for(
+                    telegram_service.download_chat_avatar(
+                        candidate, chat_id, hold_account_lock=False, raise_errors=True
+                    ),
+                    timeout=self.fetch_timeout,
+                )
+            except Exception as exc:
+                logger.debug("Avatar download via %s failed for %s: %s", candidate, chat_id, exc)
+                transient_error = True
+                data = None
+            if data:
+                self.downloads += 1
+                avatar = _make_avatar(data)
+                self._lru_put(chat_id, avatar)
+                self._missing.pop(chat_id, None)
+                await run_io(self._write_disk, chat_id, data)
+                return avatar
+            if not fallbacks_loaded:
+                fallbacks_loaded = True
+                candidates.extend(
+                    await run_io(self._fallback_accounts, account_name, chat_id)
+                )
+
+        if transient_error:
+            self.transient_failures += 1
+            return None
+        self.not_found += 1
+        self._missing[chat_id] = time.time()
+        await run_io(self._write_disk, chat_id, None)
+        return None
+
+    async def stop(self) -> None:
+        tasks, self._worker_tasks = self._worker_tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        for future in self._inflight.values():
+            if not future.done():
+                future.set_result(None)
+        self._inflight.clear()
+        self._queue = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_entries": len(self._lru),
+            "memory_bytes": self._lru_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "downloads": self.downloads,
+            "download_attempts": self.download_attempts,
+            "not_found": self.not_found,
+            "transient_failures": self.transient_failures,
+            "queue_full": self.queue_full,
+        }
+
+
+_avatar_service: Optional[AvatarService] = None
+
+
+def get_avatar_service() -> AvatarService:
+    global _avatar_service
+    if _avatar_service is None:
+        _avatar_service = AvatarService()
+    return _avatar_service
@@ -444,7 +444,7 @@ class ConfigService:
             # 关键修复：清除 SignTaskService 缓存，否则前端刷新也看不到新任务
             try:
                 from backend.services.sign_tasks import get_sign_task_service
-                get_sign_task_service()._tasks_cache = None
+                get_sign_task_service()._invalidate_tasks_cache()
 
                 # 可选：触发调度同步？
                 # 如果导入了新任务，调度器并不知道。
@@ -0,0 +1,199 @@
+"""
+任务失败通知汇总
+
+网络或目标机器人故障时，大量账号会在同一分钟内因同样的原因失败。
+失败通知先按 (通知目标, 任务, Chat, 错误特征) 分组，在短窗口内聚合，
+窗口结束时每组只发送一条汇总消息列出受影响的账号；窗口内只有一个账号
+失败时仍发送原来的详细通知。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.services.notification_outbox import get_notification_outbox
+from tg_signer.async_utils import create_logged_task
+
+logger = logging.getLogger("backend.failure_digest")
+
+_DIGIT_RE = re.compile(r"\d+")
+_SPACE_RE = re.compile(r"\s+")
+_SIGNATURE_LENGTH = 160
+_MAX_LISTED_ACCOUNTS = 50
+_SAMPLE_LOG_LINES = 5
+
+
+def get_digest_window() -> float:
+    """汇总窗口秒数，NOTIFICATION_FAILURE_DIGEST_SECONDS=0 时逐条发送"""
+    raw = os.getenv("NOTIFICATION_FAILURE_DIGEST_SECONDS")
+    if raw is None:
+        return 30.0
+    try:
+        return max(float(raw), 0.0)
+    except (TypeError, ValueError):
+        return 30.0
+
+
+def error_signature(message: str, account_name: str = "") -> str:
+    """去掉账号名、数字（用户 ID、消息 ID、耗时等）后的错误摘要，用于分组"""
+    text = str(message or "")
+    if account_name:
+        text = text.replace(account_name, "")
+    text = _DIGIT_RE.sub("#", text)
+    text = _SPACE_RE.sub(" ", text).strip().lower()
+    return text[:_SIGNATURE_LENGTH]
+
+
+@dataclass
+class _Destination:
+    bot_token: str
+    chat_id: str
+    message_thread_id: Optional[int]
+
+
+@dataclass
+class _FailureGroup:
+    destination: _Destination
+    task_name: str
+    chat_ids: Tuple[str, ...]
+    message: str
+    first_text: str
+    sample_logs: List[str]
+    accounts: List[str] = field(default_factory=list)
+
+
+class FailureDigest:
+    def __init__(self):
+        self._groups: Dict[tuple, _FailureGroup] = {}
+        self._timers: Dict[tuple, asyncio.Task] = {}
+        self.received = 0
+        self.sent = 0
+
+    async def add(
+        self,
+        *,
+        bot_token: str,
+        chat_id: str,
+        message_thread_id: Optional[int],
+        account_name: str,
+        task_name: str,
+        target_chat_ids: Sequence[Any],
+        message: str,
+        text: str,
+        flow_logs: Optional[List[str]] = None,
+    ) -> None:
+        """
+        记录一次失败；text 为该账号单独发送时的完整通知内容。
+        汇总关闭时直接入队发送。
+        """
+        destination = _Destination(bot_token, str(chat_id), message_thread_id)
+        window = get_digest_window()
+        if window <= 0:
+            await self._send(destination, text)
+            return
+
+        self.received += 1
+        chat_key = tuple(sorted({str(c) for c in target_chat_ids if c not in (None, "")}))
+        key = (
+            bot_token,
+            destination.chat_id,
+            message_thread_id,
+            task_name,
+            chat_key,
+            error_signature(message, account_name),
+        )
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _FailureGroup(
+                destination=destination,
+                task_name=task_name,
+                chat_ids=chat_key,
+                message=message,
+                first_text=text,
+                sample_logs=list((flow_logs or [])[-_SAMPLE_LOG_LINES:]),
+            )
+            self._timers[key] = create_logged_task(
+                self._flush_later(key, window),
+                logger=logger,
+                description=f"failure digest {task_name}",
+            )
+        if account_name not in group.accounts:
+            group.accounts.append(account_name)
+
+    async def _flush_later(self, key: tuple, window: float) -> None:
+        await asyncio.sleep(window)
+        self._timers.pop(key, None)
+        await self._flush(key)
+
+    async def _flush(self, key: tuple) -> None:
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        await self._send(group.destination, self._render(group))
+
+    def _render(self, group: _FailureGroup) -> str:
+        if len(group.accounts) == 1:
+            return group.first_text
+        listed = group.accounts[:_MAX_LISTED_ACCOUNTS]
+        accounts_line = ", ".join(listed)
+        if len(group.accounts) > len(listed):
+            accounts_line += f" 等 {len(group.accounts)} 个"
+        text = (
+            f"TG-SignPulse 任务执行失败汇总（{len(group.accounts)} 个账号）\n"
+            f"任务: {group.task_name}\n"
+        )
+        if group.chat_ids:
+            text += f"Chat: {', '.join(str(c) for c in group.chat_ids)}\n"
+        text += f"错误: {group.message or '未知错误'}\n账号: {accounts_line}"
+        if group.sample_logs:
+            text += (
+                f"\n\n最近日志（{group.accounts[0]}）:\n" + "\n".join(group.sample_logs)
+            )
+        return text
+
+    async def _send(self, destination: _Destination, text: str) -> None:
+        try:
+            await get_notification_outbox().enqueue_telegram(
+                bot_token=destination.bot_token,
+                chat_id=destination.chat_id,
+                text=text,
+                message_thread_id=destination.message_thread_id,
+            )
+            self.sent += 1
+        except Exception as e:
+            logger.warning("Failed to send Telegram failure notification: %s", e)
+
+    async def flush_all(self) -> None:
+        """立即发送所有未到期的汇总（关闭服务时调用）"""
+        timers, self._timers = self._timers, {}
+        for timer in timers.values():
+            timer.cancel()
+        for timer in timers.values():
+            with contextlib.suppress(asyncio.CancelledError):
+                await timer
+        for key in list(self._groups):
+            await self._flush(key)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "window_seconds": get_digest_window(),
+            "pending_groups": len(self._groups),
+            "failures_received": self.received,
+            "messages_sent": self.sent,
+        }
+
+
+_failure_digest: Optional[FailureDigest] = None
+
+
+def get_failure_digest() -> FailureDigest:
+    global _failure_digest
+    if _failure_digest is None:
+        _failure_digest = FailureDigest()
+    return _failure_digest
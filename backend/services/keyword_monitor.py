@@ -9,20 +9,25 @@ import time
 import unicodedata
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 from types import SimpleNamespace
 from typing import Any, Dict, List, Optional, Union
 
 from backend.core.config import get_settings
 from backend.services.push_notifications import send_keyword_push
 from backend.utils.account_locks import get_account_lock
+from backend.utils.file_io import run_io
 from backend.utils.memory import trim_memory
 from backend.utils.proxy import build_proxy_dict
 from backend.utils.tg_session import (
+    async_load_session_string_file,
     get_account_proxy,
     get_account_session_string,
     get_session_mode,
-    load_session_string_file,
 )
+from tg_signer.image_pipeline import ImageData, download_photo
+from tg_signer.math_solver import solve_arithmetic_with_stats
+from tg_signer.message_snapshot import MessageSnapshot
 
 logger = logging.getLogger("backend.keyword_monitor")
 settings = get_settings()
@@ -75,6 +80,8 @@ except Exception as exc:  # pragma: no cover - fallback for unsupported runtimes
         pass
 
 DEFAULT_CONTINUE_TIMEOUT = 25
+# Client.watch_update_chats 的登记名
+_UPDATE_OWNER = "keyword_monitor"
 DEFAULT_HISTORY_LIMIT = 10
 
 
@@ -811,7 +818,7 @@ class KeywordMonitorService:
             if cfg:
                 signature = self._build_ai_cfg_signature(cfg)
                 if self._ai_tools is None or self._ai_cfg_signature != signature:
-                    self._ai_tools = AITools(cfg)
+                    self._ai_tools = AITools(cfg, cache_dir=settings.resolve_workdir())
                     self._ai_cfg_signature = signature
                 return self._ai_tools
         raise RuntimeError("OpenAI config is required for keyword monitor AI actions")
@@ -877,6 +884,12 @@ class KeywordMonitorService:
                 return True
 
         click = getattr(message, "click", None)
+        if click is None and isinstance(message, MessageSnapshot):
+            try:
+                full_message = await client.get_messages(message.chat.id, message.id)
+                click = getattr(full_message, "click", None)
+            except Exception as exc:
+                logger.warning("Keyword monitor could not reload message for click: %s", exc)
         if callable(click):
             for args, kwargs in (
                 ((getattr(button, "text", None),), {}),
@@ -968,12 +981,13 @@ class KeywordMonitorService:
         chat_id: Union[int, str],
         thread_id: Optional[int],
         limit: int,
-    ) -> list[Message]:
-        async def _load_messages() -> list[Message]:
-            messages: list[Message] = []
+    ) -> list[MessageSnapshot]:
+        async def _load_messages() -> list[MessageSnapshot]:
+            # 轮询期间只保留状态比较与动作所需字段
+            messages: list[MessageSnapshot] = []
             async for message in client.get_chat_history(chat_id, limit=limit):
                 if _message_matches_thread(message, thread_id):
-                    messages.append(message)
+                    messages.append(MessageSnapshot.from_message(message))
             return messages
 
         return await self._call_client_with_retry(
@@ -1002,7 +1016,7 @@ class KeywordMonitorService:
         chat_id: Union[int, str],
         thread_id: Optional[int],
         action_id: int,
-    ) -> Optional[Message]:
+    ) -> Optional[MessageSnapshot]:
         limit = _read_positive_int_env(
             "KEYWORD_MONITOR_CONTINUE_HISTORY_LIMIT", DEFAULT_HISTORY_LIMIT, 1
         )
@@ -1088,10 +1102,25 @@ class KeywordMonitorService:
                     return True
         return False
 
-    async def _download_photo_bytes(self, client: Any, message: Message) -> bytes:
-        image_buffer = await client.download_media(message.photo.file_id, in_memory=True)
-        image_buffer.seek(0)
-        return image_buffer.read()
+    async def _download_photo_bytes(self, client: Any, message: Message) -> ImageData:
+        return await download_photo(client, message.photo)
+
+    async def _calculate_problem(self, query: str, action: Dict[str, Any]) -> str:
+        # 简单算式本地求解；自定义提示词或无法解析时才调用 AI
+        if (
+            not (action.get("ai_prompt") or "").strip()
+            and os.getenv("SIGN_TASK_LOCAL_MATH_SOLVER", "1") != "0"
+        ):
+            answer = solve_arithmetic_with_stats(query)
+            if answer is not None:
+                return answer
+        return (
+            await self._get_ai_tools().calculate_problem(
+                query,
+                system_prompt=action.get("ai_prompt"),
+            )
+            or ""
+        ).strip()
 
     async def _execute_ai_action(
         self,
@@ -1102,20 +1131,13 @@ class KeywordMonitorService:
         message: Message,
     ) -> bool:
         action_id = int(action.get("action"))
-        ai_tools = self._get_ai_tools()
         kwargs: Dict[str, Any] = {}
         if target_thread_id is not None:
             kwargs["message_thread_id"] = target_thread_id
 
         if action_id == 5:
             query = (message.text or message.caption or "").strip()
-            answer = (
-                await ai_tools.calculate_problem(
-                    query,
-                    system_prompt=action.get("ai_prompt"),
-                )
-                or ""
-            ).strip()
+            answer = await self._calculate_problem(query, action)
             if not answer:
                 return False
             await self._call_client_with_retry(
@@ -1125,6 +1147,17 @@ class KeywordMonitorService:
             )
             return True
 
+        if action_id == 7:
+            query = (message.text or message.caption or "").strip()
+            answer = await self._calculate_problem(query, action)
+            if not answer:
+                return False
+            proxy_action = {"action": 3, "text": answer}
+            return await self._click_keyboard_by_text(
+                client, target_chat_id, target_thread_id, proxy_action, message
+            )
+
+        ai_tools = self._get_ai_tools()
         if action_id == 6:
             image_bytes = await self._download_photo_bytes(client, message)
             answer = (
@@ -1143,22 +1176,6 @@ class KeywordMonitorService:
             )
             return True
 
-        if action_id == 7:
-            query = (message.text or message.caption or "").strip()
-            answer = (
-                await ai_tools.calculate_problem(
-                    query,
-                    system_prompt=action.get("ai_prompt"),
-                )
-                or ""
-            ).strip()
-            if not answer:
-                return False
-            proxy_action = {"action": 3, "text": answer}
-            return await self._click_keyboard_by_text(
-                client, target_chat_id, target_thread_id, proxy_action, message
-            )
-
         if action_id == 4:
             if not message.photo:
                 return False
@@ -1647,13 +1664,8 @@ class KeywordMonitorService:
     async def restart_from_tasks(self) -> None:
         async with self._lock:
             from backend.services.config import get_config_service
-            from tg_signer.core import (
-                _CLIENT_INSTANCES,
-                close_client_by_name,
-                get_client,
-            )
 
-            rules = self._load_rules()
+            rules = await run_io(self._load_rules)
             key = self._rules_key(rules)
             if key == self._active_key and self._handlers_are_active_for(rules):
                 for rule in rules:
@@ -1683,106 +1695,194 @@ class KeywordMonitorService:
             except (TypeError, ValueError):
                 api_id = None
 
-            accounts = sorted({rule.account_name for rule in rules})
+            rules_by_account: dict[str, list[KeywordMonitorRule]] = {}
+            for rule in rules:
+                rules_by_account.setdefault(rule.account_name, []).append(rule)
+            accounts = sorted(rules_by_account)
+
+            # 各账号并发启动（有上限），单个账号代理慢或超时不影响其他账号
+            concurrency = _read_positive_int_env("KEYWORD_MONITOR_START_CONCURRENCY", 8)
+            start_timeout = _read_positive_float_env(
+                "KEYWORD_MONITOR_START_TIMEOUT", 30.0, 1.0
+            )
+            semaphore = asyncio.Semaphore(concurrency)
+            started_at = time.perf_counter()
+
+            async def _start(account_name: str) -> bool:
+                return await self._start_account_monitor(
+                    account_name,
+                    rules_by_account[account_name],
+                    session_dir=session_dir,
+                    global_settings=global_settings,
+                    api_id=api_id,
+                    api_hash=api_hash,
+                    start_timeout=start_timeout,
+                    start_slot=semaphore,
+                )
+
+            results = await asyncio.gather(
+                *(_start(account_name) for account_name in accounts),
+                return_exceptions=True,
+            )
             started_accounts: set[str] = set()
-            for account_name in accounts:
-                account_rules = [rule for rule in rules if rule.account_name == account_name]
-                chat_ids = sorted({rule.chat_id for rule in account_rules})
-                proxy_value = get_account_proxy(account_name)
-                if not proxy_value:
-                    proxy_value = (global_settings.get("global_proxy") or "").strip() or None
-                proxy = build_proxy_dict(proxy_value) if proxy_value else None
-
-                session_mode = get_session_mode()
-                session_string = None
-                in_memory = False
-                if session_mode == "string":
-                    session_string = get_account_session_string(
-                        account_name
-                    ) or load_session_string_file(session_dir, account_name)
-                    in_memory = bool(session_string)
-                    if not session_string:
-                        logger.warning(
-                            "Keyword monitor account %s has no session_string",
-                            account_name,
-                        )
-                        for rule in account_rules:
-                            self._append_rule_log(
-                                rule,
-                                "关键词后台监听启动失败：账号没有可用 session_string",
-                                active=False,
-                            )
-                        continue
+            for account_name, result in zip(accounts, results, strict=True):
+                if isinstance(result, BaseException):
+                    logger.warning(
+                        "Keyword monitor failed to start for %s: %s",
+                        account_name,
+                        result,
+                    )
+                elif result:
+                    started_accounts.add(account_name)
+            logger.info(
+                "Keyword monitor started %d/%d accounts in %.2fs (concurrency=%d)",
+                len(started_accounts),
+                len(accounts),
+                time.perf_counter() - started_at,
+                concurrency,
+            )
 
-                lock = get_account_lock(account_name)
-                async with lock:
-                    client_key = str(session_dir.joinpath(account_name).resolve())
-                    existing = _CLIENT_INSTANCES.get(client_key)
-                    if (
-                        existing is not None
-                        and getattr(existing, "_tg_signpulse_no_updates", None) is True
-                    ):
-                        logger.info(
-                            "Recreating keyword monitor client for %s with updates enabled",
-                            account_name,
-                        )
-                        await close_client_by_name(account_name, workdir=session_dir)
+            self._active_key = key if started_accounts == set(accounts) else ""
 
-                    client = get_client(
+    async def _start_account_monitor(
+        self,
+        account_name: str,
+        account_rules: list[KeywordMonitorRule],
+        *,
+        session_dir: Path,
+        global_settings: Dict[str, Any],
+        api_id: Optional[int],
+        api_hash: Optional[str],
+        start_timeout: float,
+        start_slot: asyncio.Semaphore,
+    ) -> bool:
+        """
+        启动单个账号的监听 client，返回是否成功。
+
+        先等待账号锁（该账号可能正在执行签到任务），拿到锁后才占用启动名额，
+        避免正在等锁的账号占满名额、挡住其他账号启动。
+        """
+        from tg_signer.core import _CLIENT_INSTANCES, close_client_by_name, get_client
+
+        started_at = time.perf_counter()
+        chat_ids = sorted({rule.chat_id for rule in account_rules})
+        proxy_value = get_account_proxy(account_name)
+        if not proxy_value:
+            proxy_value = (global_settings.get("global_proxy") or "").strip() or None
+        proxy = build_proxy_dict(proxy_value) if proxy_value else None
+
+        session_mode = get_session_mode()
+        session_string = None
+        in_memory = False
+        if session_mode == "string":
+            session_string = get_account_session_string(
+                account_name
+            ) or await async_load_session_string_file(session_dir, account_name)
+            in_memory = bool(session_string)
+            if not session_string:
+                logger.warning(
+                    "Keyword monitor account %s has no session_string",
+                    account_name,
+                )
+                for rule in account_rules:
+                    self._append_rule_log(
+                        rule,
+                        "关键词后台监听启动失败：账号没有可用 session_string",
+                        active=False,
+                    )
+                return False
+
+        lock = get_account_lock(account_name)
+        async with lock:
+            lock_wait = time.perf_counter() - started_at
+            async with start_slot:
+                client_key = str(session_dir.joinpath(account_name).resolve())
+                existing = _CLIENT_INSTANCES.get(client_key)
+                if (
+                    existing is not None
+                    and getattr(existing, "_tg_signpulse_no_updates", None) is True
+                ):
+                    logger.info(
+                        "Recreating keyword monitor client for %s with updates enabled",
                         account_name,
-                        proxy=proxy,
-                        workdir=session_dir,
-                        session_string=session_string,
-                        in_memory=in_memory,
-                        api_id=api_id,
-                        api_hash=api_hash,
-                        no_updates=False,
                     )
+                    await close_client_by_name(account_name, workdir=session_dir)
+
+                client = get_client(
+                    account_name,
+                    proxy=proxy,
+                    workdir=session_dir,
+                    session_string=session_string,
+                    in_memory=in_memory,
+                    api_id=api_id,
+                    api_hash=api_hash,
+                    no_updates=False,
+                )
 
-                    async def handler(
-                        client, message: Message, name: str = account_name
-                    ) -> None:
-                        await self._on_message(name, client, message)
+                # 只处理监听 chat 的更新，其他频道的更新不再拉取 difference
+                client.watch_update_chats(_UPDATE_OWNER, chat_ids)
 
-                    handler_ref = client.add_handler(
-                        MessageHandler(
-                            handler,
-                            filters.chat(chat_ids) & (filters.text | filters.caption),
-                        )
+                async def handler(
+                    client, message: Message, name: str = account_name
+                ) -> None:
+                    await self._on_message(name, client, message)
+
+                handler_ref = client.add_handler(
+                    MessageHandler(
+                        handler,
+                        filters.chat(chat_ids) & (filters.text | filters.caption),
                     )
+                )
+                try:
+                    # 超时会取消 __aenter__，其内部会回滚引用计数并停止 client
+                    await asyncio.wait_for(client.__aenter__(), timeout=start_timeout)
+                except Exception as exc:
                     try:
-                        await client.__aenter__()
+                        client.remove_handler(*handler_ref)
                     except Exception:
-                        try:
-                            client.remove_handler(*handler_ref)
-                        except Exception:
-                            pass
+                        pass
+                    client.unwatch_update_chats(_UPDATE_OWNER)
+                    timed_out = isinstance(exc, asyncio.TimeoutError)
+                    if timed_out:
+                        logger.warning(
+                            "Keyword monitor start timed out for %s after %.1fs",
+                            account_name,
+                            start_timeout,
+                        )
+                    else:
                         logger.warning(
                             "Keyword monitor failed to start for %s",
                             account_name,
                             exc_info=True,
                         )
-                        for rule in account_rules:
-                            self._append_rule_log(
-                                rule,
-                                "关键词后台监听启动失败：Telegram client 启动失败，请检查账号登录状态、代理或 API 配置",
-                                active=False,
-                            )
-                        continue
-
-                    self._handler_refs.append((account_name, client, handler_ref))
-                    started_accounts.add(account_name)
-                    logger.info(
-                        "Keyword monitor started for %s in %s", account_name, chat_ids
+                    reason = (
+                        f"Telegram client 启动超时（{start_timeout:g} 秒），请检查代理或网络"
+                        if timed_out
+                        else "Telegram client 启动失败，请检查账号登录状态、代理或 API 配置"
                     )
                     for rule in account_rules:
                         self._append_rule_log(
                             rule,
-                            f"关键词后台监听已启动：{self._describe_rule(rule)}",
-                            active=True,
+                            f"关键词后台监听启动失败：{reason}",
+                            active=False,
                         )
+                    return False
 
-            self._active_key = key if started_accounts == set(accounts) else ""
+                self._handler_refs.append((account_name, client, handler_ref))
+                logger.info(
+                    "Keyword monitor started for %s in %s (%.2fs, lock wait %.2fs)",
+                    account_name,
+                    chat_ids,
+                    time.perf_counter() - started_at,
+                    lock_wait,
+                )
+                for rule in account_rules:
+                    self._append_rule_log(
+                        rule,
+                        f"关键词后台监听已启动：{self._describe_rule(rule)}",
+                        active=True,
+                    )
+                return True
 
     async def stop(self) -> None:
         for rule in self._rules:
@@ -1798,6 +1898,7 @@ class KeywordMonitorService:
                     client.remove_handler(*handler_ref)
                 except Exception:
                     pass
+                client.unwatch_update_chats(_UPDATE_OWNER)
                 try:
                     await client.__aexit__(None, None, None)
                 except Exception:
@@ -1807,6 +1908,13 @@ class KeywordMonitorService:
         self._active_key = ""
         trim_memory()
 
+    def update_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各监听账号收到的更新数与实际分发数（其余在拉取 difference 前被丢弃）"""
+        return {
+            account_name: client.update_filter.stats()
+            for account_name, client, _handler_ref in self._handler_refs
+        }
+
 
 _keyword_monitor_service: Optional[KeywordMonitorService] = None
 
@@ -0,0 +1,558 @@
+"""
+通知发件箱
+
+任务失败、账号失效、登录与关键词命中等通知先写入应用 SQLite 的
+notification_outbox 表，由后台 worker 异步投递：
+
+- 按 bot token / chat / HTTP 主机分别做令牌桶限流，避免整点批量失败时触发 429；
+- 同一 chat 积压的多条 Telegram 消息合并为一条发送；
+- 失败按指数退避重试，429 优先遵循服务端返回的 retry_after；
+- 进程重启后未投递的通知继续发送。
+
+发件箱中不保存 bot token，只保存其摘要（bot_ref）；投递时从本进程入队时记下的
+token 或当前全局配置中找回 token，配置已更换的通知不再投递。数据库读写都在
+文件 I/O 线程池中执行。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import func
+
+from backend.core.database import get_session_local
+from backend.models.notification_outbox import NotificationOutbox
+from backend.utils.file_io import run_io
+from backend.utils.time import utc_now_naive
+from tg_signer.async_utils import create_logged_task
+from tg_signer.latency import LatencyHistogram
+from tg_signer.utils import read_float_env, read_int_env
+
+logger = logging.getLogger("backend.notification_outbox")
+
+KIND_TELEGRAM = "telegram"
+KIND_HTTP = "http"
+
+TELEGRAM_TEXT_LIMIT = 3900
+_BATCH_SEPARATOR = "\n\n" + "—" * 12 + "\n\n"
+
+
+# bot_ref -> bot token，仅保存在内存中
+_bot_tokens: Dict[str, str] = {}
+
+
+def bot_token_ref(bot_token: str) -> str:
+    return hashlib.sha256(str(bot_token).encode("utf-8")).hexdigest()[:32]
+
+
+def _remember_bot_token(bot_token: str) -> str:
+    ref = bot_token_ref(bot_token)
+    _bot_tokens[ref] = bot_token
+    return ref
+
+
+def _resolve_bot_token(payload: Dict[str, Any]) -> str:
+    """按 bot_ref 找回 token：先查本进程记下的，再查当前全局配置"""
+    if payload.get("bot_token"):
+        # 兼容旧版本写入的记录
+        return str(payload["bot_token"])
+    ref = str(payload.get("bot_ref") or "")
+    token = _bot_tokens.get(ref)
+    if token:
+        return token
+    from backend.services.config import get_config_service
+
+    configured = (
+        get_config_service().get_global_settings().get("telegram_bot_token") or ""
+    ).strip()
+    if configured and bot_token_ref(configured) == ref:
+        _bot_tokens[ref] = configured
+        return configured
+    raise DeliveryError("bot token is no longer configured", permanent=True)
+
+
+def outbox_enabled() -> bool:
+    """NOTIFICATION_OUTBOX_ENABLED=0 时退回到调用方直接发送"""
+    return os.getenv("NOTIFICATION_OUTBOX_ENABLED", "1") != "0"
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """距离可以取到一个令牌还需等待的秒数"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        wait = max(self.blocked_until - now, 0.0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        """服务端要求等待（429）时暂停该桶"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class DeliveryError(Exception):
+    def __init__(self, message: str, *, retry_after: Optional[float] = None, permanent: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+
+@dataclass
+class _Item:
+    id: int
+    kind: str
+    destination: str
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: datetime
+
+
+def _telegram_destination(bot_token: str, chat_id: str, message_thread_id: Optional[int]) -> str:
+    bot_id = str(bot_token).split(":", 1)[0]
+    return f"{KIND_TELEGRAM}:{bot_id}:{chat_id}:{message_thread_id or ''}"
+
+
+def _http_destination(url: str) -> str:
+    return f"{KIND_HTTP}:{urlsplit(url).netloc.lower()}"
+
+
+def _retry_after_from_response(response: httpx.Response) -> Optional[float]:
+    try:
+        data = response.json()
+        retry_after = (data.get("parameters") or {}).get("retry_after")
+        if retry_after is not None:
+            return float(retry_after)
+    except Exception:
+        pass
+    header = response.headers.get("Retry-After")
+    try:
+        return float(header) if header else None
+    except ValueError:
+        return None
+
+
+def _classify_error(exc: Exception) -> DeliveryError:
+    if isinstance(exc, DeliveryError):
+        return exc
+    if isinstance(exc, httpx.HTTPStatusError):
+        response = exc.response
+        code = response.status_code
+        if code == 429:
+            return DeliveryError(
+                f"HTTP 429: {response.text[:200]}",
+                retry_after=_retry_after_from_response(response),
+            )
+        # 4xx（token 无效、chat 不存在等）重试也不会成功
+        return DeliveryError(
+            f"HTTP {code}: {response.text[:200]}",
+            permanent=400 <= code < 500 and code not in (408, 409),
+        )
+    return DeliveryError(f"{type(exc).__name__}: {exc}")
+
+
+async def deliver(kind: str, payload: Dict[str, Any]) -> None:
+    """实际发送一条通知，失败时抛出异常"""
+    from backend.services.push_notifications import (
+        send_http_request,
+        send_telegram_bot_message,
+    )
+
+    if kind == KIND_TELEGRAM:
+        await send_telegram_bot_message(
+            bot_token=_resolve_bot_token(payload),
+            chat_id=payload["chat_id"],
+            text=payload["text"],
+            message_thread_id=payload.get("message_thread_id"),
+        )
+    elif kind == KIND_HTTP:
+        await send_http_request(
+            payload.get("method") or "POST",
+            payload["url"],
+            json_body=payload.get("json"),
+        )
+    else:
+        raise DeliveryError(f"unknown notification kind: {kind}", permanent=True)
+
+
+class NotificationOutboxService:
+    def __init__(self):
+        self.poll_batch_size = read_int_env("NOTIFICATION_OUTBOX_BATCH_SIZE", 100, 1)
+        self.batch_window = read_float_env("NOTIFICATION_BATCH_WINDOW_SECONDS", 1.0, 0.0)
+        self.max_attempts = read_int_env("NOTIFICATION_MAX_ATTEMPTS", 8, 1)
+        self.retry_base = read_float_env("NOTIFICATION_RETRY_BASE_SECONDS", 5.0, 0.1)
+        self.retry_max = read_float_env("NOTIFICATION_RETRY_MAX_SECONDS", 900.0, 1.0)
+        self.bot_rate = read_float_env("NOTIFICATION_BOT_RATE_PER_SECOND", 25.0, 0.1)
+        self.chat_rate = (
+            read_float_env("NOTIFICATION_CHAT_RATE_PER_MINUTE", 20.0, 1.0) / 60
+        )
+        self.chat_burst = read_float_env("NOTIFICATION_CHAT_BURST", 3.0, 1.0)
+        self.http_rate = read_float_env("NOTIFICATION_HTTP_RATE_PER_SECOND", 5.0, 0.1)
+        self.failed_retention = timedelta(
+            days=read_float_env("NOTIFICATION_FAILED_RETENTION_DAYS", 7.0, 0.0)
+        )
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.latency = LatencyHistogram()
+        self.delivered = 0
+        self.merged = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.dropped = 0
+
+    async def enqueue_telegram(
+        self,
+        *,
+        bot_token: str,
+        chat_id: str,
+        text: str,
+        message_thread_id: Optional[int] = None,
+    ) -> None:
+        payload = {
+            "bot_ref": _remember_bot_token(bot_token),
+            "chat_id": str(chat_id),
+            "text": text,
+            "message_thread_id": message_thread_id,
+        }
+        await self._submit(
+            KIND_TELEGRAM,
+            _telegram_destination(bot_token, chat_id, message_thread_id),
+            payload,
+        )
+
+    async def enqueue_http(
+        self, method: str, url: str, json_body: Optional[Dict[str, Any]] = None
+    ) -> None:
+        payload = {"method": method.upper(), "url": url, "json": json_body}
+        await self._submit(KIND_HTTP, _http_destination(url), payload)
+
+    async def _submit(self, kind: str, destination: str, payload: Dict[str, Any]) -> None:
+        if outbox_enabled():
+            try:
+                await run_io(self._insert, kind, destination, payload)
+            except Exception as e:
+                logger.warning(f"通知写入发件箱失败，改为直接发送: {e}")
+            else:
+                if self._wake is not None:
+                    self._wake.set()
+                return
+        await deliver(kind, payload)
+
+    def _insert(self, kind: str, destination: str, payload: Dict[str, Any]) -> None:
+        with get_session_local()() as db:
+            db.add(
+                NotificationOutbox(
+                    kind=kind,
+                    destination=destination,
+                    payload=json.dumps(payload, ensure_ascii=False),
+                )
+            )
+            db.commit()
+
+    def start(self) -> None:
+        if not outbox_enabled() or (self._task is not None and not self._task.done()):
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._purge_failed()
+        self._task = create_logged_task(
+            self._run(),
+            logger=logger,
+            description="notification outbox worker",
+        )
+
+    async def stop(self) -> None:
+        self._stopping = True
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                delay = await self._drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"通知发件箱投递异常: {e}")
+                delay = 5.0
+            if delay <= 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                continue
+            # 给同一时刻的其他通知一点时间入队，以便合并发送
+            if self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+
+    def _fetch_due(self) -> Tuple[List[_Item], Optional[datetime]]:
+        now = utc_now_naive()
+        with get_session_local()() as db:
+            rows = (
+                db.query(NotificationOutbox)
+                .filter(
+                    NotificationOutbox.status == "pending",
+                    NotificationOutbox.next_attempt_at <= now,
+                )
+                .order_by(NotificationOutbox.id)
+                .limit(self.poll_batch_size)
+                .all()
+            )
+            next_due = None
+            if not rows:
+                next_due = (
+                    db.query(func.min(NotificationOutbox.next_attempt_at))
+                    .filter(NotificationOutbox.status == "pending")
+                    .scalar()
+                )
+            items = []
+            for row in rows:
+                try:
+                    payload = json.loads(row.payload)
+                except (TypeError, ValueError):
+                    payload = None
+                if not isinstance(payload, dict):
+                    row.status = "failed"
+                    row.last_error = "invalid payload"
+                    continue
+                items.append(
+                    _Item(row.id, row.kind, row.destination, payload, row.attempts, row.created_at)
+                )
+            db.commit()
+        return items, next_due
+
+    async def _drain_once(self) -> float:
+        """投递一轮到期通知，返回距离下一轮的等待秒数"""
+        items, next_due = await run_io(self._fetch_due)
+        if not items:
+            if next_due is None:
+                return 60.0
+            return min(max((next_due - utc_now_naive()).total_seconds(), 0.1), 60.0)
+
+        groups: "OrderedDict[str, List[_Item]]" = OrderedDict()
+        for item in items:
+            groups.setdefault(item.destination, []).append(item)
+        await asyncio.gather(
+            *(self._deliver_destination(group) for group in groups.values())
+        )
+        return 0.0 if len(items) >= self.poll_batch_size else 0.1
+
+    def _bucket(self, key: str, rate: float, capacity: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _buckets_for(self, item: _Item) -> List[TokenBucket]:
+        if item.kind == KIND_TELEGRAM:
+            bot_id = item.destination.split(":")[1]
+            return [
+                self._bucket(f"bot:{bot_id}", self.bot_rate, self.bot_rate),
+                self._bucket(f"chat:{item.destination}", self.chat_rate, self.chat_burst),
+            ]
+        return [self._bucket(item.destination, self.http_rate, self.http_rate)]
+
+    def _merge_batches(self, items: List[_Item]) -> List[Tuple[List[_Item], Dict[str, Any]]]:
+        """同一 chat 的多条 Telegram 文本在长度限制内合并为一条"""
+        if items[0].kind != KIND_TELEGRAM:
+            return [([item], item.payload) for item in items]
+        batches: List[Tuple[List[_Item], Dict[str, Any]]] = []
+        current: List[_Item] = []
+        texts: List[str] = []
+        size = 0
+        for item in items:
+            text = str(item.payload.get("text") or "")
+            extra = len(text) + (len(_BATCH_SEPARATOR) if texts else 0)
+            if current and size + extra > TELEGRAM_TEXT_LIMIT:
+                batches.append((current, dict(current[0].payload, text=_BATCH_SEPARATOR.join(texts))))
+                current, texts, size = [], [], 0
+                extra = len(text)
+            current.append(item)
+            texts.append(text)
+            size += extra
+        if current:
+            batches.append((current, dict(current[0].payload, text=_BATCH_SEPARATOR.join(texts))))
+        return batches
+
+    async def _deliver_destination(self, items: List[_Item]) -> None:
+        batches = self._merge_batches(items)
+        for index, (batch, payload) in enumerate(batches):
+            remaining = [item for pending, _ in batches[index:] for item in pending]
+            buckets = self._buckets_for(batch[0])
+            wait = max(bucket.wait_time() for bucket in buckets)
+            if wait > 0:
+                await run_io(self._defer, remaining, wait)
+                return
+            for bucket in buckets:
+                bucket.consume()
+
+            try:
+                await deliver(batch[0].kind, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                error = _classify_error(exc)
+                if error.retry_after is not None:
+                    self.rate_limited += 1
+                    # 429 可能来自 bot 级别的全局限流，bot 与 chat 的桶一起暂停
+                    for bucket in buckets:
+                        bucket.block(error.retry_after)
+                    await run_io(self._defer, remaining, error.retry_after)
+                    logger.info(
+                        f"通知目标 {batch[0].destination} 触发限流，{error.retry_after:g}s 后重试"
+                    )
+                    return
+                delay = await run_io(self._record_failure, batch, error)
+                # 同一目标后续的通知也推迟，避免对故障端点连续请求
+                await run_io(self._defer, remaining[len(batch):], delay)
+                return
+            await run_io(self._record_delivered, batch)
+            if len(batch) > 1:
+                self.merged += len(batch) - 1
+
+    def _defer(self, items: List[_Item], seconds: float) -> None:
+        if not items:
+            return
+        until = utc_now_naive() + timedelta(seconds=seconds)
+        with get_session_local()() as db:
+            db.query(NotificationOutbox).filter(
+                NotificationOutbox.id.in_([item.id for item in items])
+            ).update({NotificationOutbox.next_attempt_at: until}, synchronize_session=False)
+            db.commit()
+
+    def _record_delivered(self, items: List[_Item]) -> None:
+        now = utc_now_naive()
+        for item in items:
+            self.latency.add((now - item.created_at).total_seconds())
+        self.delivered += len(items)
+        with get_session_local()() as db:
+            db.query(NotificationOutbox).filter(
+                NotificationOutbox.id.in_([item.id for item in items])
+            ).delete(synchronize_session=False)
+            db.commit()
+
+    def _record_failure(self, items: List[_Item], error: DeliveryError) -> float:
+        attempts = max(item.attempts for item in items) + 1
+        delay = min(self.retry_base * (2 ** (attempts - 1)), self.retry_max)
+        delay *= random.uniform(0.8, 1.2)
+        give_up = error.permanent or attempts >= self.max_attempts
+        with get_session_local()() as db:
+            rows = (
+                db.query(NotificationOutbox)
+                .filter(NotificationOutbox.id.in_([item.id for item in items]))
+                .all()
+            )
+            for row in rows:
+                row.attempts = attempts
+                row.last_error = str(error)[:500]
+                if give_up:
+                    row.status = "failed"
+                else:
+                    row.next_attempt_at = utc_now_naive() + timedelta(seconds=delay)
+            db.commit()
+        if give_up:
+            self.dropped += len(items)
+            logger.warning(
+                f"通知投递到 {items[0].destination} 失败（第 {attempts} 次），不再重试: {error}"
+            )
+        else:
+            self.retries += len(items)
+            logger.info(
+                f"通知投递到 {items[0].destination} 失败（第 {attempts} 次），{delay:.0f}s 后重试: {error}"
+            )
+        return delay
+
+    def _purge_failed(self) -> None:
+        cutoff = utc_now_naive() - self.failed_retention
+        try:
+            with get_session_local()() as db:
+                db.query(NotificationOutbox).filter(
+                    NotificationOutbox.status == "failed",
+                    NotificationOutbox.created_at < cutoff,
+                ).delete(synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            logger.debug(f"清理失败通知记录出错: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        now = utc_now_naive()
+        with get_session_local()() as db:
+            counts = dict(
+                db.query(NotificationOutbox.status, func.count(NotificationOutbox.id))
+                .group_by(NotificationOutbox.status)
+                .all()
+            )
+            oldest = (
+                db.query(func.min(NotificationOutbox.created_at))
+                .filter(NotificationOutbox.status == "pending")
+                .scalar()
+            )
+        return {
+            "enabled": outbox_enabled(),
+            "running": self._task is not None and not self._task.done(),
+            "queue_depth": counts.get("pending", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_seconds": (
+                round((now - oldest).total_seconds(), 1) if oldest else None
+            ),
+            "delivered": self.delivered,
+            "merged": self.merged,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "dropped": self.dropped,
+            "latency": {
+                "p50": self.latency.quantile(0.5),
+                "p90": self.latency.quantile(0.9),
+                "p99": self.latency.quantile(0.99),
+                "max": round(self.latency.max_ms / 1000, 3),
+            },
+        }
+
+
+_notification_outbox: Optional[NotificationOutboxService] = None
+
+
+def get_notification_outbox() -> NotificationOutboxService:
+    global _notification_outbox
+    if _notification_outbox is None:
+        _notification_outbox = NotificationOutboxService()
+    return _notification_outbox
@@ -6,6 +6,8 @@ from urllib.parse import quote
 
 import httpx
 
+from backend.services.notification_outbox import get_notification_outbox
+
 logger = logging.getLogger("backend.push_notifications")
 
 _http_client: Optional[httpx.AsyncClient] = None
@@ -59,6 +61,17 @@ async def send_telegram_bot_message(
     response.raise_for_status()
 
 
+async def send_http_request(
+    method: str, url: str, *, json_body: Optional[Dict[str, Any]] = None
+) -> None:
+    client = _get_http_client()
+    if method.upper() == "GET":
+        response = await client.get(url)
+    else:
+        response = await client.request(method.upper(), url, json=json_body)
+    response.raise_for_status()
+
+
 async def send_keyword_push(settings: Dict[str, Any], payload: Dict[str, Any]) -> None:
     channel = (settings.get("keyword_monitor_push_channel") or "telegram").strip()
     title = str(payload.get("title") or "TG-SignPulse 关键词命中")
@@ -74,7 +87,7 @@ async def send_keyword_push(settings: Dict[str, Any], payload: Dict[str, Any]) -
         text = f"{title}\n\n{body}"
         if url:
             text += f"\n\n链接: {url}"
-        await send_telegram_bot_message(
+        await get_notification_outbox().enqueue_telegram(
             bot_token=bot_token,
             chat_id=chat_id,
             text=text,
@@ -92,9 +105,7 @@ async def send_keyword_push(settings: Dict[str, Any], payload: Dict[str, Any]) -
         data = {"title": title, "body": body}
         if url:
             data["url"] = url
-        client = _get_http_client()
-        response = await client.post(bark_url, json=data)
-        response.raise_for_status()
+        await get_notification_outbox().enqueue_http("POST", bark_url, data)
         return
 
     custom_url = (settings.get("keyword_monitor_custom_url") or "").strip()
@@ -107,19 +118,16 @@ async def send_keyword_push(settings: Dict[str, Any], payload: Dict[str, Any]) -
     request_payload["body"] = body
     request_payload["url"] = url
 
-    client = _get_http_client()
     if any(token in custom_url for token in ("{title}", "{body}", "{url}")):
         final_url = (
             custom_url.replace("{title}", quote(title))
             .replace("{body}", quote(body))
             .replace("{url}", quote(url))
         )
-        response = await client.get(final_url)
-        response.raise_for_status()
+        await get_notification_outbox().enqueue_http("GET", final_url)
         return
 
-    response = await client.post(custom_url, json=request_payload)
-    response.raise_for_status()
+    await get_notification_outbox().enqueue_http("POST", custom_url, request_payload)
 
 
 async def send_login_notification(
@@ -144,7 +152,7 @@ async def send_login_notification(
         f"用户: {username}\n"
         f"IP: {ip_address or 'unknown'}"
     )
-    await send_telegram_bot_message(
+    await get_notification_outbox().enqueue_telegram(
         bot_token=bot_token,
         chat_id=chat_id,
         text=text,
@@ -0,0 +1,39 @@
+"""
+后端签到执行器
+从 sign_tasks 中拆出，避免导入服务层时连带加载 Pyrogram
+"""
+
+from __future__ import annotations
+
+from tg_signer.core import UserSigner
+
+
+class BackendUserSigner(UserSigner):
+    """
+    后端专用的 UserSigner，适配后端目录结构并禁止交互式输入
+    """
+
+    @property
+    def task_dir(self):
+        # 适配后端的目录结构: signs_dir / account_name / task_name
+        # self.tasks_dir -> workdir/signs
+        account_task_dir = self.tasks_dir / self._account / self.task_name
+        if (account_task_dir / "config.json").exists():
+            return account_task_dir
+        legacy_task_dir = self.tasks_dir / self.task_name
+        if (legacy_task_dir / "config.json").exists():
+            return legacy_task_dir
+        return account_task_dir
+
+    def ask_for_config(self):
+        raise ValueError(
+            f"任务配置文件不存在: {self.config_file}，且后端模式下禁止交互式输入。"
+        )
+
+    def reconfig(self):
+        raise ValueError(
+            f"任务配置文件不存在: {self.config_file}，且后端模式下禁止交互式输入。"
+        )
+
+    def ask_one(self):
+        raise ValueError("后端模式下禁止交互式输入")
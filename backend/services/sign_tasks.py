@@ -6,38 +6,54 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import functools
 import json
 import logging
 import os
 import re
+import threading
 import time
 import traceback
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
 
 from backend.core.config import get_settings
 from backend.utils.account_locks import get_account_lock
+from backend.utils.file_io import file_write_lock, run_io
 from backend.utils.memory import trim_memory
 from backend.utils.names import validate_storage_name
 from backend.utils.proxy import build_proxy_dict
 from backend.utils.task_logs import extract_last_target_message, normalize_log_line
 from backend.utils.tg_session import (
+    async_load_session_string_file,
     get_account_proxy,
     get_account_session_string,
     get_account_status,
     get_global_semaphore,
     get_session_mode,
+    invalidate_account_session_verified,
+    is_account_session_recently_verified,
     list_account_names,
-    load_session_string_file,
+    mark_account_session_verified,
     set_account_status,
 )
 from backend.utils.time import utc_now_iso
 from tg_signer.async_utils import create_logged_task
-from tg_signer.core import UserSigner, get_client
+from tg_signer.chat_directory import get_chat_directory
+from tg_signer.latency import (
+    FOLLOWUP_LATENCY_KEY,
+    LatencyStats,
+    default_action_timeout,
+    followup_timeout,
+)
 from tg_signer.utils import atomic_write_json
 
+if TYPE_CHECKING:
+    from backend.services.sign_signer import BackendUserSigner
+
 settings = get_settings()
 
 _service_logger = logging.getLogger("backend.sign_tasks")
@@ -51,6 +67,36 @@ def _safe_print(*args, sep: str = " ", end: str = "\n") -> None:
 print = _safe_print
 
 
+@functools.lru_cache(maxsize=4096)
+async def _run_signer_with_timeout(signer: Any, timeout: float) -> None:
+    """
+    执行 signer.run_once，超时从开始计算，但不包括排队等待全局并发名额的时间
+    （预热模式下名额在 signer 内部获取），避免集中触发时任务在队列中耗尽超时。
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    task = asyncio.ensure_future(signer.run_once(num_of_dialogs=20))
+    try:
+        while True:
+            now = loop.time()
+            remaining = started + timeout + signer.slot_wait_elapsed(now) - now
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({task}, timeout=remaining)
+            if done:
+                return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+def _clean_account_name(value: str) -> str:
+    # 每个任务配置都会重复校验同一批账号名，缓存校验结果
+    return validate_storage_name(value, field_name="account_name")
+
+
 class TaskLogHandler(logging.Handler):
     """
     自定义日志处理器，将日志实时写入到内存列表中
@@ -71,37 +117,6 @@ class TaskLogHandler(logging.Handler):
             self.handleError(record)
 
 
-class BackendUserSigner(UserSigner):
-    """
-    后端专用的 UserSigner，适配后端目录结构并禁止交互式输入
-    """
-
-    @property
-    def task_dir(self):
-        # 适配后端的目录结构: signs_dir / account_name / task_name
-        # self.tasks_dir -> workdir/signs
-        account_task_dir = self.tasks_dir / self._account / self.task_name
-        if (account_task_dir / "config.json").exists():
-            return account_task_dir
-        legacy_task_dir = self.tasks_dir / self.task_name
-        if (legacy_task_dir / "config.json").exists():
-            return legacy_task_dir
-        return account_task_dir
-
-    def ask_for_config(self):
-        raise ValueError(
-            f"任务配置文件不存在: {self.config_file}，且后端模式下禁止交互式输入。"
-        )
-
-    def reconfig(self):
-        raise ValueError(
-            f"任务配置文件不存在: {self.config_file}，且后端模式下禁止交互式输入。"
-        )
-
-    def ask_one(self):
-        raise ValueError("后端模式下禁止交互式输入")
-
-
 class SignTaskService:
     """签到任务服务类"""
 
@@ -141,6 +156,10 @@ class SignTaskService:
         self._run_status_cleanup_tasks: Dict[tuple[str, str], asyncio.Task] = {}
         self._background_run_tasks: Dict[tuple[str, str], asyncio.Task] = {}
         self._tasks_cache = None  # 内存缓存
+        # 任务列表可能在文件 I/O 线程中重建：失效/更新时递增代数，
+        # 过期的扫描结果不会覆盖缓存
+        self._tasks_cache_lock = threading.Lock()
+        self._tasks_cache_generation = 0
         self._account_locks: Dict[str, asyncio.Lock] = {}  # 账号锁
         self._account_last_run_end: Dict[str, float] = {}  # 账号最后一次结束时间
         self._account_cooldown_seconds = int(
@@ -155,7 +174,17 @@ class SignTaskService:
         self._history_max_line_chars = self._read_positive_int_env(
             "SIGN_TASK_HISTORY_MAX_LINE_CHARS", 2000, 80
         )
+        # 账号最近一次成功连接后，在该时间窗口内跳过运行前的独立探活
+        self._account_status_ttl_seconds = self._read_positive_int_env(
+            "SIGN_TASK_ACCOUNT_STATUS_TTL", 1800, 0
+        )
         self._max_account_last_run_entries = 100  # Bound account tracking
+        # Chat 列表后台刷新：每个账号最多一个刷新任务，结果推送给订阅者
+        self._chat_refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._chat_subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._chat_refresh_max_defer = self._read_positive_int_env(
+            "CHAT_REFRESH_MAX_DEFER_SECONDS", 300, 0
+        )
         self._cleanup_old_logs()
 
     def _prune_stale_entries(self) -> None:
@@ -531,17 +560,21 @@ class SignTaskService:
         account_name: Optional[str] = None,
     ) -> List[str]:
         ordered: List[str] = []
+        # 共享任务的 account_names 可能有上千项，用集合去重避免 O(n²)
+        seen: set[str] = set()
 
         def _append(value: Optional[str]) -> None:
             if not isinstance(value, str):
                 return
             # Preserve wildcard marker
             if value.strip() == "*":
-                if "*" not in ordered:
+                if "*" not in seen:
+                    seen.add("*")
                     ordered.append("*")
                 return
-            cleaned = validate_storage_name(value, field_name="account_name")
-            if cleaned and cleaned not in ordered:
+            cleaned = _clean_account_name(value)
+            if cleaned and cleaned not in seen:
+                seen.add(cleaned)
                 ordered.append(cleaned)
 
         if account_names:
@@ -604,7 +637,7 @@ class SignTaskService:
                 except Exception:
                     pass
 
-        self._tasks_cache = None
+        self._invalidate_tasks_cache()
 
     def _resolve_account_names_from_config(
         self,
@@ -933,28 +966,48 @@ class SignTaskService:
             config_file = task_dir / "config.json"
             if config_file.exists():
                 try:
-                    with open(config_file, "r", encoding="utf-8") as f:
-                        config = json.load(f)
-                    if last_run:
-                        config["last_run"] = last_run
-                    else:
-                        config.pop("last_run", None)
-                    with open(config_file, "w", encoding="utf-8") as f:
-                        json.dump(config, f, ensure_ascii=False, indent=2)
+                    with file_write_lock(config_file):
+                        with open(config_file, "r", encoding="utf-8") as f:
+                            config = json.load(f)
+                        if last_run:
+                            config["last_run"] = last_run
+                        else:
+                            config.pop("last_run", None)
+                        atomic_write_json(config_file, config, indent=2)
                 except Exception:
                     pass
 
-        if self._tasks_cache is not None:
-            for task in self._tasks_cache:
+        self._update_cached_last_run(task_name, account_name, last_run)
+
+    def _invalidate_tasks_cache(self) -> None:
+        """清空任务列表缓存；正在扫描中的结果不会再写回缓存"""
+        with self._tasks_cache_lock:
+            self._tasks_cache = None
+            self._tasks_cache_generation += 1
+
+    def _update_cached_last_run(
+        self,
+        task_name: Optional[str],
+        account_name: str = "",
+        last_run: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """就地更新缓存中任务的 last_run；task_name 为 None 时更新全部任务"""
+        with self._tasks_cache_lock:
+            self._tasks_cache_generation += 1
+            for task in self._tasks_cache or []:
                 if not isinstance(task, dict):
                     continue
-                if task.get("name") != task_name or task.get("account_name") != account_name:
+                if task_name is not None and (
+                    task.get("name") != task_name
+                    or task.get("account_name") != account_name
+                ):
                     continue
                 if last_run:
                     task["last_run"] = last_run
                 else:
                     task.pop("last_run", None)
-                break
+                if task_name is not None:
+                    break
 
     def _legacy_get_task_history_logs(
         self, task_name: str, account_name: str, limit: int = 20
@@ -1217,36 +1270,36 @@ class SignTaskService:
         if history_file is None:
             return False
 
-        raw_entries = self._load_history_payload_from_file(history_file)
-        kept_entries: List[Any] = []
-        deleted = False
+        with file_write_lock(history_file):
+            raw_entries = self._load_history_payload_from_file(history_file)
+            kept_entries: List[Any] = []
+            deleted = False
 
-        for entry in raw_entries:
-            if not isinstance(entry, dict):
-                kept_entries.append(entry)
-                continue
+            for entry in raw_entries:
+                if not isinstance(entry, dict):
+                    kept_entries.append(entry)
+                    continue
 
-            entry_time = str(entry.get("time") or "")
-            entry_account = str(entry.get("account_name") or "")
-            account_matches = not entry_account or entry_account == normalized_account
+                entry_time = str(entry.get("time") or "")
+                entry_account = str(entry.get("account_name") or "")
+                account_matches = not entry_account or entry_account == normalized_account
 
-            if not deleted and entry_time == target_time and account_matches:
-                deleted = True
-                continue
+                if not deleted and entry_time == target_time and account_matches:
+                    deleted = True
+                    continue
 
-            kept_entries.append(entry)
+                kept_entries.append(entry)
 
-        if not deleted:
-            return False
+            if not deleted:
+                return False
 
-        if kept_entries:
-            with open(history_file, "w", encoding="utf-8") as f:
-                json.dump(kept_entries, f, ensure_ascii=False, indent=2)
-        else:
-            try:
-                history_file.unlink()
-            except FileNotFoundError:
-                pass
+            if kept_entries:
+                atomic_write_json(history_file, kept_entries, indent=2)
+            else:
+                try:
+                    history_file.unlink()
+                except FileNotFoundError:
+                    pass
 
         remaining_entries = [
             entry
@@ -1316,10 +1369,7 @@ class SignTaskService:
             seen_tasks.add(key)
             self._clear_task_last_run_metadata(task_name, account_name)
 
-        if self._tasks_cache is not None:
-            for task in self._tasks_cache:
-                if isinstance(task, dict):
-                    task.pop("last_run", None)
+        self._update_cached_last_run(None)
 
         for history_file in self.run_history_dir.glob("*.json"):
             try:
@@ -1351,11 +1401,7 @@ class SignTaskService:
                 continue
 
             self._clear_task_last_run_metadata(task_name, account_name)
-            if self._tasks_cache is not None:
-                for t in self._tasks_cache:
-                    if t["name"] == task_name and t.get("account_name") == account_name:
-                        t.pop("last_run", None)
-                        break
+            self._update_cached_last_run(task_name, account_name, None)
 
             history_file = self._history_file_path(task_name, account_name)
             if history_file.exists():
@@ -1465,6 +1511,7 @@ class SignTaskService:
         message: str = "",
         account_name: str = "",
         flow_logs: Optional[List[str]] = None,
+        fire_offset: Optional[float] = None,
     ):
         """保存任务执行历史 (保留列表)"""
         from datetime import datetime
@@ -1485,26 +1532,27 @@ class SignTaskService:
             "flow_line_count": flow_line_count,
             "last_target_message": last_target_message,
         }
+        if fire_offset is not None:
+            new_entry["fire_offset"] = round(float(fire_offset), 3)
 
-        history = []
-        if history_file.exists():
-            try:
-                with open(history_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        history = data
-                    else:
-                        history = [data]
-            except Exception:
+        try:
+            with file_write_lock(history_file):
                 history = []
+                if history_file.exists():
+                    try:
+                        with open(history_file, "r", encoding="utf-8") as f:
+                            data = json.load(f)
+                            if isinstance(data, list):
+                                history = data
+                            else:
+                                history = [data]
+                    except Exception:
+                        history = []
 
-        history.insert(0, new_entry)
-        # 只保留最近 N 条
-        history = history[: self._history_max_entries]
-
-        try:
-            with open(history_file, "w", encoding="utf-8") as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
+                history.insert(0, new_entry)
+                # 只保留最近 N 条
+                history = history[: self._history_max_entries]
+                atomic_write_json(history_file, history, indent=2)
 
             # 同时更新任务配置中的 last_run
             # 1. 更新磁盘上的 config.json
@@ -1522,20 +1570,16 @@ class SignTaskService:
                 config_file = task_dir / "config.json"
                 if config_file.exists():
                     try:
-                        with open(config_file, "r", encoding="utf-8") as f:
-                            config = json.load(f)
-                        config["last_run"] = new_entry
-                        with open(config_file, "w", encoding="utf-8") as f:
-                            json.dump(config, f, ensure_ascii=False, indent=2)
+                        with file_write_lock(config_file):
+                            with open(config_file, "r", encoding="utf-8") as f:
+                                config = json.load(f)
+                            config["last_run"] = new_entry
+                            atomic_write_json(config_file, config, indent=2)
                     except Exception as e:
                         _service_logger.debug(f"更新任务配置 last_run 失败: {e}")
 
             # 2. 更新内存缓存 (关键优化：避免置空 self._tasks_cache)
-            if self._tasks_cache is not None:
-                for t in self._tasks_cache:
-                    if t["name"] == task_name and t.get("account_name") == account_name:
-                        t["last_run"] = new_entry
-                        break
+            self._update_cached_last_run(task_name, account_name, new_entry)
 
         except Exception as e:
             _service_logger.debug(f"保存运行信息失败: {str(e)}")
@@ -1573,6 +1617,7 @@ class SignTaskService:
         message: str,
         last_target_message: Optional[str] = None,
         flow_logs: Optional[List[str]] = None,
+        target_chat_ids: Optional[List[Any]] = None,
     ) -> None:
         try:
             from backend.services.config import get_config_service
@@ -1607,13 +1652,19 @@ class SignTaskService:
                 text += f"\nLast target message: {last_target_message}"
             if log_tail:
                 text += f"\n\n最近日志:\n{log_tail}"
-            from backend.services.push_notifications import send_telegram_bot_message
+            from backend.services.failure_digest import get_failure_digest
 
-            await send_telegram_bot_message(
+            # 同一时段内相同原因的失败合并为一条汇总
+            await get_failure_digest().add(
                 bot_token=bot_token,
                 chat_id=chat_id,
-                text=text,
                 message_thread_id=message_thread_id,
+                account_name=account_name,
+                task_name=task_name,
+                target_chat_ids=target_chat_ids or [],
+                message=message,
+                text=text,
+                flow_logs=flow_logs,
             )
         except Exception as e:
             logging.getLogger("backend.sign_tasks").warning(
@@ -1653,9 +1704,9 @@ class SignTaskService:
                 f"原因: {message or 'session 已失效，请重新登录'}\n\n"
                 "该账号下的任务已跳过。"
             )
-            from backend.services.push_notifications import send_telegram_bot_message
+            from backend.services.notification_outbox import get_notification_outbox
 
-            await send_telegram_bot_message(
+            await get_notification_outbox().enqueue_telegram(
                 bot_token=bot_token,
                 chat_id=chat_id,
                 text=text,
@@ -1673,6 +1724,7 @@ class SignTaskService:
         message: str,
         notify_on_failure: bool = True,
     ) -> bool:
+        invalidate_account_session_verified(account_name)
         current = get_account_status(account_name)
         already_notified = bool(current.get("invalid_notified_at"))
         notified_at = current.get("invalid_notified_at") or utc_now_iso()
@@ -1713,6 +1765,13 @@ class SignTaskService:
             )
             return message
 
+        # 运行本身会 connect + get_me，近期已验证过的账号无需再单独探活；
+        # 鉴权错误会在运行中被识别并使缓存失效
+        if is_account_session_recently_verified(
+            account_name, self._account_status_ttl_seconds
+        ):
+            return None
+
         try:
             from backend.services.telegram import get_telegram_service
 
@@ -1937,7 +1996,7 @@ class SignTaskService:
             raise
 
         # Invalidate cache
-        self._tasks_cache = None
+        self._invalidate_tasks_cache()
 
         try:
             from backend.scheduler import add_or_update_sign_task_job
@@ -2031,7 +2090,7 @@ class SignTaskService:
             json.dump(config, f, ensure_ascii=False, indent=2)
 
         # Invalidate cache
-        self._tasks_cache = None
+        self._invalidate_tasks_cache()
 
         try:
             from backend.scheduler import add_or_update_sign_task_job
@@ -2100,7 +2159,7 @@ class SignTaskService:
 
             shutil.rmtree(task_dir)
             # Invalidate cache
-            self._tasks_cache = None
+            self._invalidate_tasks_cache()
 
             if real_account_name:
                 try:
@@ -2154,6 +2213,7 @@ class SignTaskService:
                             item.get("last_target_message") or ""
                         ).strip()
                         or extract_last_target_message(flow_logs),
+                        "fire_offset": item.get("fire_offset"),
                     }
                 )
             return result
@@ -2177,47 +2237,72 @@ class SignTaskService:
         merged.sort(key=lambda item: str(item.get("time") or ""), reverse=True)
         return merged[:limit]
 
-    def list_tasks(
+    # 以下异步接口在文件 I/O 线程池中执行对应的同步方法，供协程调用，
+    # 避免读写任务配置/历史文件时阻塞事件循环
+
+    async def async_list_tasks(
         self,
         account_name: Optional[str] = None,
         force_refresh: bool = False,
         aggregate: bool = False,
     ) -> List[Dict[str, Any]]:
-        """Return sign tasks, optionally grouped by shared task set."""
-        tasks: List[Dict[str, Any]]
-        if self._tasks_cache is not None and not force_refresh:
-            tasks = self._tasks_cache
-        else:
-            tasks = []
-            base_dir = self.signs_dir
-
-            _service_logger.debug(f"扫描任务目录: {base_dir}")
-            try:
-                for account_path in base_dir.iterdir():
-                    if not account_path.is_dir():
-                        continue
+        return await run_io(
+            self.list_tasks,
+            account_name=account_name,
+            force_refresh=force_refresh,
+            aggregate=aggregate,
+        )
 
-                    if (account_path / "config.json").exists():
-                        task_info = self._load_task_config(account_path)
-                        if task_info:
-                            tasks.append(task_info)
-                        continue
+    async def async_get_task_history_logs(
+        self, task_name: str, account_name: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        return await run_io(
+            self.get_task_history_logs,
+            task_name=task_name,
+            account_name=account_name,
+            limit=limit,
+        )
 
-                    for task_dir in account_path.iterdir():
-                        if not task_dir.is_dir():
-                            continue
+    async def async_save_run_info(
+        self,
+        task_name: str,
+        success: bool,
+        message: str = "",
+        account_name: str = "",
+        flow_logs: Optional[List[str]] = None,
+        fire_offset: Optional[float] = None,
+    ) -> None:
+        await run_io(
+            self._save_run_info,
+            task_name,
+            success,
+            message,
+            account_name,
+            flow_logs=flow_logs,
+            fire_offset=fire_offset,
+        )
 
-                        task_info = self._load_task_config(task_dir)
-                        if task_info:
-                            tasks.append(task_info)
+    async def async_expand_wildcard_tasks(self) -> None:
+        await run_io(self._expand_wildcard_tasks)
 
-                self._tasks_cache = sorted(
-                    tasks, key=lambda item: (item["account_name"], item["name"])
-                )
-                tasks = self._tasks_cache
-            except Exception as e:
-                _service_logger.debug(f"扫描任务出错: {str(e)}")
+    def list_tasks(
+        self,
+        account_name: Optional[str] = None,
+        force_refresh: bool = False,
+        aggregate: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Return sign tasks, optionally grouped by shared task set."""
+        tasks = self._tasks_cache
+        if tasks is None or force_refresh:
+            with self._tasks_cache_lock:
+                generation = self._tasks_cache_generation
+            scanned = self._scan_tasks()
+            if scanned is None:
                 return []
+            with self._tasks_cache_lock:
+                if generation == self._tasks_cache_generation:
+                    self._tasks_cache = scanned
+            tasks = scanned
 
         if account_name:
             tasks = [
@@ -2228,6 +2313,35 @@ class SignTaskService:
             return self._aggregate_tasks(tasks)
         return tasks
 
+    def _scan_tasks(self) -> Optional[List[Dict[str, Any]]]:
+        """扫描任务目录，按 (账号, 任务名) 排序；出错时返回 None"""
+        tasks: List[Dict[str, Any]] = []
+        base_dir = self.signs_dir
+
+        _service_logger.debug(f"扫描任务目录: {base_dir}")
+        try:
+            for account_path in base_dir.iterdir():
+                if not account_path.is_dir():
+                    continue
+
+                if (account_path / "config.json").exists():
+                    task_info = self._load_task_config(account_path)
+                    if task_info:
+                        tasks.append(task_info)
+                    continue
+
+                for task_dir in account_path.iterdir():
+                    if not task_dir.is_dir():
+                        continue
+
+                    task_info = self._load_task_config(task_dir)
+                    if task_info:
+                        tasks.append(task_info)
+        except Exception as e:
+            _service_logger.debug(f"扫描任务出错: {str(e)}")
+            return None
+        return sorted(tasks, key=lambda item: (item["account_name"], item["name"]))
+
     def _load_task_config(self, task_dir: Path) -> Optional[Dict[str, Any]]:
         """Load one task config and normalize multi-account metadata."""
         config_file = task_dir / "config.json"
@@ -2358,7 +2472,7 @@ class SignTaskService:
             with open(task_dir / "config.json", "w", encoding="utf-8") as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
 
-        self._tasks_cache = None
+        self._invalidate_tasks_cache()
 
         try:
             from backend.scheduler import (
@@ -2373,6 +2487,8 @@ class SignTaskService:
                         task_name,
                         trigger_cron,
                         enabled=True,
+                        execution_mode=execution_mode,
+                        range_end=range_end,
                     )
                 else:
                     remove_sign_task_job(current_account, task_name)
@@ -2534,11 +2650,13 @@ class SignTaskService:
                     task_name,
                     next_range_start if next_execution_mode == "range" else next_sign_at,
                     enabled=True,
+                    execution_mode=next_execution_mode,
+                    range_end=next_range_end,
                 )
             else:
                 remove_sign_task_job(current_account, task_name)
 
-        self._tasks_cache = None
+        self._invalidate_tasks_cache()
         self._append_scheduler_log(
             "scheduler_update.log",
             f"{datetime.now()}: Updated task {task_name} for {','.join(target_accounts)}",
@@ -2660,7 +2778,7 @@ class SignTaskService:
         if last_run_value is not None:
             self._account_last_run_end[new_account_name] = last_run_value
 
-        self._tasks_cache = None
+        self._invalidate_tasks_cache()
 
     def delete_task(
         self, task_name: str, account_name: Optional[str] = None
@@ -2693,28 +2811,129 @@ class SignTaskService:
             if current_account:
                 remove_sign_task_job(current_account, task_name)
 
-        self._tasks_cache = None
+        self._invalidate_tasks_cache()
         return True
 
     async def get_account_chats(
-        self, account_name: str, force_refresh: bool = False
+        self, account_name: str, force_refresh: bool = False, wait: bool = True
     ) -> List[Dict[str, Any]]:
         """
         获取账号的 Chat 列表 (带缓存)
+
+        wait=False 时不阻塞请求：立即返回缓存（没有缓存时返回空列表），
+        需要刷新时在后台低优先级刷新，完成后推送给 subscribe_chat_updates 的订阅者。
         """
         account_name = validate_storage_name(account_name, field_name="account_name")
-        cache_file = self.signs_dir / account_name / "chats_cache.json"
 
-        if not force_refresh and cache_file.exists():
-            try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                pass
+        cached = None
+        if not force_refresh or not wait:
+            cached = await run_io(get_chat_directory(self.signs_dir).get_chats, account_name)
+            if cached is not None and not force_refresh:
+                return cached
+
+        if not wait:
+            self.schedule_chat_refresh(account_name)
+            return cached or []
 
         # 如果没有缓存或强制刷新，执行刷新逻辑
         return await self.refresh_account_chats(account_name)
 
+    def is_chat_refresh_pending(self, account_name: str) -> bool:
+        task = self._chat_refresh_tasks.get(account_name)
+        return task is not None and not task.done()
+
+    def schedule_chat_refresh(self, account_name: str) -> bool:
+        """安排后台刷新；同一账号已有刷新在排队或进行中时直接复用，返回 False"""
+        if self.is_chat_refresh_pending(account_name):
+            return False
+        task = create_logged_task(
+            self._refresh_chats_in_background(account_name),
+            logger=logging.getLogger("backend.sign_tasks"),
+            description=f"chat list refresh {account_name}",
+        )
+        self._chat_refresh_tasks[account_name] = task
+
+        def _forget(done: asyncio.Task) -> None:
+            if self._chat_refresh_tasks.get(account_name) is done:
+                self._chat_refresh_tasks.pop(account_name, None)
+
+        task.add_done_callback(_forget)
+        return True
+
+    def _account_busy(self, account_name: str) -> bool:
+        lock = self._account_locks.get(account_name) or get_account_lock(account_name)
+        if lock.locked() or get_global_semaphore().locked():
+            return True
+        return any(
+            running and key[0] == account_name
+            for key, running in self._active_tasks.items()
+        )
+
+    async def _refresh_chats_in_background(self, account_name: str) -> None:
+        # 低优先级：账号有任务在跑、账号锁或全局并发被占用时让路，最多推迟 max_defer 秒
+        deadline = time.monotonic() + self._chat_refresh_max_defer
+        while self._account_busy(account_name) and time.monotonic() < deadline:
+            await asyncio.sleep(1.0)
+
+        try:
+            chats = await self.refresh_account_chats(account_name)
+        except Exception as e:
+            detail = str(e)
+            payload: Dict[str, Any] = {"type": "error", "detail": detail}
+            if "登录已失效" in detail or "Session 文件不存在" in detail:
+                payload["code"] = "ACCOUNT_SESSION_INVALID"
+            _service_logger.warning("后台刷新 Chat 列表失败 %s: %s", account_name, detail)
+            self._publish_chat_update(account_name, payload)
+            return
+        self._publish_chat_update(account_name, {"type": "chats", "data": chats})
+
+    def subscribe_chat_updates(self, account_name: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+        self._chat_subscribers.setdefault(account_name, []).append(queue)
+        return queue
+
+    def unsubscribe_chat_updates(self, account_name: str, queue: asyncio.Queue) -> None:
+        queues = self._chat_subscribers.get(account_name)
+        if not queues:
+            return
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            self._chat_subscribers.pop(account_name, None)
+
+    def _publish_chat_update(self, account_name: str, payload: Dict[str, Any]) -> None:
+        for queue in list(self._chat_subscribers.get(account_name, [])):
+            if queue.full():
+                # 慢订阅者只需要最新的列表
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(payload)
+
+    def get_chat_latency_stats(
+        self, account_name: str, chat_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        各 Chat / 动作类型的响应耗时统计，以及据此计算的当前超时
+        """
+        account_name = validate_storage_name(account_name, field_name="account_name")
+        stats = LatencyStats.for_account(self.signs_dir, account_name)
+        action_timeout = default_action_timeout()
+
+        items = []
+        for item in stats.summary():
+            if chat_id is not None and item["chat_id"] != chat_id:
+                continue
+            if item["action_type"] == FOLLOWUP_LATENCY_KEY:
+                item["timeout"] = followup_timeout(stats, item["chat_id"], action_timeout)
+            else:
+                item["timeout"] = stats.timeout_for(
+                    item["chat_id"], item["action_type"], action_timeout
+                )
+            items.append(item)
+        return items
+
     def search_account_chats(
         self,
         account_name: str,
@@ -2727,7 +2946,6 @@ class SignTaskService:
         通过缓存搜索账号的 Chat 列表（不触发全量 get_dialogs）
         """
         account_name = validate_storage_name(account_name, field_name="account_name")
-        cache_file = self.signs_dir / account_name / "chats_cache.json"
 
         if limit < 1:
             limit = 1
@@ -2736,48 +2954,11 @@ class SignTaskService:
         if offset < 0:
             offset = 0
 
-        if not cache_file.exists():
-            return {"items": [], "total": 0, "limit": limit, "offset": offset}
-
-        try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            return {"items": [], "total": 0, "limit": limit, "offset": offset}
-
-        if not isinstance(data, list):
-            return {"items": [], "total": 0, "limit": limit, "offset": offset}
-
-        q = (query or "").strip()
-        if not q:
-            total = len(data)
-            return {
-                "items": data[offset : offset + limit],
-                "total": total,
-                "limit": limit,
-                "offset": offset,
-            }
-
-        is_numeric = q.lstrip("-").isdigit()
-        if is_numeric or q.startswith("-100"):
-            def match(chat: Dict[str, Any]) -> bool:
-                chat_id = chat.get("id")
-                if chat_id is None:
-                    return False
-                return q in str(chat_id)
-        else:
-            q_lower = q.lower()
-
-            def match(chat: Dict[str, Any]) -> bool:
-                title = (chat.get("title") or "").lower()
-                username = (chat.get("username") or "").lower()
-                return q_lower in title or q_lower in username
-
-        filtered = [c for c in data if match(c)]
-        total = len(filtered)
+        # 索引常驻内存，文件变化（或刷新后 invalidate）时才重新解析
+        filtered = get_chat_directory(self.signs_dir).search(account_name, query)
         return {
             "items": filtered[offset : offset + limit],
-            "total": total,
+            "total": len(filtered),
             "limit": limit,
             "offset": offset,
         }
@@ -2796,6 +2977,11 @@ class SignTaskService:
             or "USER_DEACTIVATED" in upper
         )
 
+    @staticmethod
+    def _is_unauthorized_connect_error(err: Exception) -> bool:
+        # Client.__aenter__ 在 connect() 返回未授权时抛出该错误
+        return "SESSION INVALID: UNAUTHORIZED" in str(err).upper()
+
     async def _cleanup_invalid_session(self, account_name: str) -> None:
         try:
             from backend.services.telegram import get_telegram_service
@@ -2811,6 +2997,7 @@ class SignTaskService:
                 cache_file.unlink()
         except Exception:
             pass
+        get_chat_directory(self.signs_dir).invalidate(account_name)
 
     async def refresh_account_chats(self, account_name: str) -> List[Dict[str, Any]]:
         """
@@ -2821,6 +3008,7 @@ class SignTaskService:
         # 获取 session 文件路径
         from backend.core.config import get_settings
         from backend.services.config import get_config_service
+        from tg_signer.core import get_client
 
         settings = get_settings()
         session_dir = settings.resolve_session_dir()
@@ -2833,14 +3021,14 @@ class SignTaskService:
         if session_mode == "string":
             session_string = (
                 get_account_session_string(account_name)
-                or load_session_string_file(session_dir, account_name)
+                or await async_load_session_string_file(session_dir, account_name)
             )
             if not session_string:
                 raise ValueError(f"账号 {account_name} 登录已失效，请重新登录")
         else:
             fallback_session_string = (
                 get_account_session_string(account_name)
-                or load_session_string_file(session_dir, account_name)
+                or await async_load_session_string_file(session_dir, account_name)
             )
             if not session_file.exists():
                 if fallback_session_string:
@@ -3005,9 +3193,10 @@ class SignTaskService:
             cache_file = account_dir / "chats_cache.json"
 
             try:
-                atomic_write_json(cache_file, chats, indent=2)
+                await run_io(atomic_write_json, cache_file, chats, indent=2)
             except Exception as e:
                 _service_logger.debug(f"保存 Chat 缓存失败: {e}")
+            get_chat_directory(self.signs_dir).invalidate(account_name)
 
             return chats
 
@@ -3221,9 +3410,14 @@ class SignTaskService:
         return any(key[1] == task_name for key, running in self._active_tasks.items() if running)
 
     async def run_task_with_logs(
-        self, account_name: str, task_name: str
+        self, account_name: str, task_name: str, fire_at: Optional[float] = None
     ) -> Dict[str, Any]:
-        """运行任务并实时捕获日志 (In-Process)"""
+        """
+        运行任务并实时捕获日志 (In-Process)
+
+        fire_at: 预热模式下首个动作的目标时间戳；连接与会话解析提前完成，
+        到点后再发送。
+        """
 
         account_name = validate_storage_name(account_name, field_name="account_name")
         task_name = validate_storage_name(task_name, field_name="task_name")
@@ -3346,16 +3540,16 @@ class SignTaskService:
                     if session_mode == "string":
                         session_string = (
                             get_account_session_string(account_name)
-                            or load_session_string_file(session_dir, account_name)
+                            or await async_load_session_string_file(session_dir, account_name)
                         )
                         if not session_string:
                             account_invalid_detected = True
                             raise ValueError(f"账号 {account_name} 的 session_string 不存在")
                         use_in_memory = True
                     else:
-                        # File mode: prefer in-memory to avoid SQLite "database is locked"
+                        # File mode: prefer in-memory when a session_string is available
                         # Try to load session_string from .session_string file as fallback
-                        session_string = load_session_string_file(
+                        session_string = await async_load_session_string_file(
                             session_dir, account_name
                         )
                         if session_string:
@@ -3378,6 +3572,8 @@ class SignTaskService:
 
                     # 实例化 UserSigner (使用 BackendUserSigner)
                     # 注意: UserSigner 内部会使用 get_client 复用 client
+                    from backend.services.sign_signer import BackendUserSigner
+
                     signer = BackendUserSigner(
                         task_name=task_name,
                         session_dir=str(session_dir),
@@ -3390,43 +3586,46 @@ class SignTaskService:
                         api_hash=api_hash,
                         no_updates=signer_no_updates,
                     )
+                    signer.fire_at = fire_at
 
-                    # 执行任务（数据库锁冲突时重试，带超时保护）
+                    # 执行任务（带超时保护）
                     task_timeout = float(
                         os.getenv("SIGN_TASK_EXECUTION_TIMEOUT", "300")
                     )
-                    async with get_global_semaphore():
-                        max_retries = 5
-                        for attempt in range(max_retries):
-                            try:
-                                await asyncio.wait_for(
-                                    signer.run_once(num_of_dialogs=20),
-                                    timeout=task_timeout,
-                                )
-                                break
-                            except asyncio.TimeoutError:
-                                raise RuntimeError(
-                                    f"任务执行超时（{int(task_timeout)}秒），已强制终止"
-                                )
-                            except Exception as e:
-                                if "database is locked" in str(e).lower():
-                                    if attempt < max_retries - 1:
-                                        delay = 3 + (attempt * 3)
-                                        self._active_logs[task_key].append(
-                                            f"Session 被锁定，{delay} 秒后重试... ({attempt + 1}/{max_retries})"
-                                        )
-                                        await asyncio.sleep(delay)
-                                        continue
-                                raise
+                    if fire_at is not None:
+                        # 预热等待不计入执行超时
+                        task_timeout += max(0.0, fire_at - time.time())
+                        self._active_logs[task_key].append(
+                            f"预热模式：目标时间 {datetime.fromtimestamp(fire_at).strftime('%H:%M:%S')}"
+                        )
+                    if fire_at is not None:
+                        # 全局并发名额只在预热与发送阶段占用，等待目标时间期间由 signer 释放
+                        signer.concurrency_slot = get_global_semaphore()
+                        slot = contextlib.nullcontext()
+                    else:
+                        slot = get_global_semaphore()
+                    async with slot:
+                        try:
+                            await _run_signer_with_timeout(signer, task_timeout)
+                        except asyncio.TimeoutError:
+                            raise RuntimeError(
+                                f"任务执行超时（{int(task_timeout)}秒），已强制终止"
+                            )
 
                     success = True
+                    mark_account_session_verified(account_name)
+                    if signer.fire_offset is not None:
+                        self._active_logs[task_key].append(
+                            f"首个动作相对目标时间偏差: {signer.fire_offset * 1000:.0f}ms"
+                        )
                     self._active_logs[task_key].append("任务执行完成")
 
-                    # 增加缓冲时间，防止同账号连续执行任务时，Session文件锁尚未完全释放导致 "database is locked"
-                    await asyncio.sleep(2)
-
         except Exception as e:
-            if account_invalid_detected or self._is_invalid_session_error(e):
+            if (
+                account_invalid_detected
+                or self._is_invalid_session_error(e)
+                or self._is_unauthorized_connect_error(e)
+            ):
                 account_invalid_detected = True
                 invalid_message = str(e) or f"账号 {account_name} 登录已失效，请重新登录"
                 await self._mark_account_invalid(
@@ -3542,12 +3741,13 @@ class SignTaskService:
                     output_str = "\n".join(final_logs)
 
                 msg = error_msg if not success else last_reply
-                self._save_run_info(
+                await self.async_save_run_info(
                     task_name,
                     success,
                     msg,
                     account_name,
                     flow_logs=final_logs,
+                    fire_offset=signer.fire_offset if signer is not None else None,
                 )
 
                 if not success and not account_invalid_detected and task_notify_on_failure:
@@ -3557,6 +3757,11 @@ class SignTaskService:
                         error_msg or msg,
                         last_target_message=last_target_message or None,
                         flow_logs=final_logs,
+                        target_chat_ids=[
+                            chat.get("chat_id")
+                            for chat in task_cfg.get("chats") or []
+                            if isinstance(chat, dict)
+                        ],
                     )
             finally:
                 self._active_tasks[task_key] = False
@@ -20,6 +20,11 @@ from backend.utils.memory import trim_memory
 from backend.utils.names import validate_storage_name
 from backend.utils.proxy import build_proxy_dict
 from backend.utils.tg_session import (
+    async_delete_shared_session,
+    async_list_session_accounts,
+    async_load_session_string_file,
+    async_rename_shared_session,
+    async_session_exists,
     delete_account_session_string,
     delete_session_string_file,
     get_account_profile,
@@ -29,9 +34,11 @@ from backend.utils.tg_session import (
     get_session_mode,
     is_string_session_mode,
     list_account_names,
+    list_session_accounts,
     load_session_string_file,
     rename_account_entry,
     save_session_string_file,
+    session_exists,
     set_account_session_string,
     set_account_status,
 )
@@ -124,11 +131,31 @@ class TelegramService:
             - size: 文件大小（字节）
         """
         if self._accounts_cache is not None and not force_refresh:
-            return [
-                {**acc, **self._account_status_payload(acc.get("name", ""))}
-                for acc in self._accounts_cache
-            ]
+            return self._cached_accounts_payload()
+        session_accounts = (
+            None if is_string_session_mode() else list_session_accounts(self.session_dir)
+        )
+        return self._build_accounts(session_accounts)
+
+    async def async_list_accounts(self, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """list_accounts 的协程版本：共享会话库在其专属线程中查询"""
+        if self._accounts_cache is not None and not force_refresh:
+            return self._cached_accounts_payload()
+        session_accounts = (
+            None
+            if is_string_session_mode()
+            else await async_list_session_accounts(self.session_dir)
+        )
+        return self._build_accounts(session_accounts)
 
+    def _cached_accounts_payload(self) -> List[Dict[str, Any]]:
+        return [
+            {**acc, **self._account_status_payload(acc.get("name", ""))}
+            for acc in self._accounts_cache
+        ]
+
+    def _build_accounts(self, session_accounts: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """session_accounts 为文件模式下有会话数据的账号；字符串模式传 None"""
         accounts = []
 
         pending_accounts = set()
@@ -187,8 +214,9 @@ class TelegramService:
                         }
                     )
             else:
-                for session_file in self.session_dir.glob("*.session"):
-                    account_name = session_file.stem  # 文件名（不含扩展名）
+                for account_name in session_accounts or []:
+                    # 共享会话库模式下没有单独的 .session 文件
+                    session_file = self.session_dir / f"{account_name}.session"
                     profile = get_account_profile(account_name)
 
                     if account_name in pending_accounts:
@@ -198,7 +226,7 @@ class TelegramService:
                         {
                             "name": account_name,
                             "session_file": str(session_file),
-                            "exists": session_file.exists(),
+                            "exists": True,
                             "size": session_file.stat().st_size
                             if session_file.exists()
                             else 0,
@@ -246,14 +274,30 @@ class TelegramService:
             pass
 
         if is_string_session_mode():
-            if get_account_session_string(account_name):
-                return True
-            if load_session_string_file(self.session_dir, account_name):
-                return True
-            return False
+            return self._string_session_exists(account_name)
 
-        session_file = self.session_dir / f"{account_name}.session"
-        return session_file.exists()
+        return session_exists(self.session_dir, account_name)
+
+    async def async_account_exists(self, account_name: str) -> bool:
+        """account_exists 的协程版本：共享会话库在其专属线程中查询"""
+        account_name = self._normalize_account_name(account_name)
+        if self._accounts_cache is not None and any(
+            acc["name"] == account_name for acc in self._accounts_cache
+        ):
+            return True
+        if is_string_session_mode():
+            return bool(
+                get_account_session_string(account_name)
+                or await async_load_session_string_file(self.session_dir, account_name)
+            )
+        return await async_session_exists(self.session_dir, account_name)
+
+    def _string_session_exists(self, account_name: str) -> bool:
+        if get_account_session_string(account_name):
+            return True
+        if load_session_string_file(self.session_dir, account_name):
+            return True
+        return False
 
     async def download_account_avatar(self, account_name: str) -> Optional[bytes]:
         """
@@ -266,7 +310,7 @@ class TelegramService:
 
         account_name = self._normalize_account_name(account_name)
 
-        if not self.account_exists(account_name):
+        if not await self.async_account_exists(account_name):
             return None
 
         proxy_dict = None
@@ -287,7 +331,7 @@ class TelegramService:
         if session_mode == "string":
             session_string = get_account_session_string(
                 account_name
-            ) or load_session_string_file(self.session_dir, account_name)
+            ) or await async_load_session_string_file(self.session_dir, account_name)
             if not session_string:
                 return None
             in_memory = True
@@ -325,11 +369,21 @@ class TelegramService:
             trim_memory()
 
     async def download_chat_avatar(
-        self, account_name: str, chat_id: int
+        self,
+        account_name: str,
+        chat_id: int,
+        hold_account_lock: bool = True,
+        raise_errors: bool = False,
     ) -> Optional[bytes]:
         """
         下载 Chat 对象的头像。
 
+        hold_account_lock 为 False 时不获取账号运行锁（client 引用计数共享，
+        头像这类只读请求无需与任务串行），避免后台拉取头像挡住定时任务。
+
+        raise_errors 为 True 时只有“确认没有头像”才返回 None；账号不可用、
+        网络错误、超时或下载结果为空都会抛出异常，便于调用方区分临时失败。
+
         Returns:
             头像的 JPEG 字节数据，如果没有头像则返回 None
         """
@@ -337,7 +391,9 @@ class TelegramService:
 
         account_name = self._normalize_account_name(account_name)
 
-        if not self.account_exists(account_name):
+        if not await self.async_account_exists(account_name):
+            if raise_errors:
+                raise LookupError(f"账号 {account_name} 不存在")
             return None
 
         proxy_dict = None
@@ -358,8 +414,10 @@ class TelegramService:
         if session_mode == "string":
             session_string = get_account_session_string(
                 account_name
-            ) or load_session_string_file(self.session_dir, account_name)
+            ) or await async_load_session_string_file(self.session_dir, account_name)
             if not session_string:
+                if raise_errors:
+                    raise LookupError(f"账号 {account_name} 没有可用的 session_string")
                 return None
             in_memory = True
 
@@ -373,7 +431,11 @@ class TelegramService:
                 no_updates=True,
             )
 
-            lock = get_account_lock(account_name)
+            lock = (
+                get_account_lock(account_name)
+                if hold_account_lock
+                else contextlib.nullcontext()
+            )
             async with lock:
                 async with client:
                     chat = await asyncio.wait_for(
@@ -390,8 +452,11 @@ class TelegramService:
                     )
                     if photo_bytes:
                         photo_bytes.seek(0)
-                        return photo_bytes.read()
-                    return None
+                        data = photo_bytes.read()
+                        if data:
+                            return data
+                    # 有头像但下载结果为空：Pyrogram 吞掉了下载错误，属于临时失败
+                    raise ConnectionError("头像下载结果为空")
         except Exception as e:
             logger.debug(
                 "Failed to download chat avatar for %s/%s: %s",
@@ -399,6 +464,8 @@ class TelegramService:
                 chat_id,
                 e,
             )
+            if raise_errors:
+                raise
             return None
         finally:
             trim_memory()
@@ -422,7 +489,7 @@ class TelegramService:
         account_name = self._normalize_account_name(account_name)
         checked_at = utc_now_iso_z()
 
-        if not self.account_exists(account_name):
+        if not await self.async_account_exists(account_name):
             return {
                 "account_name": account_name,
                 "ok": False,
@@ -454,7 +521,7 @@ class TelegramService:
         if session_mode == "string":
             session_string = get_account_session_string(
                 account_name
-            ) or load_session_string_file(self.session_dir, account_name)
+            ) or await async_load_session_string_file(self.session_dir, account_name)
             if not session_string:
                 set_account_status(
                     account_name,
@@ -674,10 +741,11 @@ class TelegramService:
             or journal_file.exists()
             or shm_file.exists()
             or wal_file.exists()
+            or await async_session_exists(self.session_dir, account_name)
         )
         has_session_string = bool(
             get_account_session_string(account_name)
-            or load_session_string_file(self.session_dir, account_name)
+            or await async_load_session_string_file(self.session_dir, account_name)
         )
         has_session_string_file = session_string_file.exists()
         account_in_store = account_name in list_account_names()
@@ -708,6 +776,8 @@ class TelegramService:
             if session_string_file.exists():
                 session_string_file.unlink()
 
+            await async_delete_shared_session(self.session_dir, account_name)
+
             if has_session_string or account_in_store:
                 delete_account_session_string(account_name)
 
@@ -734,7 +804,7 @@ class TelegramService:
         if account_name == new_account_name:
             return account_name
 
-        accounts = self.list_accounts(force_refresh=True)
+        accounts = await self.async_list_accounts(force_refresh=True)
         existing_by_lower = {
             str(item.get("name") or "").strip().lower(): str(item.get("name") or "").strip()
             for item in accounts
@@ -794,6 +864,7 @@ class TelegramService:
 
             for source, target in session_paths:
                 self._move_path(source, target)
+            await async_rename_shared_session(self.session_dir, actual_account_name, new_account_name)
 
             rename_account_entry(actual_account_name, new_account_name)
             self._rename_pending_login_records(actual_account_name, new_account_name)
@@ -919,6 +990,7 @@ class TelegramService:
         # 4. 如果是重新登录，尝试先清理旧的 session 文件 (避免 SQLite 锁或损坏)
         # 注意: 如果 session 有效但用户只是想重登，删除也没问题，因为反正要重新验证
         if session_mode == "file":
+            await async_delete_shared_session(self.session_dir, account_name)
             session_file = self.session_dir / f"{account_name}.session"
             if session_file.exists():
                 try:
@@ -954,13 +1026,6 @@ class TelegramService:
 
                 self._accounts_cache = None
 
-                if hasattr(client, "storage") and getattr(client.storage, "conn", None):
-                    try:
-                        client.storage.conn.execute("PRAGMA journal_mode=WAL")
-                        client.storage.conn.execute("PRAGMA busy_timeout=30000")
-                    except Exception:
-                        pass
-
                 sent_code = await client.send_code(phone_number)
 
             session_key = f"{account_name}_{phone_number}"
@@ -1348,6 +1413,7 @@ class TelegramService:
             if session_mode == "file":
                 account_name = data.get("account_name")
                 if account_name:
+                    await async_delete_shared_session(self.session_dir, account_name)
                     session_file = self.session_dir / f"{account_name}.session"
                     if session_file.exists():
                         try:
@@ -1452,6 +1518,7 @@ class TelegramService:
 
         # 清理旧 session 文件（与手机号登录保持一致）
         if session_mode == "file":
+            await async_delete_shared_session(self.session_dir, account_name)
             session_file = self.session_dir / f"{account_name}.session"
             if session_file.exists():
                 try:
@@ -1479,13 +1546,6 @@ class TelegramService:
             async with global_semaphore:
                 await client.connect()
 
-                if hasattr(client, "storage") and getattr(client.storage, "conn", None):
-                    try:
-                        client.storage.conn.execute("PRAGMA journal_mode=WAL")
-                        client.storage.conn.execute("PRAGMA busy_timeout=30000")
-                    except Exception:
-                        pass
-
                 result = await client.invoke(
                     raw.functions.auth.ExportLoginToken(
                         api_id=api_id, api_hash=api_hash, except_ids=[]
@@ -1684,7 +1744,7 @@ class TelegramService:
 
             account = None
             try:
-                accounts = self.list_accounts(force_refresh=True)
+                accounts = await self.async_list_accounts(force_refresh=True)
                 account = next(
                     (acc for acc in accounts if acc.get("name") == account_name),
                     None,
@@ -1979,7 +2039,7 @@ class TelegramService:
 
             account = None
             try:
-                accounts = self.list_accounts(force_refresh=True)
+                accounts = await self.async_list_accounts(force_refresh=True)
                 account = next(
                     (acc for acc in accounts if acc.get("name") == account_name),
                     None,
@@ -2245,7 +2305,7 @@ class TelegramService:
 
                     account = None
                     try:
-                        accounts = self.list_accounts(force_refresh=True)
+                        accounts = await self.async_list_accounts(force_refresh=True)
                         account = next(
                             (acc for acc in accounts if acc.get("name") == account_name),
                             None,
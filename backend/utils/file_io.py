@@ -0,0 +1,68 @@
+"""
+文件 I/O 线程池
+
+签到任务的配置、历史记录都是 JSON 文件，同步读写放在事件循环里会拖慢
+所有 MTProto 连接。这里提供一个有界线程池执行这些读写，并按文件路径
+串行化写操作（读-改-写），避免并发写入互相覆盖。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar, Union
+
+from tg_signer.utils import read_int_env
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_path_locks: Dict[str, threading.RLock] = {}
+_path_locks_guard = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=read_int_env("SIGN_TASK_IO_WORKERS", 4, 1),
+                    thread_name_prefix="sign-task-io",
+                )
+    return _executor
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在文件 I/O 线程池中执行同步函数"""
+    loop = asyncio.get_running_loop()
+    if kwargs:
+        func = functools.partial(func, *args, **kwargs)
+        args = ()
+    return await loop.run_in_executor(get_io_executor(), func, *args)
+
+
+@contextlib.contextmanager
+def file_write_lock(path: Union[str, Path]) -> Iterator[None]:
+    """同一文件的读-改-写串行执行（可重入，同一线程内可嵌套）"""
+    key = os.path.abspath(str(path))
+    with _path_locks_guard:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = _path_locks[key] = threading.RLock()
+    with lock:
+        yield
+
+
+def shutdown_io_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,216 @@
+"""
+事件循环延迟监控
+
+- 采样协程定期 sleep 固定间隔，实际唤醒时间与预期之差即为循环延迟；
+- 看门狗线程发现采样心跳超过阈值未更新时，抓取事件循环线程当前的调用栈，
+  按项目内最内层调用位置聚合，用于定位在协程里执行同步 I/O 的代码。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from tg_signer.async_utils import create_logged_task
+from tg_signer.utils import read_float_env
+
+logger = logging.getLogger("backend.loop_monitor")
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+_PROJECT_DIRS = tuple(
+    os.path.join(_PROJECT_ROOT, name) + os.sep for name in ("backend", "tg_signer")
+)
+_STACK_LIMIT = 12
+_MAX_SITES = 200
+
+
+def loop_monitor_enabled() -> bool:
+    return os.getenv("LOOP_MONITOR_ENABLED", "1") != "0"
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return round(sorted_values[index], 2)
+
+
+def _call_site(frame) -> str:
+    """取项目代码中最内层的栈帧作为调用位置，找不到时用最内层帧"""
+    innermost = None
+    current = frame
+    while current is not None:
+        code = current.f_code
+        site = f"{code.co_filename}:{current.f_lineno} {code.co_name}"
+        if innermost is None:
+            innermost = site
+        if code.co_filename.startswith(_PROJECT_DIRS) and not code.co_filename.endswith(
+            "loop_monitor.py"
+        ):
+            return site.replace(_PROJECT_ROOT + os.sep, "")
+        current = current.f_back
+    return innermost or "unknown"
+
+
+class _SlowSite:
+    __slots__ = ("count", "total_ms", "max_ms", "stack", "last_seen")
+
+    def __init__(self, stack: List[str]):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.stack = stack
+        self.last_seen = 0.0
+
+
+class LoopMonitor:
+    def __init__(self):
+        self.interval = read_float_env("LOOP_LAG_SAMPLE_INTERVAL", 0.25, 0.01)
+        self.slow_threshold = read_float_env("LOOP_SLOW_CALLBACK_MS", 100.0, 10.0) / 1000
+        window = int(read_float_env("LOOP_LAG_WINDOW_SECONDS", 600.0, 10.0) / self.interval)
+        self._samples: Deque[float] = deque(maxlen=max(window, 10))
+        self._sites: Dict[str, _SlowSite] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._stall_beat: Optional[float] = None
+        self._stall_site: Optional[_SlowSite] = None
+        self._stall_ms = 0.0
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+
+    def start(self) -> None:
+        if not loop_monitor_enabled() or (self._task is not None and not self._task.done()):
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = create_logged_task(
+            self._sample(), logger=logger, description="event loop lag sampler"
+        )
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(loop.time() - expected, 0.0) * 1000
+            self._last_beat = time.monotonic()
+            with self._lock:
+                self._samples.append(lag_ms)
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def _watch(self) -> None:
+        check_every = max(self.slow_threshold / 2, 0.005)
+        while not self._stop.wait(check_every):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.slow_threshold:
+                if self._stall_beat is not None and beat != self._stall_beat:
+                    self._finish_stall()
+                continue
+            if self._stall_beat != beat:
+                if self._stall_beat is not None:
+                    self._finish_stall()
+                self._begin_stall(beat)
+            self._stall_ms = stalled * 1000
+
+    def _begin_stall(self, beat: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        site_key = _call_site(frame)
+        stack = traceback.format_stack(frame)[-_STACK_LIMIT:]
+        del frame
+        with self._lock:
+            site = self._sites.get(site_key)
+            if site is None:
+                if len(self._sites) >= _MAX_SITES:
+                    oldest = min(self._sites, key=lambda key: self._sites[key].last_seen)
+                    self._sites.pop(oldest, None)
+                site = self._sites[site_key] = _SlowSite(stack)
+            site.count += 1
+            site.stack = stack
+            site.last_seen = time.time()
+            self.stalls += 1
+        self._stall_beat = beat
+        self._stall_site = site
+        self._stall_ms = 0.0
+
+    def _finish_stall(self) -> None:
+        site, stall_ms = self._stall_site, self._stall_ms
+        self._stall_beat = None
+        self._stall_site = None
+        if site is None:
+            return
+        with self._lock:
+            site.total_ms += stall_ms
+            site.max_ms = max(site.max_ms, stall_ms)
+        if stall_ms >= 1000:
+            logger.warning(f"事件循环阻塞 {stall_ms:.0f}ms: {site.stack[-1].strip()}")
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            sites = sorted(
+                self._sites.items(), key=lambda item: item[1].total_ms, reverse=True
+            )[:top]
+            return {
+                "enabled": loop_monitor_enabled(),
+                "running": self._task is not None and not self._task.done(),
+                "sample_interval_seconds": self.interval,
+                "slow_threshold_ms": round(self.slow_threshold * 1000, 1),
+                "samples": len(samples),
+                "lag_ms": {
+                    "p50": _percentile(samples, 0.5),
+                    "p90": _percentile(samples, 0.9),
+                    "p99": _percentile(samples, 0.99),
+                    "max": round(samples[-1], 2) if samples else None,
+                    "max_since_start": round(self.max_lag_ms, 2),
+                },
+                "stalls": self.stalls,
+                "top_sites": [
+                    {
+                        "site": key,
+                        "count": site.count,
+                        "total_ms": round(site.total_ms, 1),
+                        "max_ms": round(site.max_ms, 1),
+                        "stack": [line.rstrip() for line in site.stack],
+                    }
+                    for key, site in sites
+                ],
+            }
+
+
+_loop_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> LoopMonitor:
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = LoopMonitor()
+    return _loop_monitor
@@ -1,5 +1,5 @@
 from __future__ import annotations
 
-from tg_signer.memory import trim_memory
+from tg_signer.memory import get_memory_trimmer, trim_memory
 
-__all__ = ["trim_memory"]
+__all__ = ["get_memory_trimmer", "trim_memory"]
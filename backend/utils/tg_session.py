@@ -3,10 +3,12 @@ from __future__ import annotations
 import asyncio
 import json
 import os
+import time
 from pathlib import Path
 from typing import Any, Optional
 
 from backend.core.config import get_settings
+from backend.utils.file_io import run_io
 from backend.utils.time import utc_now_iso
 from tg_signer.utils import atomic_write_json
 
@@ -16,6 +18,9 @@ _SESSION_MODE_STRING = "string"
 
 _GLOBAL_SEMAPHORE: Optional[asyncio.Semaphore] = None
 
+# account_name -> time.monotonic() of the last successful connect/get_me
+_SESSION_VERIFIED_AT: dict[str, float] = {}
+
 
 def get_session_mode() -> str:
     mode = os.getenv(_SESSION_MODE_ENV, _SESSION_MODE_FILE).strip().lower()
@@ -67,6 +72,24 @@ def update_global_semaphore(new_limit: int) -> None:
     _GLOBAL_SEMAPHORE = asyncio.Semaphore(new_limit)
 
 
+def mark_account_session_verified(account_name: str) -> None:
+    """Record that the account just completed an authorized connect/get_me."""
+    _SESSION_VERIFIED_AT[account_name] = time.monotonic()
+
+
+def invalidate_account_session_verified(account_name: str) -> None:
+    _SESSION_VERIFIED_AT.pop(account_name, None)
+
+
+def is_account_session_recently_verified(account_name: str, ttl_seconds: float) -> bool:
+    if ttl_seconds <= 0:
+        return False
+    verified_at = _SESSION_VERIFIED_AT.get(account_name)
+    if verified_at is None:
+        return False
+    return time.monotonic() - verified_at < ttl_seconds
+
+
 from threading import Lock
 
 _ACCOUNT_STORE_LOCK = Lock()
@@ -152,12 +175,14 @@ def delete_account_session_string(account_name: str) -> None:
         if isinstance(accounts, dict) and account_name in accounts:
             accounts.pop(account_name, None)
             _save_account_store_unlocked(data)
+    invalidate_account_session_verified(account_name)
 
 
 def rename_account_entry(old_account_name: str, new_account_name: str) -> None:
     if old_account_name == new_account_name:
         return
 
+    invalidate_account_session_verified(old_account_name)
     with _ACCOUNT_STORE_LOCK:
         data = _load_account_store_unlocked()
         accounts = data.get("accounts")
@@ -275,6 +300,10 @@ def set_account_status(
         entry["updated_at"] = utc_now_iso()
         accounts[account_name] = entry
         _save_account_store_unlocked(data)
+    if status == "connected":
+        mark_account_session_verified(account_name)
+    else:
+        invalidate_account_session_verified(account_name)
 
 
 def session_string_file_path(session_dir: Path, account_name: str) -> Path:
@@ -293,54 +322,170 @@ def load_session_string_file(session_dir: Path, account_name: str) -> Optional[s
     return content or None
 
 
-def _export_session_string_from_file(session_dir: Path, account_name: str) -> Optional[str]:
-    """Extract session string from .session SQLite file and cache it."""
-    import sqlite3
-    import struct
+async def async_load_session_string_file(
+    session_dir: Path, account_name: str
+) -> Optional[str]:
+    """load_session_string_file 的协程版本：首次导出要读 .session 或共享会话库，放到 I/O 线程执行"""
+    return await run_io(load_session_string_file, session_dir, account_name)
+
+
+def _shared_session_db(session_dir: Path):
+    """TG_SESSION_BACKEND=shared 时返回共享会话库，否则返回 None"""
+    from tg_signer.session_storage import (
+        SHARED_DB_NAME,
+        get_session_backend,
+        get_shared_session_db,
+    )
+
+    if get_session_backend() != "shared":
+        return None
+    return get_shared_session_db(session_dir / SHARED_DB_NAME)
+
+
+def list_session_accounts(session_dir: Path) -> list[str]:
+    """文件模式下有会话数据的账号（.session 文件或共享会话库）"""
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is not None:
+        try:
+            return shared_db.list_accounts()
+        except Exception:
+            return []
+    return sorted(p.stem for p in session_dir.glob("*.session"))
+
+
+def session_exists(session_dir: Path, account_name: str) -> bool:
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is not None:
+        try:
+            return shared_db.has_account(account_name)
+        except Exception:
+            return False
+    return (session_dir / f"{account_name}.session").exists()
+
+
+def delete_shared_session(session_dir: Path, account_name: str) -> bool:
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is None:
+        return False
+    try:
+        return shared_db.delete_account(account_name)
+    except Exception:
+        return False
+
+
+def rename_shared_session(session_dir: Path, old_name: str, new_name: str) -> bool:
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is None:
+        return False
+    return shared_db.rename_account(old_name, new_name)
+
+
+# 以下 async_* 版本供协程使用：共享会话库的访问在其专属线程中执行，
+# 不在事件循环上跑 SQLite，也不在事件循环上等待 call_sync 的线程锁。
+
+
+async def async_list_session_accounts(session_dir: Path) -> list[str]:
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is not None:
+        try:
+            return await shared_db.async_list_accounts()
+        except Exception:
+            return []
+    return sorted(p.stem for p in session_dir.glob("*.session"))
+
+
+async def async_session_exists(session_dir: Path, account_name: str) -> bool:
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is not None:
+        try:
+            return await shared_db.async_has_account(account_name)
+        except Exception:
+            return False
+    return (session_dir / f"{account_name}.session").exists()
+
+
+async def async_delete_shared_session(session_dir: Path, account_name: str) -> bool:
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is None:
+        return False
+    try:
+        return await shared_db.async_delete_account(account_name)
+    except Exception:
+        return False
+
+
+async def async_rename_shared_session(
+    session_dir: Path, old_name: str, new_name: str
+) -> bool:
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is None:
+        return False
+    return await shared_db.async_rename_account(old_name, new_name)
+
+
+def _pack_session_string(row) -> Optional[str]:
+    dc_id, api_id, test_mode, auth_key, user_id, is_bot = row
+    if not auth_key or not user_id:
+        return None
+
     import base64
+    import struct
+
+    # Pack into pyrogram session string format (version 1)
+    packed = struct.pack(
+        ">B?256sQ?",
+        dc_id,
+        bool(test_mode),
+        auth_key,
+        user_id,
+        bool(is_bot),
+    )
+    session_string = base64.urlsafe_b64encode(packed).decode("ascii").rstrip("=")
+    return "1" + session_string  # Version prefix
+
+
+def _read_session_row(session_dir: Path, account_name: str):
+    shared_db = _shared_session_db(session_dir)
+    if shared_db is not None:
+        return shared_db.get_export_row(account_name)
+
+    return _read_session_file_row(session_dir / f"{account_name}.session")
+
+
+def _read_session_file_row(session_file: Path):
+    import sqlite3
 
-    session_file = session_dir / f"{account_name}.session"
     if not session_file.exists():
         return None
 
+    conn = sqlite3.connect(str(session_file), timeout=10, check_same_thread=False)
     try:
-        conn = sqlite3.connect(str(session_file), timeout=10, check_same_thread=False)
         try:
             conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("PRAGMA busy_timeout=10000")
         except Exception:
             pass
-
         try:
-            row = conn.execute(
+            return conn.execute(
                 "SELECT dc_id, api_id, test_mode, auth_key, user_id, is_bot FROM sessions"
             ).fetchone()
         except Exception:
-            conn.close()
             return None
+    finally:
+        conn.close()
 
+
+def _export_session_string_from_file(session_dir: Path, account_name: str) -> Optional[str]:
+    """Extract session string from the .session SQLite file (or shared session DB) and cache it."""
+    try:
+        row = _read_session_row(session_dir, account_name)
         if not row:
-            conn.close()
             return None
 
-        dc_id, api_id, test_mode, auth_key, user_id, is_bot = row
-        conn.close()
-
-        if not auth_key or not user_id:
+        session_string = _pack_session_string(row)
+        if not session_string:
             return None
 
-        # Pack into pyrogram session string format (version 1)
-        packed = struct.pack(
-            ">B?256sQ?",
-            dc_id,
-            bool(test_mode),
-            auth_key,
-            user_id,
-            bool(is_bot),
-        )
-        session_string = base64.urlsafe_b64encode(packed).decode("ascii").rstrip("=")
-        session_string = "1" + session_string  # Version prefix
-
         # Cache it to .session_string file for future use
         try:
             cache_path = session_string_file_path(session_dir, account_name)
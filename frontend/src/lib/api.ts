@@ -16,7 +16,8 @@ const toRecord = (headers?: HeadersInit): Record<string, string> => {
 async function request<T>(
   path: string,
   options: RequestInit = {},
-  token?: string | null
+  token?: string | null,
+  onResponse?: (res: Response) => void
 ): Promise<T> {
   const mergedHeaders: Record<string, string> = {
     ...toRecord(options.headers),
@@ -80,6 +81,7 @@ async function request<T>(
     }
     throw err;
   }
+  onResponse?.(res);
   if (res.status === 204) {
     return {} as T;
   }
@@ -855,8 +857,27 @@ export const getSignTaskRunStatus = (
   );
 };
 
-export const getAccountChats = (token: string, accountName: string, forceRefresh?: boolean) =>
-  request<ChatInfo[]>(`/sign-tasks/chats/${encodeURIComponent(accountName)}${forceRefresh ? '?force_refresh=true' : ''}`, {}, token);
+// refreshing 来自 X-Chats-Refreshing 响应头：为 true 时刷新结果稍后经 WebSocket 推送
+export const getAccountChats = async (token: string, accountName: string, forceRefresh?: boolean, wait?: boolean) => {
+  const params = new URLSearchParams();
+  if (forceRefresh) params.append("force_refresh", "true");
+  if (wait) params.append("wait", "true");
+  const query = params.toString();
+  let refreshing = false;
+  const chats = await request<ChatInfo[]>(
+    `/sign-tasks/chats/${encodeURIComponent(accountName)}${query ? `?${query}` : ''}`,
+    {},
+    token,
+    (res) => { refreshing = res.headers.get("X-Chats-Refreshing") === "1"; }
+  );
+  return { chats, refreshing };
+};
+
+// 后台刷新完成后推送最新的 Chat 列表
+export const accountChatsSocketUrl = (token: string, accountName: string) => {
+  const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+  return `${wsProtocol}//${window.location.host}/api/sign-tasks/chats/${encodeURIComponent(accountName)}/ws?token=${encodeURIComponent(token)}`;
+};
 
 export const searchAccountChats = (
   token: string,
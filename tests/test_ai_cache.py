@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+from tg_signer import ai_cache
+from tg_signer.ai_cache import AIAnswerCache, build_cache_key
+
+
+def _cache(tmp_path=None, ttl=3600, max_entries=10):
+    path = tmp_path / "cache.json" if tmp_path is not None else None
+    return AIAnswerCache(path, ttl_seconds=ttl, max_entries=max_entries)
+
+
+def test_concurrent_lookups_share_one_call():
+    cache = _cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "42"
+
+    async def _main():
+        return await asyncio.gather(
+            *(cache.get_or_compute("k", compute) for _ in range(3))
+        )
+
+    assert asyncio.run(_main()) == ["42", "42", "42"]
+    assert calls == [1]
+    assert cache.stats()["deduplicated"] == 2
+    # 之后直接命中缓存
+    assert asyncio.run(cache.get_or_compute("k", compute)) == "42"
+    assert cache.stats()["hits"] == 1
+
+
+def test_waiter_takes_over_when_leader_is_cancelled():
+    cache = _cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    async def _main():
+        leader = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(leader, waiter, return_exceptions=True)
+
+    leader_result, waiter_result = asyncio.run(_main())
+    assert isinstance(leader_result, asyncio.CancelledError)
+    assert waiter_result == "ok"
+    assert len(calls) == 2
+
+
+def test_ttl_and_lru(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ai_cache.time, "time", lambda: now[0])
+    cache = _cache(ttl=60, max_entries=2)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # b 最久未使用，被淘汰
+    assert cache.get("b") is ai_cache._MISSING
+    assert cache.get("a") == 1
+
+    now[0] += 61
+    assert cache.get("a") is ai_cache._MISSING
+    assert cache.get("c") is ai_cache._MISSING
+
+
+def test_saves_are_debounced_off_the_loop(tmp_path, monkeypatch):
+    monkeypatch.setenv("AI_ANSWER_CACHE_SAVE_DELAY", "0.05")
+    cache = _cache(tmp_path)
+    path = tmp_path / "cache.json"
+
+    async def _main():
+        cache.put("a", 1)
+        cache.put("b", 2)
+        written_immediately = path.exists()
+        await asyncio.sleep(0.3)
+        return written_immediately
+
+    assert asyncio.run(_main()) is False
+    assert set(json.loads(path.read_text(encoding="utf-8"))) == {"a", "b"}
+    assert _cache(tmp_path).get("b") == 2
+
+
+def test_cache_key_includes_endpoint():
+    key = build_cache_key("calc", model="m", base_url="https://a/v1", query="1+1")
+    assert key != build_cache_key("calc", model="m", base_url="https://b/v1", query="1+1")
+    assert key == build_cache_key("calc", model="m", base_url="https://a/v1", query="1+1")
+
+
+def test_put_without_running_loop_saves_immediately(tmp_path):
+    cache = _cache(tmp_path)
+
+    cache.put("k", "v")
+    cache.invalidate(["missing"])
+
+    assert json.loads((tmp_path / "cache.json").read_text())["k"]["value"] == "v"
+
+
+def test_pending_save_is_written_by_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_cache, "_caches", {})
+    cache = ai_cache.get_ai_answer_cache(tmp_path)
+    cache.save_delay = 3600
+
+    async def _main():
+        cache.put("k", "v")
+        assert cache._save_handle is not None
+        ai_cache.flush_ai_answer_caches()
+        assert cache._save_handle is None
+
+    asyncio.run(_main())
+    assert "k" in json.loads((tmp_path / ai_cache.AI_CACHE_FILENAME).read_text())
@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+from tg_signer.ai_gateway import AIGateway
+
+
+class _FakeClient:
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, model, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.name
+
+
+def _gateway(max_concurrency=4, hedge_after=0.05):
+    gateway = AIGateway()
+    gateway.max_concurrency = max_concurrency
+    gateway.hedge_after = hedge_after
+    return gateway
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    gateway = _gateway()
+    primary = _FakeClient("primary", 1.0)
+    secondary = _FakeClient("secondary", 0.01)
+
+    result = asyncio.run(
+        gateway.create_completion(primary, "m", secondary=(secondary, "m2"))
+    )
+
+    assert result == "secondary"
+    assert primary.cancelled == 1
+    metrics = gateway.metrics()["m"]
+    assert metrics["hedged"] == 1
+    assert metrics["hedge_wins"] == 1
+
+
+def test_time_spent_queued_does_not_trigger_a_hedge():
+    gateway = _gateway(max_concurrency=1, hedge_after=0.1)
+    busy = _FakeClient("busy", 0.3)
+    primary = _FakeClient("primary", 0.02)
+    secondary = _FakeClient("secondary", 0.01)
+
+    async def _main():
+        holder = asyncio.create_task(gateway.create_completion(busy, "other"))
+        await asyncio.sleep(0)
+        result = await gateway.create_completion(primary, "m", secondary=(secondary, "m2"))
+        await holder
+        return result
+
+    assert asyncio.run(_main()) == "primary"
+    assert secondary.calls == 0
+    assert gateway.metrics()["m"]["hedged"] == 0
+    # 排队的 0.3 秒不计入耗时
+    assert gateway.metrics()["m"]["max"] < 0.2
+
+
+def test_cancelling_the_caller_cancels_the_primary_request():
+    gateway = _gateway(hedge_after=1.0)
+    primary = _FakeClient("primary", 5.0)
+    secondary = _FakeClient("secondary", 0.01)
+
+    async def _main():
+        task = asyncio.create_task(
+            gateway.create_completion(primary, "m", secondary=(secondary, "m2"))
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(_main())
+    assert primary.calls == 1
+    assert primary.cancelled == 1
+    assert secondary.calls == 0
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from backend.services import avatars
+from backend.services.avatars import AvatarService
+
+CHAT_ID = -1001234
+
+
+class _FakeTelegram:
+    def __init__(self, owner: str, failing: frozenset = frozenset()) -> None:
+        self.owner = owner
+        self.failing = failing
+        self.calls = []
+
+    async def download_chat_avatar(
+        self, account_name, chat_id, hold_account_lock=True, raise_errors=False
+    ):
+        self.calls.append((account_name, hold_account_lock))
+        await asyncio.sleep(0.05)
+        if account_name in self.failing:
+            raise ConnectionError("client closed")
+        return b"jpeg-bytes" if account_name == self.owner else None
+
+
+def _setup(tmp_path, monkeypatch, owner: str, accounts: int = 300, failing=frozenset()):
+    names = [f"acc{index:03d}" for index in range(accounts)]
+    signs_dir = tmp_path / "signs"
+    for index, name in enumerate(names):
+        # 只有部分账号的 chat 缓存里有这个 chat
+        chats = [{"id": CHAT_ID if index % 50 == 7 else index, "title": "t"}]
+        (signs_dir / name).mkdir(parents=True)
+        (signs_dir / name / "chats_cache.json").write_text(json.dumps(chats))
+    fake = _FakeTelegram(owner, failing)
+    monkeypatch.setattr(avatars, "list_account_names", lambda: names)
+    monkeypatch.setattr(
+        "backend.services.telegram.get_telegram_service", lambda: fake
+    )
+    monkeypatch.setenv("AVATAR_FALLBACK_ACCOUNTS", "3")
+    service = AvatarService(cache_dir=tmp_path / "avatars", signs_dir=signs_dir)
+    return service, fake
+
+
+def test_concurrent_requests_share_one_download(tmp_path, monkeypatch):
+    service, fake = _setup(tmp_path, monkeypatch, owner="acc000")
+
+    async def _main():
+        results = await asyncio.gather(
+            *(service.get_avatar("acc000", CHAT_ID) for _ in range(50))
+        )
+        again = await service.get_avatar("acc000", CHAT_ID)
+        await service.stop()
+        return results, again
+
+    results, again = asyncio.run(_main())
+
+    assert {avatar.data for avatar in results} == {b"jpeg-bytes"}
+    assert fake.calls == [("acc000", False)]
+    assert again.etag == results[0].etag
+    assert service.stats()["coalesced"] == 49
+    assert service.stats()["memory_hits"] == 1
+    assert (tmp_path / "avatars" / f"chat_{CHAT_ID}.jpg").read_bytes() == b"jpeg-bytes"
+
+
+def test_fallback_is_limited_to_accounts_that_know_the_chat(tmp_path, monkeypatch):
+    service, fake = _setup(tmp_path, monkeypatch, owner="nobody")
+
+    async def _main():
+        first = await service.get_avatar("acc000", CHAT_ID)
+        second = await service.get_avatar("acc000", CHAT_ID)
+        await service.stop()
+        return first, second
+
+    first, second = asyncio.run(_main())
+
+    assert first is None and second is None
+    # 请求账号 + 最多 3 个 chats_cache.json 中包含该 chat 的账号
+    assert [name for name, _ in fake.calls] == ["acc000", "acc007", "acc057", "acc107"]
+    assert (tmp_path / "avatars" / f"chat_{CHAT_ID}.no_avatar").exists()
+
+
+def test_transient_failure_does_not_write_no_avatar_marker(tmp_path, monkeypatch):
+    service, fake = _setup(tmp_path, monkeypatch, owner="nobody", failing=frozenset({"acc000"}))
+
+    async def _main():
+        first = await service.get_avatar("acc000", CHAT_ID)
+        await service.stop()
+        return first
+
+    assert asyncio.run(_main()) is None
+    # 请求账号抛出异常，回退账号都返回“无头像”：结果不确定，不能缓存为无头像
+    assert not (tmp_path / "avatars" / f"chat_{CHAT_ID}.no_avatar").exists()
+    assert CHAT_ID not in service._missing
+    assert service.stats()["transient_failures"] == 1
+    assert service.stats()["not_found"] == 0
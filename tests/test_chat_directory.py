@@ -0,0 +1,80 @@
+import json
+
+from tg_signer.chat_directory import ChatDirectory
+
+
+def _write(signs_dir, account, chats):
+    (signs_dir / account).mkdir(parents=True, exist_ok=True)
+    (signs_dir / account / "chats_cache.json").write_text(
+        json.dumps(chats, ensure_ascii=False), encoding="utf-8"
+    )
+
+
+def test_search_uses_index_and_reloads_after_write(tmp_path):
+    _write(
+        tmp_path,
+        "acc",
+        [
+            {"id": -1001234567, "title": "每日签到 Group", "username": "daily_sign"},
+            {"id": 777, "title": "Sign Bot", "username": "signbot"},
+            {"id": 42, "title": "Other", "username": None},
+        ],
+    )
+    directory = ChatDirectory(tmp_path)
+
+    # 前缀匹配（Sign Bot / signbot）排在子串匹配（daily_sign）之前
+    assert [chat["id"] for chat in directory.search("acc", "SIGN")] == [777, -1001234567]
+    assert [chat["id"] for chat in directory.search("acc", "签到")] == [-1001234567]
+    assert [chat["id"] for chat in directory.search("acc", "1234")] == [-1001234567]
+    assert directory.search("acc", "zzz") == []
+    assert directory.loads == 1
+
+    _write(tmp_path, "acc", [{"id": 9, "title": "New Sign"}])
+    directory.invalidate("acc")
+    assert [chat["id"] for chat in directory.search("acc", "sign")] == [9]
+    assert directory.loads == 2
+
+
+def test_find_chat_falls_back_to_other_accounts(tmp_path):
+    _write(tmp_path, "me", [{"id": 1, "title": "Mine"}])
+    _write(tmp_path, "other", [{"id": -1005555, "title": "Shared", "username": "shared_ch"}])
+    directory = ChatDirectory(tmp_path)
+
+    assert directory.find_chat("me", 1)["title"] == "Mine"
+    # 裸频道 id 通过 -100 变体命中其他账号的缓存
+    assert directory.find_chat("me", 5555)["title"] == "Shared"
+    assert directory.find_chat("me", 0, "@Shared_CH")["id"] == -1005555
+    assert directory.find_chat("me", 0, "shared")["id"] == -1005555
+    assert directory.find_chat("me", 31337) is None
+
+
+def test_get_chats_returns_a_copy(tmp_path):
+    _write(tmp_path, "acc", [{"id": 1, "title": "Mine"}])
+    directory = ChatDirectory(tmp_path)
+
+    chats = directory.get_chats("acc")
+    chats[0]["title"] = "changed"
+    chats.append({"id": 2})
+
+    assert directory.get_chats("acc") == [{"id": 1, "title": "Mine"}]
+    assert directory.find_chat("acc", 1)["title"] == "Mine"
+
+
+def test_accounts_with_chat_uses_reverse_index(tmp_path):
+    _write(tmp_path, "a", [{"id": 1}, {"id": 2}])
+    _write(tmp_path, "b", [{"id": 2}])
+    _write(tmp_path, "c", [{"id": 3}])
+    directory = ChatDirectory(tmp_path)
+
+    assert directory.accounts_with_chat(2) == ["a", "b"]
+    assert directory.accounts_with_chat(2, exclude="a") == ["b"]
+    assert directory.accounts_with_chat(99) == []
+    loads = directory.loads
+
+    # 已建立索引后再查不重新读取文件；账号缓存更新后索引随之变化
+    assert directory.accounts_with_chat(1) == ["a"]
+    assert directory.loads == loads
+    _write(tmp_path, "b", [{"id": 1}])
+    directory.invalidate("b")
+    assert directory.accounts_with_chat(1) == ["a", "b"]
+    assert directory.accounts_with_chat(2) == ["a"]
@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from backend.core.config import Settings
+from backend.services.sign_tasks import SignTaskService
+from backend.utils.account_locks import get_account_lock
+
+ACCOUNT = "chat_refresh_acc"
+
+
+def test_chat_list_served_from_cache_and_refreshed_in_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "resolve_workdir", lambda self: tmp_path)
+    monkeypatch.setenv("TG_GLOBAL_CONCURRENCY", "4")
+    service = SignTaskService()
+    (service.signs_dir / ACCOUNT).mkdir(parents=True)
+    (service.signs_dir / ACCOUNT / "chats_cache.json").write_text(
+        json.dumps([{"id": 1, "title": "old"}]), encoding="utf-8"
+    )
+
+    calls = []
+
+    async def _fake_refresh(account_name):
+        calls.append(account_name)
+        await asyncio.sleep(0.1)
+        return [{"id": 2, "title": "new"}]
+
+    monkeypatch.setattr(service, "refresh_account_chats", _fake_refresh)
+
+    async def _main():
+        queue = service.subscribe_chat_updates(ACCOUNT)
+        lock = get_account_lock(ACCOUNT)
+        # 模拟正在运行的定时任务占用账号锁：后台刷新需要让路
+        await lock.acquire()
+        first = await service.get_account_chats(ACCOUNT, force_refresh=True, wait=False)
+        second = await service.get_account_chats(ACCOUNT, force_refresh=True, wait=False)
+        await asyncio.sleep(0.3)
+        deferred = list(calls)
+        lock.release()
+        payload = await asyncio.wait_for(queue.get(), timeout=5)
+        service.unsubscribe_chat_updates(ACCOUNT, queue)
+        return first, second, deferred, payload
+
+    first, second, deferred, payload = asyncio.run(_main())
+
+    assert first == second == [{"id": 1, "title": "old"}]
+    assert deferred == []
+    assert calls == [ACCOUNT]
+    assert payload == {"type": "chats", "data": [{"id": 2, "title": "new"}]}
+    assert not service.is_chat_refresh_pending(ACCOUNT)
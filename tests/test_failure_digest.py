@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.services import failure_digest
+from backend.services.failure_digest import (
+    FailureDigest,
+    _Destination,
+    _FailureGroup,
+    error_signature,
+)
+
+
+def _group(accounts, sample_logs=None):
+    return _FailureGroup(
+        destination=_Destination("token", "42", None),
+        task_name="daily",
+        chat_ids=("-1001", "-1002"),
+        message="等待回复超时",
+        first_text="单账号详细通知",
+        sample_logs=sample_logs or [],
+        accounts=list(accounts),
+    )
+
+
+def test_error_signature_ignores_account_names_and_numbers():
+    first = error_signature("alice: 等待 12.5 秒后超时 (msg 1001)", "alice")
+    second = error_signature("bob:  等待 3.0 秒后超时 (msg 2002)", "bob")
+
+    assert first == second == ": 等待 #.# 秒后超时 (msg #)"
+    assert error_signature("FloodWait 30s", "") == "floodwait #s"
+    assert error_signature("FloodWait 30s") != error_signature("Timeout 30s")
+    assert error_signature(None) == ""
+    assert len(error_signature("x" * 500)) == 160
+
+
+def test_render_single_account_keeps_original_text():
+    assert FailureDigest()._render(_group(["alice"])) == "单账号详细通知"
+
+
+def test_render_lists_accounts_and_truncates(monkeypatch):
+    monkeypatch.setattr(failure_digest, "_MAX_LISTED_ACCOUNTS", 2)
+    text = FailureDigest()._render(
+        _group(["alice", "bob", "carol"], sample_logs=["step 1", "step 2"])
+    )
+
+    assert text.splitlines()[:4] == [
+        "TG-SignPulse 任务执行失败汇总（3 个账号）",
+        "任务: daily",
+        "Chat: -1001, -1002",
+        "错误: 等待回复超时",
+    ]
+    assert "账号: alice, bob 等 3 个" in text
+    assert text.endswith("最近日志（alice）:\nstep 1\nstep 2")
+
+
+def test_failures_with_same_signature_are_sent_once(monkeypatch):
+    sent = []
+
+    async def _enqueue(**kwargs):
+        sent.append(kwargs)
+
+    monkeypatch.setattr(
+        failure_digest,
+        "get_notification_outbox",
+        lambda: SimpleNamespace(enqueue_telegram=_enqueue),
+    )
+    monkeypatch.setenv("NOTIFICATION_FAILURE_DIGEST_SECONDS", "60")
+
+    async def _main():
+        digest = FailureDigest()
+        for account, message in (
+            ("alice", "alice 超时 5 秒"),
+            ("bob", "bob 超时 7 秒"),
+            ("carol", "账号被限制"),
+        ):
+            await digest.add(
+                bot_token="token",
+                chat_id="42",
+                message_thread_id=None,
+                account_name=account,
+                task_name="daily",
+                target_chat_ids=[-1001],
+                message=message,
+                text=f"{account} 详细通知",
+            )
+        await digest.flush_all()
+        return digest
+
+    digest = asyncio.run(_main())
+
+    texts = [item["text"] for item in sent]
+    assert len(texts) == 2
+    assert "carol 详细通知" in texts
+    summary = next(text for text in texts if text != "carol 详细通知")
+    assert "账号: alice, bob" in summary
+    assert digest.stats()["failures_received"] == 3
+    assert digest.stats()["pending_groups"] == 0
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+
+from tg_signer import forwarding
+from tg_signer.forwarding import (
+    acquire_external_forwarder,
+    encode_message,
+    get_external_forwarder,
+    release_external_forwarder,
+)
+
+
+class _FakeMessage(SimpleNamespace):
+    def __str__(self):
+        return '{"_": "Message", "full": true}'
+
+
+class _FakeTransport:
+    def __init__(self):
+        self.closed = False
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+def _message():
+    return _FakeMessage(
+        id=7,
+        date=datetime(2024, 10, 19, 8, 0),
+        chat=SimpleNamespace(id=-100, type=None, title="group", username=None),
+        from_user=None,
+        text="hello",
+        caption=None,
+        media=None,
+        reply_to_message_id=None,
+    )
+
+
+def test_full_payload_is_default_and_compact_is_opt_in(monkeypatch):
+    monkeypatch.delenv("MONITOR_FORWARD_PAYLOAD", raising=False)
+    assert encode_message(_message()) == b'{"_": "Message", "full": true}'
+
+    monkeypatch.setenv("MONITOR_FORWARD_PAYLOAD", "compact")
+    compact = json.loads(encode_message(_message()))
+    assert compact["id"] == 7
+    assert compact["text"] == "hello"
+    assert compact["chat"] == {"id": -100, "title": "group"}
+    assert "from_user" not in compact
+
+
+async def _get():
+    return get_external_forwarder()
+
+
+def test_forwarder_of_closed_loop_is_discarded(monkeypatch):
+    monkeypatch.setattr(forwarding, "_forwarders", {})
+    transport = _FakeTransport()
+
+    async def _first():
+        forwarder = get_external_forwarder()
+        forwarder._udp[("127.0.0.1", 9)] = transport
+        return forwarder
+
+    first = asyncio.run(_first())
+    second = asyncio.run(_get())
+
+    assert second is not first
+    assert transport.closed
+    assert list(forwarding._forwarders.values()) == [second]
+
+
+def test_shared_forwarder_is_closed_by_last_user(monkeypatch):
+    monkeypatch.setattr(forwarding, "_forwarders", {})
+    monkeypatch.setattr(forwarding, "_forwarder_users", {})
+    monkeypatch.setenv("MONITOR_FORWARD_BATCH_SIZE", "10")
+    monkeypatch.setenv("MONITOR_FORWARD_BATCH_MS", "60000")
+    posted = []
+
+    def _handler(request):
+        posted.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    async def _main():
+        forwarder = acquire_external_forwarder()
+        acquire_external_forwarder()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_handler))
+        forwarder._http_client = client
+        await forwarder.send_http("http://sink/hook", None, b'{"id":1}')
+
+        # 还有一个使用者：只发送剩余批次，连接池保持打开
+        await release_external_forwarder()
+        after_first = (list(posted), client.is_closed)
+        await release_external_forwarder()
+        return after_first, client.is_closed
+
+    (posted_after_first, closed_after_first), closed_after_last = asyncio.run(_main())
+
+    assert posted_after_first == [[{"id": 1}]]
+    assert closed_after_first is False
+    assert closed_after_last is True
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import tg_signer.core
+from backend.core.config import Settings
+from backend.services import keyword_monitor
+from backend.services.keyword_monitor import KeywordMonitorRule, KeywordMonitorService
+from backend.utils.account_locks import get_account_lock
+
+ACCOUNTS = 12
+CONNECT_SECONDS = 0.2
+
+
+_ENTERED: dict[str, float] = {}
+
+
+class _FakeClient:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.is_connected = False
+        self._tg_signpulse_no_updates = False
+
+    def add_handler(self, handler):
+        return (handler, 0)
+
+    def remove_handler(self, *args):
+        pass
+
+    def watch_update_chats(self, owner, chat_ids):
+        pass
+
+    def unwatch_update_chats(self, owner):
+        pass
+
+    async def __aenter__(self):
+        _ENTERED[self.name] = time.perf_counter()
+        # slow 账号模拟代理卡死
+        await asyncio.sleep(3600 if self.name == "slow" else CONNECT_SECONDS)
+        self.is_connected = True
+        return self
+
+    async def __aexit__(self, *args):
+        self.is_connected = False
+
+
+def _rule(account_name: str) -> KeywordMonitorRule:
+    return KeywordMonitorRule(
+        account_name=account_name,
+        task_name="watch",
+        chat_id=1,
+        chat_name="chat",
+        message_thread_id=None,
+        action={"action": 8, "keywords": ["hi"]},
+    )
+
+
+def _patch_startup(tmp_path, monkeypatch):
+    config_service = SimpleNamespace(
+        get_global_settings=lambda: {}, get_telegram_config=lambda: {}
+    )
+    monkeypatch.setattr(Settings, "resolve_session_dir", lambda self: tmp_path)
+    monkeypatch.setattr(
+        "backend.services.config.get_config_service", lambda: config_service
+    )
+    monkeypatch.setattr(keyword_monitor, "get_account_proxy", lambda name: None)
+    monkeypatch.setattr(keyword_monitor, "get_session_mode", lambda: "file")
+    monkeypatch.setattr(tg_signer.core, "get_client", lambda name, **kwargs: _FakeClient(name))
+
+
+def test_restart_starts_accounts_concurrently_with_timeout(tmp_path, monkeypatch):
+    accounts = [f"acc{index:02d}" for index in range(ACCOUNTS - 1)] + ["slow"]
+    _patch_startup(tmp_path, monkeypatch)
+    monkeypatch.setenv("KEYWORD_MONITOR_START_CONCURRENCY", "4")
+    monkeypatch.setenv("KEYWORD_MONITOR_START_TIMEOUT", "1")
+
+    service = KeywordMonitorService()
+    monkeypatch.setattr(service, "_load_rules", lambda: [_rule(name) for name in accounts])
+
+    start = time.perf_counter()
+    asyncio.run(service.restart_from_tasks())
+    elapsed = time.perf_counter() - start
+
+    started = sorted(name for name, _client, _ref in service._handler_refs)
+    assert started == sorted(accounts[:-1])
+    # 串行需要 11 * 0.2 + 1 秒；并发 4 路时约为 max(3 * 0.2, 1) 秒
+    assert elapsed < 2.0
+    assert service._active_key == ""
+    slow_logs = service._task_logs[("slow", "watch")]
+    assert any("超时" in line for line in slow_logs)
+
+
+def test_account_busy_with_a_task_does_not_hold_a_start_slot(tmp_path, monkeypatch):
+    # 排序后 busy 最先启动；它的账号锁被正在执行的签到任务占用 1 秒
+    accounts = ["a-busy", "b1", "b2"]
+    _patch_startup(tmp_path, monkeypatch)
+    monkeypatch.setenv("KEYWORD_MONITOR_START_CONCURRENCY", "1")
+    monkeypatch.setenv("KEYWORD_MONITOR_START_TIMEOUT", "5")
+    service = KeywordMonitorService()
+    monkeypatch.setattr(service, "_load_rules", lambda: [_rule(name) for name in accounts])
+    _ENTERED.clear()
+
+    async def _main():
+        lock = get_account_lock("a-busy")
+        await lock.acquire()
+        asyncio.get_running_loop().call_later(1.0, lock.release)
+        start = time.perf_counter()
+        await service.restart_from_tasks()
+        return start
+
+    start = asyncio.run(_main())
+
+    assert sorted(name for name, _client, _ref in service._handler_refs) == accounts
+    assert _ENTERED["b1"] - start < 0.8
+    assert _ENTERED["b2"] - start < 0.8
+    assert _ENTERED["a-busy"] - start >= 1.0
@@ -0,0 +1,63 @@
+from tg_signer import latency
+from tg_signer.latency import (
+    FOLLOWUP_LATENCY_KEY,
+    LatencyHistogram,
+    LatencyStats,
+    followup_timeout,
+)
+
+
+def test_histogram_quantiles_and_decay(monkeypatch):
+    monkeypatch.setenv("SIGN_TASK_ADAPTIVE_TIMEOUT_HALF_LIFE_HOURS", "1")
+    histogram = LatencyHistogram(updated_at=0.0)
+    for _ in range(9):
+        histogram.add(0.15, now=0.0)
+    histogram.add(12.0, now=0.0)
+
+    assert histogram.quantile(0.5) == 0.2
+    assert histogram.quantile(0.99) == 12.0
+
+    # 一个半衰期后权重减半
+    histogram.decay(3600.0)
+    assert round(histogram.count, 3) == 5.0
+    # 很久之后只剩最近的新样本，旧的慢样本不再影响 p99 / max
+    histogram.decay(3600.0 * 20)
+    histogram.add(0.4, now=3600.0 * 20)
+    assert histogram.count == 1
+    assert histogram.quantile(0.99) == 0.4
+    assert histogram.max_ms == 400
+
+
+def test_timeouts_are_opt_in_and_back_off_after_a_timeout(tmp_path, monkeypatch):
+    stats = LatencyStats(tmp_path / "latency_stats.json")
+    for _ in range(20):
+        stats.record(1, "ClickKeyboardByTextAction", 0.8)
+
+    # 默认关闭：始终返回固定超时
+    assert stats.timeout_for(1, "ClickKeyboardByTextAction", 25.0) == 25.0
+
+    monkeypatch.setenv("SIGN_TASK_ADAPTIVE_TIMEOUT", "1")
+    assert stats.timeout_for(1, "ClickKeyboardByTextAction", 25.0) == 3.0
+
+    # 以 3 秒超时一次后，下一次超时至少翻倍，而不是继续按 p99 收缩
+    stats.record_timeout(1, "ClickKeyboardByTextAction", 3.0)
+    assert stats.timeout_for(1, "ClickKeyboardByTextAction", 25.0) == 6.0
+
+    stats.flush()
+    reloaded = LatencyStats(tmp_path / "latency_stats.json")
+    assert reloaded.timeout_for(1, "ClickKeyboardByTextAction", 25.0) == 6.0
+    assert reloaded.summary()[0]["timeouts"] == 1.0
+
+
+def test_followup_timeout_defaults_and_bounds(tmp_path, monkeypatch):
+    monkeypatch.setenv("SIGN_TASK_ADAPTIVE_TIMEOUT", "1")
+    assert followup_timeout(None, 1, 25.0) == latency.FOLLOWUP_DEFAULT_TIMEOUT
+    assert followup_timeout(None, 1, 4.0) == 4.0
+
+    stats = LatencyStats(tmp_path / "latency_stats.json")
+    for _ in range(10):
+        stats.record(1, FOLLOWUP_LATENCY_KEY, 0.1)
+    assert followup_timeout(stats, 1, 25.0) == 1.0
+    for _ in range(3):
+        stats.record_timeout(1, FOLLOWUP_LATENCY_KEY, 20.0)
+    assert followup_timeout(stats, 1, 25.0) == 25.0
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from backend.utils.loop_monitor import LoopMonitor
+
+
+def _block_loop(seconds):
+    time.sleep(seconds)
+
+
+def test_blocking_call_is_recorded_with_its_call_site(monkeypatch):
+    monkeypatch.setenv("LOOP_MONITOR_ENABLED", "1")
+    monkeypatch.setenv("LOOP_LAG_SAMPLE_INTERVAL", "0.02")
+    monkeypatch.setenv("LOOP_SLOW_CALLBACK_MS", "50")
+
+    async def _main():
+        monitor = LoopMonitor()
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            _block_loop(0.3)
+            # 让采样协程恢复心跳，看门狗据此结束本次阻塞的计时
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+        return monitor.report()
+
+    report = asyncio.run(_main())
+
+    assert report["stalls"] >= 1
+    assert report["lag_ms"]["max_since_start"] >= 200
+    site = report["top_sites"][0]
+    assert "_block_loop" in site["site"]
+    assert site["total_ms"] >= 150
+    assert any("_block_loop" in line for line in site["stack"])
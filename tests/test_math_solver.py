@@ -0,0 +1,87 @@
+import pytest
+
+from tg_signer.math_solver import (
+    chinese_to_int,
+    evaluate_expression,
+    solve_arithmetic,
+)
+
+SOLVABLE_CORPUS = [
+    ("12 + 7 = ?", "19"),
+    ("12+7=?", "19"),
+    ("请计算：15 × 3 = ?", "45"),
+    ("9 ÷ 3 =", "3"),
+    ("3x4=?", "12"),
+    ("验证码 8 - 10 = ?", "-2"),
+    ("（3+4）*2=？", "14"),
+    ("１２＋３＝？", "15"),
+    ("计算 7*8 的结果", "56"),
+    ("三加五等于多少", "8"),
+    ("三加五等于多少？", "8"),
+    ("二十三减去八等于几", "15"),
+    ("一百零三加七=?", "110"),
+    ("两万除以四等于？", "5000"),
+    ("拾贰乘以叁等于多少", "36"),
+    ("计算负三加五", "2"),
+    ("二点五加一点五等于多少", "4"),
+    ("100-25=?", "75"),
+    ("今天是2024-01-05，请计算 3+4=?", "7"),
+    ("请回答下面的问题：6+6等于多少？ 选项：A.12 B.13", "12"),
+]
+
+UNSOLVABLE_CORPUS = [
+    "",
+    "请点击正确答案",
+    "10 / 4 = ?",
+    "5 ** 3",
+    "1 / 0 = ?",
+    "2024-01-05 3+4",
+    "__import__('os').system('id')",
+    "9" * 13 + " + 1 = ?",
+    "这道题的答案是什么？",
+    "签到成功，今天是 2024-10-19",
+    "请输入验证码: 1234-5678",
+    "二十一点五加一",
+    "二十一点五加一等于多少",
+    "一百零三加七",
+    "计算日期 2024/10/19",
+    "联系电话 138-1234-5678，答案请私聊",
+    # 千分位 / 小数逗号会把数字截断成另一道题
+    "1,000 + 1 = ?",
+    "计算 2 + 1，500 = ?",
+    "3,5 + 1 = ?",
+    "12'000 - 1 = ?",
+]
+
+
+@pytest.mark.parametrize("text,expected", SOLVABLE_CORPUS)
+def test_solve_arithmetic_corpus(text, expected):
+    assert solve_arithmetic(text) == expected
+
+
+@pytest.mark.parametrize("text", UNSOLVABLE_CORPUS)
+def test_solve_arithmetic_falls_back(text):
+    assert solve_arithmetic(text) is None
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("三", 3),
+        ("十", 10),
+        ("十五", 15),
+        ("二十", 20),
+        ("一百零三", 103),
+        ("三千二百", 3200),
+        ("两万", 20000),
+        ("一二三", 123),
+    ],
+)
+def test_chinese_to_int(text, expected):
+    assert chinese_to_int(text) == expected
+
+
+def test_evaluate_expression_rejects_non_arithmetic():
+    assert evaluate_expression("abs(-1)") is None
+    assert evaluate_expression("(1).real") is None
+    assert evaluate_expression("2 ** 10") is None
@@ -0,0 +1,41 @@
+from tg_signer import media_sessions
+from tg_signer.media_sessions import MediaSessionPool, pool_account_id
+
+
+def test_pool_caps_dcs_per_account_and_expires_idle_keys(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(media_sessions.time, "monotonic", lambda: now[0])
+    monkeypatch.setenv("MEDIA_SESSION_POOL_SIZE", "2")
+    monkeypatch.setenv("MEDIA_SESSION_IDLE_SECONDS", "60")
+    pool = MediaSessionPool()
+    account = pool_account_id("acc", b"home-key")
+
+    for dc_id in (1, 4, 5):
+        pool.store(account, dc_id, b"key-%d" % dc_id)
+    # DC1 最久未使用，被挤出
+    assert pool.lookup(account, 1) is None
+    assert pool.lookup(account, 4) == b"key-4"
+
+    now[0] += 45
+    assert pool.lookup(account, 4) == b"key-4"
+    now[0] += 45
+    # DC5 空闲 90 秒已过期，DC4 刚被使用过仍保留
+    assert pool.lookup(account, 5) is None
+    assert pool.lookup(account, 4) == b"key-4"
+    assert pool.stats()["expired"] == 1
+
+
+def test_relogin_changes_account_id_and_counters(monkeypatch):
+    pool = MediaSessionPool()
+    old = pool_account_id("acc", b"old-key")
+    pool.store(old, 4, b"key")
+    assert pool.lookup(pool_account_id("acc", b"new-key"), 4) is None
+
+    pool.record_created()
+    pool.record_created()
+    pool.drop(old, 4)
+    stats = pool.stats()
+    assert stats["created_last_hour"] == 2
+    assert stats["created_total"] == 2
+    assert stats["invalidated"] == 1
+    assert stats["pooled_dcs"] == 0
@@ -0,0 +1,71 @@
+import pytest
+
+from tg_signer import memory
+from tg_signer.memory import MemoryTrimmer
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = {"now": 1000.0, "rss": 100 * MB, "collected": []}
+    monkeypatch.setattr(memory.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(memory, "get_rss_bytes", lambda: state["rss"])
+    monkeypatch.setattr(memory, "_load_malloc_trim", lambda: None)
+    monkeypatch.setattr(
+        memory.gc, "collect", lambda generation=2: state["collected"].append(generation)
+    )
+    monkeypatch.setenv("MEMORY_TRIM_RSS_GROWTH_MB", "64")
+    monkeypatch.setenv("MEMORY_TRIM_INTERVAL_SECONDS", "300")
+    monkeypatch.setenv("MEMORY_TRIM_MIN_INTERVAL_SECONDS", "30")
+    monkeypatch.delenv("MEMORY_TRIM_GC_GENERATION", raising=False)
+    return state
+
+
+def test_interval_gating(clock):
+    trimmer = MemoryTrimmer()
+
+    clock["now"] += 10
+    assert trimmer.request() is False
+    clock["now"] += 100
+    assert trimmer.request() is False
+    clock["now"] += 200
+    assert trimmer.request() is True
+    assert trimmer.last_reason == "interval"
+    # 刚回收过，间隔重新计算
+    clock["now"] += 60
+    assert trimmer.request() is False
+
+    stats = trimmer.stats()
+    assert stats["trims"] == 1
+    assert stats["skipped"] == 3
+    assert clock["collected"] == [1]
+
+
+def test_rss_growth_triggers_after_min_interval(clock):
+    trimmer = MemoryTrimmer()
+    clock["rss"] += 80 * MB
+
+    clock["now"] += 10
+    assert trimmer.request() is False
+    clock["now"] += 30
+    assert trimmer.request() is True
+    assert trimmer.last_reason == "rss_growth"
+
+    # 基线更新为回收后的 RSS，未继续增长则不再触发
+    clock["now"] += 60
+    assert trimmer.request() is False
+    clock["rss"] += 64 * MB
+    assert trimmer.request() is True
+    assert trimmer.trims == 2
+
+
+def test_forced_trim_runs_full_collection(clock, monkeypatch):
+    monkeypatch.setenv("MEMORY_TRIM_GC_GENERATION", "0")
+    trimmer = MemoryTrimmer()
+
+    assert trimmer.request(force=True) is True
+    clock["now"] += 300
+    assert trimmer.request() is True
+    assert clock["collected"] == [2, 0]
+    assert trimmer.stats()["gc_generation"] == 0
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from tg_signer.image_pipeline import pick_photo_file_id
+from tg_signer.message_snapshot import MessageRingBuffer, MessageSnapshot
+
+
+def _photo():
+    return SimpleNamespace(
+        file_id="full",
+        width=1280,
+        height=960,
+        thumbs=[
+            SimpleNamespace(file_id="small", width=320, height=240),
+            SimpleNamespace(file_id="medium", width=800, height=640),
+        ],
+    )
+
+
+def test_ring_buffer_evicts_oldest_and_keeps_position_on_update():
+    buffer = MessageRingBuffer(3)
+    for message_id in range(1, 6):
+        buffer[message_id] = message_id
+    assert list(buffer) == [3, 4, 5]
+
+    buffer[3] = None
+    buffer[6] = 6
+    assert list(buffer) == [4, 5, 6]
+
+
+def test_snapshot_keeps_fields_used_by_flows():
+    markup = object()
+    message = SimpleNamespace(
+        id=42,
+        chat=SimpleNamespace(id=-100, title="group"),
+        from_user=SimpleNamespace(id=1),
+        message_thread_id=7,
+        reply_to_top_message_id=None,
+        text=None,
+        caption="12 + 7 = ?",
+        media="photo",
+        photo=_photo(),
+        reply_markup=markup,
+        edit_date=None,
+    )
+    snapshot = MessageSnapshot.from_message(message)
+
+    assert (snapshot.id, snapshot.chat.id, snapshot.message_thread_id) == (42, -100, 7)
+    assert snapshot.caption == "12 + 7 = ?"
+    assert snapshot.reply_markup is markup
+    assert not hasattr(snapshot, "from_user")
+    assert pick_photo_file_id(snapshot.photo, 640) == pick_photo_file_id(message.photo, 640)
+    assert MessageSnapshot.from_message(snapshot) is snapshot
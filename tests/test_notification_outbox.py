@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.notification_outbox import NotificationOutbox
+from backend.services import notification_outbox
+from backend.services.notification_outbox import (
+    TELEGRAM_TEXT_LIMIT,
+    NotificationOutboxService,
+    TokenBucket,
+    _Item,
+)
+from backend.utils.time import utc_now_naive
+
+BOT_TOKEN = "123456:secret-token"
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'outbox.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    NotificationOutbox.__table__.create(engine)
+    session_local = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    monkeypatch.setattr(notification_outbox, "get_session_local", lambda: session_local)
+    monkeypatch.setenv("NOTIFICATION_RETRY_BASE_SECONDS", "10")
+    service = NotificationOutboxService()
+    service.session_local = session_local
+    return service
+
+
+def _rows(service):
+    with service.session_local() as db:
+        return db.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+
+
+def _item(text, item_id=1):
+    return _Item(
+        item_id,
+        "telegram",
+        "telegram:123456:42:",
+        {"bot_ref": "ref", "chat_id": "42", "text": text},
+        0,
+        utc_now_naive(),
+    )
+
+
+def test_token_bucket_refills_and_blocks(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(notification_outbox.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=1.0, capacity=2)
+
+    bucket.consume()
+    bucket.consume()
+    assert bucket.wait_time() == pytest.approx(1.0)
+    now[0] += 0.5
+    assert bucket.wait_time() == pytest.approx(0.5)
+
+    bucket.block(30)
+    assert bucket.wait_time() == pytest.approx(30)
+    now[0] += 31
+    assert bucket.wait_time() == 0
+
+
+def test_merge_batches_respects_text_limit(outbox):
+    items = [_item("a" * 1500, i) for i in range(1, 5)]
+
+    batches = outbox._merge_batches(items)
+
+    assert [[item.id for item in batch] for batch, _ in batches] == [[1, 2], [3, 4]]
+    for _, payload in batches:
+        assert len(payload["text"]) <= TELEGRAM_TEXT_LIMIT
+        assert payload["bot_ref"] == "ref"
+
+
+def test_token_is_not_persisted_and_messages_are_merged(outbox, monkeypatch):
+    sent = []
+
+    async def _fake_send(**kwargs):
+        sent.append(kwargs)
+
+    monkeypatch.setattr(
+        "backend.services.push_notifications.send_telegram_bot_message", _fake_send
+    )
+
+    async def _main():
+        for text in ("first", "second"):
+            await outbox.enqueue_telegram(bot_token=BOT_TOKEN, chat_id="42", text=text)
+        stored = [json.loads(row.payload) for row in _rows(outbox)]
+        await outbox._drain_once()
+        return stored
+
+    stored = asyncio.run(_main())
+
+    assert all("bot_token" not in payload for payload in stored)
+    assert BOT_TOKEN not in json.dumps(stored)
+    assert len(sent) == 1
+    assert sent[0]["bot_token"] == BOT_TOKEN
+    assert "first" in sent[0]["text"] and "second" in sent[0]["text"]
+    assert _rows(outbox) == []
+    assert outbox.merged == 1
+
+
+def test_failures_back_off_and_429_blocks_bot_and_chat(outbox, monkeypatch):
+    request = httpx.Request("POST", "https://api.telegram.org")
+    errors = [
+        httpx.HTTPStatusError(
+            "busy", request=request, response=httpx.Response(503, request=request)
+        ),
+        httpx.HTTPStatusError(
+            "slow down",
+            request=request,
+            response=httpx.Response(
+                429, json={"parameters": {"retry_after": 7}}, request=request
+            ),
+        ),
+    ]
+
+    async def _fail(kind, payload):
+        raise errors.pop(0)
+
+    monkeypatch.setattr(notification_outbox, "deliver", _fail)
+
+    async def _main():
+        await outbox.enqueue_telegram(bot_token=BOT_TOKEN, chat_id="42", text="x")
+        await outbox._drain_once()
+        first = _rows(outbox)[0]
+        # 让重试立即到期
+        with outbox.session_local() as db:
+            db.query(NotificationOutbox).update(
+                {NotificationOutbox.next_attempt_at: utc_now_naive()}
+            )
+            db.commit()
+        await outbox._drain_once()
+        return first, _rows(outbox)[0]
+
+    first, second = asyncio.run(_main())
+
+    assert first.attempts == 1
+    assert first.status == "pending"
+    delay = (first.next_attempt_at - utc_now_naive()).total_seconds()
+    assert 5 < delay <= 12
+    assert outbox.retries == 1
+
+    # 429：不计入失败次数，按 retry_after 推迟，bot 与 chat 桶都被暂停
+    assert second.attempts == 1
+    assert outbox.rate_limited == 1
+    assert outbox._buckets["bot:123456"].wait_time() > 6
+    assert outbox._buckets["chat:telegram:123456:42:"].wait_time() > 6
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.triggers.cron import CronTrigger
+
+from backend.scheduler.prewarm import (
+    LeadTrigger,
+    get_prewarm_seconds,
+    resolve_fire_target,
+)
+from backend.services.sign_tasks import _run_signer_with_timeout
+from tg_signer.core import UserSigner
+
+UTC = timezone.utc
+
+
+def _daily_at_eight():
+    return CronTrigger(hour=8, minute=0, timezone=UTC)
+
+
+def test_lead_trigger_fires_before_each_target():
+    trigger = LeadTrigger(_daily_at_eight(), 30)
+    now = datetime(2024, 10, 19, 7, 0, tzinfo=UTC)
+
+    first = trigger.get_next_fire_time(None, now)
+    assert first == datetime(2024, 10, 19, 7, 59, 30, tzinfo=UTC)
+    # 已进入提前窗口：下一次仍是今天的目标，而不是跳到明天
+    assert trigger.get_next_fire_time(None, first) == first
+    # 本次触发后，下一次对应明天的目标
+    assert trigger.get_next_fire_time(first, first + timedelta(seconds=1)) == first + timedelta(days=1)
+
+
+def test_resolve_fire_target_within_lead_window():
+    trigger = _daily_at_eight()
+    target = datetime(2024, 10, 19, 8, 0, tzinfo=UTC)
+
+    assert resolve_fire_target(trigger, 30, now=target - timedelta(seconds=30)) == target
+    # 触发过早（不在预热窗口内）或已错过目标时间：立即执行
+    assert resolve_fire_target(trigger, 30, now=target - timedelta(minutes=5)) is None
+    assert resolve_fire_target(trigger, 30, now=target + timedelta(seconds=5)) is None
+    assert resolve_fire_target(trigger, 0, now=target - timedelta(seconds=10)) is None
+
+
+def test_prewarm_seconds_bounds(monkeypatch):
+    monkeypatch.delenv("SIGN_TASK_PREWARM_SECONDS", raising=False)
+    assert get_prewarm_seconds() == 0.0
+    monkeypatch.setenv("SIGN_TASK_PREWARM_SECONDS", "1000")
+    assert get_prewarm_seconds() == 300.0
+    monkeypatch.setenv("SIGN_TASK_PREWARM_SECONDS", "bad")
+    assert get_prewarm_seconds() == 0.0
+
+
+def test_signer_concurrency_slot_is_released_once():
+    signer = UserSigner.__new__(UserSigner)
+    signer.concurrency_slot = asyncio.Semaphore(1)
+
+    async def _main():
+        await signer._acquire_concurrency_slot()
+        held = signer.concurrency_slot.locked()
+        signer._release_concurrency_slot()
+        signer._release_concurrency_slot()
+        return held
+
+    assert asyncio.run(_main()) is True
+    assert not signer.concurrency_slot.locked()
+    assert signer.concurrency_slot._value == 1
+
+
+def _queued_signer(slot, work_seconds):
+    signer = UserSigner.__new__(UserSigner)
+    signer.concurrency_slot = slot
+
+    async def _run(*args, **kwargs):
+        await asyncio.sleep(work_seconds)
+
+    signer.run = _run
+    return signer
+
+
+def test_waiting_for_a_slot_does_not_use_up_the_execution_timeout():
+    async def _main():
+        slot = asyncio.Semaphore(1)
+        await slot.acquire()
+        asyncio.get_running_loop().call_later(0.3, slot.release)
+        signer = _queued_signer(slot, 0.05)
+        await _run_signer_with_timeout(signer, 0.2)
+        return signer
+
+    signer = asyncio.run(_main())
+    assert signer.slot_wait_seconds >= 0.25
+    assert not signer.concurrency_slot.locked()
+
+
+def test_slow_run_still_times_out():
+    async def _main():
+        signer = _queued_signer(asyncio.Semaphore(1), 5.0)
+        try:
+            await _run_signer_with_timeout(signer, 0.1)
+        except asyncio.TimeoutError:
+            return signer
+        raise AssertionError("expected a timeout")
+
+    signer = asyncio.run(_main())
+    # 超时后任务被取消，名额已归还
+    assert not signer.concurrency_slot.locked()
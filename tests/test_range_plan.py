@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from backend.core.config import Settings
+from backend.scheduler import range_plan
+from backend.scheduler.range_plan import (
+    compute_next_run,
+    get_planned_run,
+    load_plans,
+    save_planned_run,
+)
+
+
+def test_next_run_uses_rest_of_todays_window():
+    now = datetime(2024, 10, 19, 9, 30)
+
+    for _ in range(50):
+        run_at = compute_next_run("09:00", "10:00", now)
+        assert now <= run_at <= datetime(2024, 10, 19, 10, 0)
+
+
+def test_next_run_before_and_after_window():
+    before = datetime(2024, 10, 19, 8, 0)
+    run_at = compute_next_run("09:00", "10:00", before)
+    assert datetime(2024, 10, 19, 9, 0) <= run_at <= datetime(2024, 10, 19, 10, 0)
+
+    after = datetime(2024, 10, 19, 10, 30)
+    run_at = compute_next_run("09:00", "10:00", after)
+    assert datetime(2024, 10, 20, 9, 0) <= run_at <= datetime(2024, 10, 20, 10, 0)
+
+
+def test_next_window_skips_the_current_window():
+    now = datetime(2024, 10, 19, 9, 30)
+    run_at = compute_next_run("09:00", "10:00", now, next_window=True)
+    assert datetime(2024, 10, 20, 9, 0) <= run_at <= datetime(2024, 10, 20, 10, 0)
+
+
+def test_overnight_window_started_yesterday():
+    now = datetime(2024, 10, 19, 0, 30)
+    run_at = compute_next_run("23:00", "01:00", now)
+    assert now <= run_at <= datetime(2024, 10, 19, 1, 0)
+
+    run_at = compute_next_run("23:00", "01:00", now, next_window=True)
+    assert datetime(2024, 10, 19, 23, 0) <= run_at <= datetime(2024, 10, 20, 1, 0)
+
+
+def test_planned_runs_can_be_read_from_preloaded_plans(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "resolve_workdir", lambda self: tmp_path)
+    run_at = datetime(2024, 10, 19, 9, 15)
+    save_planned_run("acc", "daily", "09:00", "10:00", run_at)
+
+    plans = load_plans()
+    monkeypatch.setattr(range_plan, "load_plans", lambda: {})
+
+    assert get_planned_run("acc", "daily", "09:00", "10:00", plans) == run_at
+    # 时间段配置变化后计划失效
+    assert get_planned_run("acc", "daily", "09:00", "11:00", plans) is None
+    assert get_planned_run("acc", "daily", "09:00", "10:00") is None
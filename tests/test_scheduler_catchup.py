@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.scheduler_job_state import SchedulerJobState
+from backend.scheduler import catchup
+
+UTC = timezone.utc
+NOW = datetime(2024, 10, 19, 12, 0, tzinfo=UTC)
+
+
+class _FakeJob:
+    def __init__(self, job_id, next_run_time):
+        self.id = job_id
+        self.next_run_time = next_run_time
+        self.trigger = CronTrigger(hour=8, minute=0, timezone=UTC)
+        self.removed = False
+
+    def modify(self, next_run_time):
+        self.next_run_time = next_run_time
+
+    def remove(self):
+        self.removed = True
+
+
+@pytest.fixture(autouse=True)
+def state_db(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'state.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SchedulerJobState.__table__.create(engine)
+    session_local = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    monkeypatch.setattr(catchup, "get_session_local", lambda: session_local)
+    monkeypatch.setenv("SCHEDULER_CATCHUP_WINDOW_HOURS", "24")
+    monkeypatch.setenv("SCHEDULER_CATCHUP_SPREAD_SECONDS", "10")
+
+
+def _run(jobs):
+    scheduler = SimpleNamespace(timezone=UTC, get_jobs=lambda: jobs)
+    return catchup.catch_up_missed_jobs(scheduler, now=NOW)
+
+
+def test_missed_jobs_in_window_are_spread_out():
+    jobs = [
+        _FakeJob("sign-a", NOW - timedelta(hours=4)),
+        _FakeJob("sign-b", NOW - timedelta(hours=2)),
+        _FakeJob("db-1", NOW - timedelta(hours=1)),
+    ]
+
+    assert _run(jobs) == 3
+    delays = [(job.next_run_time - NOW).total_seconds() for job in jobs]
+    assert 0 <= delays[0] < 10
+    assert 10 <= delays[1] < 20
+    assert 20 <= delays[2] < 30
+
+
+def test_jobs_outside_window_or_not_catchable_skip_to_next_run():
+    old = _FakeJob("sign-old", NOW - timedelta(days=2))
+    system = _FakeJob("system-maintenance", NOW - timedelta(hours=1))
+    upcoming = _FakeJob("sign-later", NOW + timedelta(hours=1))
+
+    assert _run([old, system, upcoming]) == 0
+    tomorrow_eight = datetime(2024, 10, 20, 8, 0, tzinfo=UTC)
+    assert old.next_run_time == tomorrow_eight
+    assert system.next_run_time == tomorrow_eight
+    assert upcoming.next_run_time == NOW + timedelta(hours=1)
+
+
+def test_already_fired_occurrence_is_not_run_again():
+    missed_at = NOW - timedelta(hours=4)
+    catchup.store_fire_time("sign-a", missed_at)
+    catchup.store_fire_time("sign-b", missed_at - timedelta(days=1))
+    fired = _FakeJob("sign-a", missed_at)
+    not_fired = _FakeJob("sign-b", missed_at)
+
+    assert _run([fired, not_fired]) == 1
+    assert fired.next_run_time == datetime(2024, 10, 20, 8, 0, tzinfo=UTC)
+    assert (not_fired.next_run_time - NOW).total_seconds() < 10
+    assert catchup.load_fire_times(["sign-a"]) == {
+        "sign-a": missed_at.replace(tzinfo=None)
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from tg_signer.session_storage import (
+    SHARED_DB_NAME,
+    SharedSessionDatabase,
+    SharedSessionStorage,
+    ThreadedFileStorage,
+)
+
+
+def test_threaded_storage_round_trip(tmp_path):
+    async def _main():
+        storage = ThreadedFileStorage("acc", tmp_path)
+        await storage.open()
+        await storage.dc_id(4)
+        await storage.api_id(12345)
+        await storage.test_mode(False)
+        await storage.is_bot(False)
+        await storage.auth_key(b"k" * 256)
+        await storage.user_id(42)
+        await storage.update_peers([(42, 7, "user", None)])
+        await storage.update_usernames([(42, ["someone"])])
+        await storage.save()
+        await storage.close()
+
+        reopened = ThreadedFileStorage("acc", tmp_path)
+        await reopened.open()
+        try:
+            peer = await reopened.get_peer_by_username("someone")
+            return (
+                await reopened.dc_id(),
+                await reopened.user_id(),
+                peer.user_id,
+                await reopened.export_session_string(),
+            )
+        finally:
+            await reopened.close()
+
+    dc_id, user_id, peer_id, session_string = asyncio.run(_main())
+
+    assert (dc_id, user_id, peer_id) == (4, 42, 42)
+    assert session_string
+    with sqlite3.connect(tmp_path / "acc.session") as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_locked_session_does_not_block_event_loop(tmp_path):
+    async def _prepare():
+        storage = ThreadedFileStorage("acc", tmp_path)
+        await storage.open()
+        await storage.close()
+
+    asyncio.run(_prepare())
+
+    blocker = sqlite3.connect(tmp_path / "acc.session", check_same_thread=False)
+    blocker.execute("BEGIN EXCLUSIVE")
+    threading.Timer(0.5, blocker.rollback).start()
+
+    async def _main():
+        storage = ThreadedFileStorage("acc", tmp_path)
+        await storage.open()
+        loop = asyncio.get_running_loop()
+        max_lag = 0.0
+        write = asyncio.ensure_future(storage.user_id(7))
+        while not write.done():
+            expected = loop.time() + 0.01
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, loop.time() - expected)
+        await write
+        value = await storage.user_id()
+        await storage.close()
+        return max_lag, value
+
+    start = time.perf_counter()
+    max_lag, value = asyncio.run(_main())
+    blocker.close()
+
+    assert value == 7
+    # 写入等待了锁释放，但事件循环一直在运行
+    assert time.perf_counter() - start >= 0.4
+    assert max_lag < 0.1
+
+
+def test_shared_storage_import_and_isolation(tmp_path):
+    db = SharedSessionDatabase(tmp_path / SHARED_DB_NAME)
+
+    async def _main():
+        source = ThreadedFileStorage("alice", tmp_path)
+        await source.open()
+        await source.auth_key(b"a" * 256)
+        await source.user_id(1)
+        await source.update_peers([(100, 5, "user", None)])
+        await source.save()
+        await source.close()
+
+        assert db.import_session_file("alice", tmp_path / "alice.session")
+
+        alice = SharedSessionStorage("alice", db)
+        bob = SharedSessionStorage(str(tmp_path / "bob"), db)
+        await alice.open()
+        await bob.open()
+        await bob.auth_key(b"b" * 256)
+        await bob.update_peers([(200, 9, "user", None)])
+        await bob.update_state((1, 10, 0, 0, 3))
+        peer = await alice.get_peer_by_id(100)
+        try:
+            await bob.get_peer_by_id(100)
+        except KeyError:
+            isolated = True
+        else:
+            isolated = False
+        return peer.user_id, await alice.user_id(), await bob.update_state(), isolated
+
+    try:
+        peer_id, user_id, bob_state, isolated = asyncio.run(_main())
+        assert (peer_id, user_id, isolated) == (100, 1, True)
+        assert bob_state == [(1, 10, 0, 0, 3)]
+        assert db.list_accounts() == ["alice", "bob"]
+
+        assert db.rename_account("bob", "carol")
+        assert db.delete_account("alice")
+        assert db.list_accounts() == ["carol"]
+        assert db.get_export_row("carol")[3] == b"b" * 256
+    finally:
+        db.close()
+
+
+def test_shared_db_async_helpers_run_off_the_event_loop(tmp_path):
+    db = SharedSessionDatabase(tmp_path / SHARED_DB_NAME)
+    threads = []
+    original = db.call_sync
+
+    def _recording_call_sync(func, *args):
+        threads.append(threading.current_thread().name)
+        return original(func, *args)
+
+    db.call_sync = _recording_call_sync
+
+    async def _main():
+        storage = SharedSessionStorage("alice", db)
+        await storage.open()
+        await storage.auth_key(b"a" * 256)
+        await storage.save()
+        threads.clear()
+        listed = await db.async_list_accounts()
+        renamed = await db.async_rename_account("alice", "bob")
+        exists = await db.async_has_account("bob")
+        deleted = await db.async_delete_account("bob")
+        return listed, renamed, exists, deleted, await db.async_list_accounts()
+
+    try:
+        assert asyncio.run(_main()) == (["alice"], True, True, True, [])
+        assert threads and all(name.startswith("session-shared") for name in threads)
+    finally:
+        db.close()
+
+
+def test_session_string_export_runs_off_the_event_loop(tmp_path, monkeypatch):
+    from backend.utils import tg_session
+
+    monkeypatch.delenv("TG_SESSION_BACKEND", raising=False)
+    conn = sqlite3.connect(str(tmp_path / "alice.session"))
+    conn.execute(
+        "CREATE TABLE sessions (dc_id INTEGER, api_id INTEGER, test_mode INTEGER, "
+        "auth_key BLOB, user_id INTEGER, is_bot INTEGER)"
+    )
+    conn.execute("INSERT INTO sessions VALUES (2, 1, 0, ?, 42, 0)", (b"k" * 256,))
+    conn.commit()
+    conn.close()
+
+    threads = []
+    original = tg_session._read_session_file_row
+
+    def _recording_read(session_file):
+        threads.append(threading.current_thread())
+        return original(session_file)
+
+    monkeypatch.setattr(tg_session, "_read_session_file_row", _recording_read)
+
+    async def _main():
+        return (
+            await tg_session.async_load_session_string_file(tmp_path, "alice"),
+            threading.current_thread(),
+        )
+
+    session_string, loop_thread = asyncio.run(_main())
+
+    assert session_string and session_string.startswith("1")
+    assert threads and threads[0] is not loop_thread
+    assert (tmp_path / "alice.session_string").read_text() == session_string
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import threading
+import time
+
+from backend.core.config import Settings
+from backend.services.sign_tasks import SignTaskService
+
+ACCOUNT = "acc"
+TASKS = 500
+
+
+def _make_service(tmp_path, monkeypatch) -> SignTaskService:
+    monkeypatch.setattr(Settings, "resolve_workdir", lambda self: tmp_path)
+    return SignTaskService()
+
+
+def _populate(service: SignTaskService) -> None:
+    flow_logs = [f"step {i}: 已发送签到消息并收到回复" for i in range(10)]
+    for index in range(TASKS):
+        task_name = f"task_{index:03d}"
+        task_dir = service.signs_dir / ACCOUNT / task_name
+        task_dir.mkdir(parents=True)
+        (task_dir / "config.json").write_text(
+            json.dumps({"account_name": ACCOUNT, "sign_at": "0 8 * * *", "chats": []}),
+            encoding="utf-8",
+        )
+        history = [
+            {
+                "time": f"2024-01-{day + 1:02d}T08:00:00",
+                "success": True,
+                "message": "ok",
+                "account_name": ACCOUNT,
+                "flow_logs": flow_logs,
+            }
+            for day in range(28)
+        ]
+        service._history_file_path(task_name, ACCOUNT).write_text(
+            json.dumps(history, ensure_ascii=False), encoding="utf-8"
+        )
+
+
+async def _max_lag_while(coro, interval: float = 0.005) -> tuple[float, object]:
+    loop = asyncio.get_running_loop()
+    max_lag = 0.0
+    done = False
+
+    async def _sample():
+        nonlocal max_lag
+        while not done:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            max_lag = max(max_lag, loop.time() - expected)
+
+    sampler = asyncio.create_task(_sample())
+    await asyncio.sleep(interval * 2)
+    try:
+        result = await coro
+    finally:
+        done = True
+        await sampler
+    return max_lag, result
+
+
+def test_history_reads_do_not_block_event_loop(tmp_path, monkeypatch):
+    service = _make_service(tmp_path, monkeypatch)
+    _populate(service)
+
+    async def _read_all():
+        tasks = await service.async_list_tasks(force_refresh=True)
+        histories = await asyncio.gather(
+            *(
+                service.async_get_task_history_logs(task["name"], ACCOUNT, limit=50)
+                for task in tasks
+            )
+        )
+        return tasks, histories
+
+    async def _main():
+        start = time.perf_counter()
+        max_lag, (tasks, histories) = await _max_lag_while(_read_all())
+        return max_lag, time.perf_counter() - start, tasks, histories
+
+    max_lag, elapsed, tasks, histories = asyncio.run(_main())
+
+    assert len(tasks) == TASKS
+    assert all(len(history) == 28 for history in histories)
+    # 同步读取会让事件循环整体阻塞数秒，放到线程池后单次延迟应远小于总耗时
+    assert max_lag < 0.25, f"max loop lag {max_lag * 1000:.1f}ms (total {elapsed:.2f}s)"
+
+
+def test_history_reads_run_on_worker_threads(tmp_path, monkeypatch):
+    service = _make_service(tmp_path, monkeypatch)
+    _populate(service)
+    io_threads = []
+
+    def _recording(method):
+        def _wrapper(*args, **kwargs):
+            io_threads.append(threading.get_ident())
+            return method(*args, **kwargs)
+
+        return _wrapper
+
+    monkeypatch.setattr(service, "_scan_tasks", _recording(service._scan_tasks))
+    monkeypatch.setattr(
+        service, "_load_history_entries", _recording(service._load_history_entries)
+    )
+
+    async def _main():
+        tasks = await service.async_list_tasks(force_refresh=True)
+        histories = await asyncio.gather(
+            *(
+                service.async_get_task_history_logs(task["name"], ACCOUNT, limit=50)
+                for task in tasks
+            )
+        )
+        return threading.get_ident(), tasks, histories
+
+    loop_thread, tasks, histories = asyncio.run(_main())
+
+    assert len(tasks) == TASKS
+    assert all(len(history) == 28 for history in histories)
+    # 目录扫描与历史读取都在文件 I/O 线程池中执行，不占用事件循环线程
+    assert len(io_threads) == TASKS + 1
+    assert loop_thread not in io_threads
+
+
+def test_stale_scan_does_not_overwrite_invalidated_cache(tmp_path, monkeypatch):
+    service = _make_service(tmp_path, monkeypatch)
+    _populate(service)
+    scan = service._scan_tasks
+
+    def _scan_then_invalidate():
+        tasks = scan()
+        # 扫描期间缓存被失效（例如任务被修改）
+        service._invalidate_tasks_cache()
+        return tasks
+
+    monkeypatch.setattr(service, "_scan_tasks", _scan_then_invalidate)
+    tasks = asyncio.run(service.async_list_tasks(force_refresh=True))
+
+    assert len(tasks) == TASKS
+    assert service._tasks_cache is None
+
+
+def test_concurrent_saves_to_same_history_are_serialized(tmp_path, monkeypatch):
+    service = _make_service(tmp_path, monkeypatch)
+    task_dir = service.signs_dir / ACCOUNT / "daily"
+    task_dir.mkdir(parents=True)
+    (task_dir / "config.json").write_text(
+        json.dumps({"account_name": ACCOUNT, "chats": []}), encoding="utf-8"
+    )
+
+    async def _main():
+        await asyncio.gather(
+            *(
+                service.async_save_run_info("daily", True, f"run {i}", ACCOUNT)
+                for i in range(30)
+            )
+        )
+
+    asyncio.run(_main())
+    entries = service._load_history_entries("daily", ACCOUNT)
+
+    assert sorted(entry["message"] for entry in entries) == sorted(
+        f"run {i}" for i in range(30)
+    )
+    config = json.loads((task_dir / "config.json").read_text(encoding="utf-8"))
+    assert config["last_run"]["message"].startswith("run ")
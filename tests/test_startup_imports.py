@@ -0,0 +1,32 @@
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_backend_main_does_not_import_pyrogram():
+    # Pyrogram 等重模块应在首次使用时加载，而不是在应用导入阶段
+    code = (
+        "import sys, backend.main; "
+        "print(','.join(m for m in ('pyrogram', 'tg_signer.core', 'openai') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_backend_main_leaves_sqlite3_connect_alone():
+    # 超时由各连接显式设置（SQLAlchemy connect_args、ThreadedFileStorage），不再全局替换
+    code = "import sqlite3; original = sqlite3.connect; import backend.main; print(sqlite3.connect is original)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "True"
@@ -0,0 +1,62 @@
+import asyncio
+
+import pyrogram
+from pyrogram import raw
+
+from tg_signer.core import Client
+
+WATCHED_CHANNEL = 1111
+OTHER_CHANNEL = 2222
+
+
+def _channel_message(channel_id: int, message_id: int):
+    return raw.types.UpdateNewChannelMessage(
+        message=raw.types.Message(
+            id=message_id,
+            peer_id=raw.types.PeerChannel(channel_id=channel_id),
+            date=0,
+            message="hi",
+        ),
+        pts=message_id,
+        pts_count=1,
+    )
+
+
+def _updates(*updates):
+    return raw.types.Updates(updates=list(updates), users=[], chats=[], date=0, seq=0)
+
+
+def test_client_drops_updates_for_unwatched_chats(tmp_path, monkeypatch):
+    passed = []
+
+    async def _base_handle_updates(self, updates):
+        passed.append(updates)
+
+    monkeypatch.setattr(pyrogram.Client, "handle_updates", _base_handle_updates)
+    async def _main():
+        # Pyrogram 在构造时获取事件循环，需在协程内创建
+        client = Client("acc", api_id=1, api_hash="x", workdir=tmp_path, key="test-update-filter")
+        # 未登记时不过滤
+        await client.handle_updates(_updates(_channel_message(OTHER_CHANNEL, 1)))
+        client.watch_update_chats("monitor", [-1000000000000 - WATCHED_CHANNEL])
+        await client.handle_updates(
+            _updates(_channel_message(WATCHED_CHANNEL, 2), _channel_message(OTHER_CHANNEL, 3))
+        )
+        await client.handle_updates(_updates(_channel_message(OTHER_CHANNEL, 4)))
+        await client.handle_updates(
+            raw.types.UpdateShortMessage(
+                id=5, user_id=42, message="hi", pts=5, pts_count=1, date=0
+            )
+        )
+        # 用户名无法与原始 peer 匹配，登记后关闭过滤
+        client.watch_update_chats("signer", ["@somebot"])
+        await client.handle_updates(_updates(_channel_message(OTHER_CHANNEL, 6)))
+        client.unwatch_update_chats("signer")
+        return client.update_filter.stats()
+
+    stats = asyncio.run(_main())
+
+    dispatched = [[u.message.id for u in updates.updates] for updates in passed]
+    assert dispatched == [[1], [2], [6]]
+    assert stats["filtering"] is True
+    assert (stats["received"], stats["dispatched"], stats["dropped"]) == (6, 3, 3)
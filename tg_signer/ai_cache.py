@@ -0,0 +1,253 @@
+"""
+Content-addressed cache for AI answers.
+
+Captcha bots reuse a small set of images and questions across accounts and
+days, so answers are cached under a hash of (kind, endpoint, model, prompt,
+query, options, image bytes). Entries expire after a TTL, the cache is
+bounded by LRU eviction and persisted as JSON in the workdir. Writes are
+debounced (``AI_ANSWER_CACHE_SAVE_DELAY`` seconds) and done in the default
+executor, off the event loop. Concurrent lookups of the same key share a
+single in-flight model call; if that call is cancelled, a waiting caller
+takes over and calls the model itself.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import pathlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from .utils import atomic_write_json, read_float_env, read_int_env
+
+logger = logging.getLogger("tg-signer")
+
+AI_CACHE_FILENAME = "ai_answer_cache.json"
+
+_MISSING = object()
+# 领头的调用被取消时交给等待者的结果：等待者重新发起请求
+_RETRY = object()
+
+
+def build_cache_key(
+    kind: str,
+    *,
+    model: str,
+    base_url: str = "",
+    system_prompt: str = "",
+    query: str = "",
+    options: Any = None,
+    image: Optional[Union[bytes, memoryview]] = None,
+) -> str:
+    digest = hashlib.sha256()
+    header = json.dumps(
+        [kind, base_url, model, system_prompt, query, options],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    digest.update(header.encode("utf-8"))
+    if image is not None:
+        digest.update(b"\x00image\x00")
+        digest.update(image)
+    return digest.hexdigest()
+
+
+class AIAnswerCache:
+    def __init__(
+        self,
+        path: Optional[pathlib.Path],
+        ttl_seconds: int,
+        max_entries: int,
+    ):
+        self.path = pathlib.Path(path) if path else None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self.save_delay = read_float_env("AI_ANSWER_CACHE_SAVE_DELAY", 5.0, 0.0)
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _load(self) -> None:
+        if not self.enabled or self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except Exception as e:
+            logger.debug(f"读取 AI 答案缓存失败: {e}")
+            return
+        if not isinstance(data, dict):
+            return
+        now = time.time()
+        items = [
+            (key, entry)
+            for key, entry in data.items()
+            if isinstance(entry, dict) and now - entry.get("created_at", 0) < self.ttl_seconds
+        ]
+        items.sort(key=lambda item: item[1].get("last_used", 0))
+        self._entries = OrderedDict(items[-self.max_entries:])
+
+    def flush(self) -> None:
+        """把未保存的修改写入文件（同步，可在线程池中调用）"""
+        if self.path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {key: dict(entry) for key, entry in self._entries.items()}
+                self._dirty = False
+            try:
+                atomic_write_json(self.path, data)
+            except Exception as e:
+                logger.warning(f"保存 AI 答案缓存失败: {e}")
+
+    def _schedule_save(self) -> None:
+        """标记有修改；在事件循环中延迟合并写入，没有运行中的循环时直接写入"""
+        if self.path is None:
+            return
+        with self._lock:
+            self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._save_handle is None:
+            self._save_handle = loop.call_later(self.save_delay, self._start_save, loop)
+
+    def _start_save(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._save_handle = None
+        loop.run_in_executor(None, self.flush)
+
+    def close(self) -> None:
+        """取消尚未到期的延迟保存并立即写入（进程退出时调用）"""
+        handle, self._save_handle = self._save_handle, None
+        if handle is not None:
+            handle.cancel()
+        self.flush()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if time.time() - entry.get("created_at", 0) >= self.ttl_seconds:
+                self._entries.pop(key, None)
+                return _MISSING
+            entry["last_used"] = time.time()
+            self._entries.move_to_end(key)
+            return entry.get("value")
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {"value": value, "created_at": now, "last_used": now}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        # flush() 需要再次获取 self._lock，必须在释放锁之后调用
+        self._schedule_save()
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            removed = [key for key in keys if self._entries.pop(key, None) is not None]
+        if removed:
+            self._schedule_save()
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """命中缓存直接返回；同 key 正在请求时复用同一次调用；结果为空时不缓存"""
+        if not self.enabled:
+            return await compute()
+
+        loop = asyncio.get_running_loop()
+        while True:
+            value = self.get(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+
+            future = self._inflight.get(key)
+            if future is None or future.get_loop() is not loop:
+                break
+            self.deduplicated += 1
+            value = await asyncio.shield(future)
+            if value is not _RETRY:
+                return value
+            # 领头的调用被取消：重新检查缓存，必要时由本调用接手
+
+        self.misses += 1
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if value not in (None, "", []):
+                self.put(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "deduplicated": self.deduplicated,
+        }
+
+
+_caches: Dict[str, AIAnswerCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_ai_answer_cache(workdir: Optional[Union[str, pathlib.Path]] = None) -> AIAnswerCache:
+    """按 workdir 返回进程内共享的缓存实例，签到与关键词监听共用同一份"""
+    path = (
+        pathlib.Path(workdir).resolve() / AI_CACHE_FILENAME if workdir else None
+    )
+    key = str(path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = AIAnswerCache(
+                path,
+                ttl_seconds=read_int_env("AI_ANSWER_CACHE_TTL", 7 * 86400, 0),
+                max_entries=read_int_env("AI_ANSWER_CACHE_MAX_ENTRIES", 2000, 0),
+            )
+            _caches[key] = cache
+        return cache
+
+
+def flush_ai_answer_caches() -> None:
+    """写入所有缓存实例中尚未保存的修改"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.close()
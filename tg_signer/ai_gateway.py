@@ -0,0 +1,223 @@
+"""
+Process-wide gateway for chat-completion calls.
+
+All ``AITools`` instances share one HTTP connection pool and one concurrency
+limit, every call gets an overall timeout, and when a secondary endpoint is
+configured a hedged request is sent to it if the primary has not answered
+within ``AI_HEDGE_AFTER_SECONDS``. The hedge clock and the latency metrics
+start once a call holds a concurrency slot, so time spent queued behind
+other calls neither triggers a hedge nor counts as model latency.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import httpx
+
+from tg_signer.latency import LatencyHistogram
+
+from .utils import read_float_env, read_int_env
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger("tg-signer")
+
+
+class _ModelMetrics:
+    __slots__ = ("histogram", "errors", "timeouts", "hedged", "hedge_wins")
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+        self.timeouts = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": round(self.histogram.count, 3),
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "p50": self.histogram.quantile(0.5),
+            "p90": self.histogram.quantile(0.9),
+            "p99": self.histogram.quantile(0.99),
+            "max": round(self.histogram.max_ms / 1000, 3),
+        }
+
+
+class AIGateway:
+    def __init__(self):
+        self.max_concurrency = read_int_env("AI_MAX_CONCURRENCY", 4, 1)
+        self.request_timeout = read_float_env("AI_REQUEST_TIMEOUT", 60.0, 1.0)
+        self.hedge_after = read_float_env("AI_HEDGE_AFTER_SECONDS", 8.0, 0.0)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._clients: Dict[Tuple[str, Optional[str]], "AsyncOpenAI"] = {}
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._metrics: Dict[str, _ModelMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.request_timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_keepalive_connections=self.max_concurrency * 2,
+                    max_connections=self.max_concurrency * 4,
+                ),
+                follow_redirects=True,
+            )
+            # 连接池重建后旧客户端不可再用
+            self._clients.clear()
+        return self._http_client
+
+    def get_client(self, api_key: str, base_url: Optional[str] = None) -> Optional["AsyncOpenAI"]:
+        from openai import AsyncOpenAI, OpenAIError
+
+        with self._lock:
+            http_client = self._get_http_client()
+            key = (api_key, base_url or None)
+            client = self._clients.get(key)
+            if client is None:
+                try:
+                    client = AsyncOpenAI(
+                        api_key=api_key,
+                        base_url=base_url or None,
+                        http_client=http_client,
+                        timeout=self.request_timeout,
+                    )
+                except OpenAIError:
+                    return None
+                self._clients[key] = client
+            return client
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(id(loop))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores = {id(loop): semaphore}
+        return semaphore
+
+    def _model_metrics(self, model: str) -> _ModelMetrics:
+        metrics = self._metrics.get(model)
+        if metrics is None:
+            metrics = self._metrics.setdefault(model, _ModelMetrics())
+        return metrics
+
+    async def _timed_call(
+        self,
+        client: "AsyncOpenAI",
+        model: str,
+        kwargs: Dict[str, Any],
+        started: Optional[asyncio.Event] = None,
+    ):
+        metrics = self._model_metrics(model)
+        try:
+            async with self._semaphore():
+                # 拿到并发名额后才开始计时，排队时间不计入耗时与对冲等待
+                start = time.perf_counter()
+                if started is not None:
+                    started.set()
+                result = await asyncio.wait_for(
+                    client.chat.completions.create(model=model, **kwargs),
+                    timeout=self.request_timeout,
+                )
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            metrics.errors += 1
+            raise
+        metrics.histogram.add(time.perf_counter() - start)
+        return result
+
+    async def create_completion(
+        self,
+        client: "AsyncOpenAI",
+        model: str,
+        *,
+        secondary: Optional[Tuple["AsyncOpenAI", str]] = None,
+        **kwargs,
+    ):
+        """
+        调用 chat.completions.create；配置了备用端点且主端点开始请求后超过阈值未返回时，
+        并发向备用端点发起请求，先返回者胜出，另一个被取消。
+        调用方被取消时，已发出的请求一并取消。
+        """
+        if secondary is None or self.hedge_after <= 0:
+            return await self._timed_call(client, model, kwargs)
+
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(
+            self._timed_call(client, model, kwargs, started=started)
+        )
+        pending = {primary}
+        last_error: Optional[BaseException] = None
+        try:
+            # 排队等待并发名额期间不对冲
+            started_wait = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait(
+                    {primary, started_wait}, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                started_wait.cancel()
+            if not primary.done():
+                await asyncio.wait({primary}, timeout=self.hedge_after)
+            if primary.done():
+                return primary.result()
+
+            secondary_client, secondary_model = secondary
+            self._model_metrics(model).hedged += 1
+            logger.info(
+                f"AI 请求 {model} 超过 {self.hedge_after:g}s 未返回，同时请求备用模型 {secondary_model}"
+            )
+            hedge = asyncio.ensure_future(
+                self._timed_call(secondary_client, secondary_model, kwargs)
+            )
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._model_metrics(model).hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error  # type: ignore[misc]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {model: metrics.to_dict() for model, metrics in list(self._metrics.items())}
+
+    async def aclose(self) -> None:
+        with self._lock:
+            http_client, self._http_client = self._http_client, None
+            self._clients.clear()
+        if http_client is not None and not http_client.is_closed:
+            await http_client.aclose()
+
+
+_gateway: Optional[AIGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_ai_gateway() -> AIGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = AIGateway()
+    return _gateway
@@ -10,6 +10,8 @@ from typing_extensions import Optional, Required, TypedDict
 if TYPE_CHECKING:
     from openai import AsyncOpenAI  # 在性能弱的机器上导入openai包实在有些慢
 
+from tg_signer.ai_cache import build_cache_key, get_ai_answer_cache
+from tg_signer.ai_gateway import get_ai_gateway
 from tg_signer.utils import UserInput, atomic_write_json, print_to_user
 
 DEFAULT_MODEL = "gpt-4o"
@@ -43,14 +45,19 @@ DEFAULT_CALCULATE_PROBLEM_PROMPT = (
 )
 
 
-def encode_image(image: bytes):
-    return base64.b64encode(image).decode("utf-8")
+def encode_image(image: Union[bytes, memoryview]) -> str:
+    # 支持 memoryview，直接对下载缓冲区做一次 base64，不再复制原始字节
+    return base64.b64encode(image).decode("ascii")
 
 
 class OpenAIConfig(TypedDict, total=False):
     api_key: Required[str]
     base_url: Optional[str]
     model: Optional[str]
+    # 备用端点：主端点响应过慢时对冲请求
+    secondary_api_key: Optional[str]
+    secondary_base_url: Optional[str]
+    secondary_model: Optional[str]
 
 
 class OpenAIConfigManager:
@@ -88,6 +95,9 @@ class OpenAIConfigManager:
                 api_key=os.environ["OPENAI_API_KEY"],
                 base_url=os.environ.get("OPENAI_BASE_URL"),
                 model=os.environ.get("OPENAI_MODEL", DEFAULT_MODEL),
+                secondary_api_key=os.environ.get("OPENAI_SECONDARY_API_KEY"),
+                secondary_base_url=os.environ.get("OPENAI_SECONDARY_BASE_URL"),
+                secondary_model=os.environ.get("OPENAI_SECONDARY_MODEL"),
             )
         return self.load_file_config()
 
@@ -116,25 +126,46 @@ class OpenAIConfigManager:
         return self.load_config()
 
 
-def get_openai_client(
-    api_key: str = None,
-    base_url: str = None,
-    **kwargs,
-) -> Optional["AsyncOpenAI"]:
-    from openai import AsyncOpenAI, OpenAIError
-
-    try:
-        return AsyncOpenAI(api_key=api_key, base_url=base_url, **kwargs)
-    except OpenAIError:
-        return None
-
-
 class AITools:
-    def __init__(self, cfg: OpenAIConfig):
-        self.client = get_openai_client(
-            api_key=cfg["api_key"], base_url=cfg.get("base_url")
-        )
+    def __init__(
+        self, cfg: OpenAIConfig, cache_dir: Union[str, pathlib.Path, None] = None
+    ):
+        self.gateway = get_ai_gateway()
+        self.client = self.gateway.get_client(cfg["api_key"], cfg.get("base_url"))
         self.default_model = cfg.get("model") or DEFAULT_MODEL
+        self.secondary_client = None
+        self.secondary_model = cfg.get("secondary_model") or None
+        if cfg.get("secondary_api_key") or cfg.get("secondary_base_url"):
+            self.secondary_client = self.gateway.get_client(
+                cfg.get("secondary_api_key") or cfg["api_key"],
+                cfg.get("secondary_base_url"),
+            )
+        self.cache = get_ai_answer_cache(cache_dir)
+        # 本实例最近使用过的缓存 key，答案被判定错误时可以作废
+        self.recent_cache_keys: list[str] = []
+
+    async def _create_completion(self, client: "AsyncOpenAI", *, model: str, **kwargs):
+        secondary = None
+        if client is self.client and self.secondary_client is not None:
+            secondary = (self.secondary_client, self.secondary_model or model)
+        return await self.gateway.create_completion(
+            client, model, secondary=secondary, **kwargs
+        )
+
+    async def _cached(
+        self, kind: str, compute, *, client: "AsyncOpenAI", model: str, **key_parts
+    ):
+        # 同名模型在不同服务商/代理上的回答可能不同，key 中包含 base_url
+        base_url = str(getattr(client, "base_url", "") or "")
+        key = build_cache_key(kind, model=model, base_url=base_url, **key_parts)
+        self.recent_cache_keys.append(key)
+        del self.recent_cache_keys[:-20]
+        return await self.cache.get_or_compute(key, compute)
+
+    def invalidate_recent_answers(self) -> None:
+        """作废本实例最近返回的答案（例如流程重试前），下次重新请求模型"""
+        keys, self.recent_cache_keys = self.recent_cache_keys, []
+        self.cache.invalidate(keys)
 
     async def choose_option_by_image(
         self,
@@ -150,6 +181,25 @@ class AITools:
         client = client or self.client
         model = model or self.default_model
         text_query = f"问题为：{query}, 选项为：{json.dumps(options)}。"
+
+        async def compute() -> int:
+            return await self._choose_option_by_image(
+                client, model, sys_prompt, text_query, image, temperature
+            )
+
+        return await self._cached(
+            "choose_option_by_image",
+            compute,
+            client=client,
+            model=model,
+            system_prompt=sys_prompt,
+            query=text_query,
+            image=image,
+        )
+
+    async def _choose_option_by_image(
+        self, client, model, sys_prompt, text_query, image, temperature
+    ) -> int:
         messages = [
             {"role": "system", "content": sys_prompt},
             {
@@ -166,7 +216,8 @@ class AITools:
             },
         ]
         # noinspection PyTypeChecker
-        completion = await client.chat.completions.create(
+        completion = await self._create_completion(
+            client,
             messages=messages,
             model=model,
             response_format={"type": "json_object"},
@@ -194,6 +245,25 @@ class AITools:
             f"Question/caption:\n{query}\n\n"
             f"Button options in row order:\n{json.dumps(options, ensure_ascii=False)}"
         )
+
+        async def compute() -> list[int]:
+            return await self._choose_options_by_image(
+                client, model, sys_prompt, text_query, image, temperature
+            )
+
+        return await self._cached(
+            "choose_options_by_image",
+            compute,
+            client=client,
+            model=model,
+            system_prompt=sys_prompt,
+            query=text_query,
+            image=image,
+        )
+
+    async def _choose_options_by_image(
+        self, client, model, sys_prompt, text_query, image, temperature
+    ) -> list[int]:
         messages = [
             {"role": "system", "content": sys_prompt},
             {
@@ -209,7 +279,8 @@ class AITools:
                 ],
             },
         ]
-        completion = await client.chat.completions.create(
+        completion = await self._create_completion(
+            client,
             messages=messages,
             model=model,
             response_format={"type": "json_object"},
@@ -243,6 +314,25 @@ class AITools:
         client = client or self.client
         model = model or self.default_model
         text_query = query or "Extract the key text from this image."
+
+        async def compute() -> str:
+            return await self._extract_text_by_image(
+                client, model, sys_prompt, text_query, image, temperature
+            )
+
+        return await self._cached(
+            "extract_text_by_image",
+            compute,
+            client=client,
+            model=model,
+            system_prompt=sys_prompt,
+            query=text_query,
+            image=image,
+        )
+
+    async def _extract_text_by_image(
+        self, client, model, sys_prompt, text_query, image, temperature
+    ) -> str:
         messages = [
             {"role": "system", "content": sys_prompt},
             {
@@ -258,7 +348,8 @@ class AITools:
                 ],
             },
         ]
-        completion = await client.chat.completions.create(
+        completion = await self._create_completion(
+            client,
             messages=messages,
             model=model,
             stream=False,
@@ -278,17 +369,29 @@ class AITools:
         model = model or self.default_model
         client = client or self.client
         text = f"问题是: {query}\n\n只需要给出答案，不要解释，不要输出任何其他内容。The answer is:"
-        # noinspection PyTypeChecker
-        completion = await client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": text},
-            ],
+
+        async def compute() -> str:
+            # noinspection PyTypeChecker
+            completion = await self._create_completion(
+                client,
+                messages=[
+                    {"role": "system", "content": sys_prompt},
+                    {"role": "user", "content": text},
+                ],
+                model=model,
+                stream=False,
+                temperature=temperature,
+            )
+            return completion.choices[0].message.content.strip()
+
+        return await self._cached(
+            "calculate_problem",
+            compute,
+            client=client,
             model=model,
-            stream=False,
-            temperature=temperature,
+            system_prompt=sys_prompt,
+            query=text,
         )
-        return completion.choices[0].message.content.strip()
 
     async def get_reply(
         self,
@@ -307,7 +410,8 @@ class AITools:
             {"role": "user", "content": f"{query}"},
         ]
         # noinspection PyTypeChecker
-        completion = await client.chat.completions.create(
+        completion = await self._create_completion(
+            client,
             messages=messages,
             model=model,
             stream=False,
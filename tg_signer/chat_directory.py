@@ -0,0 +1,286 @@
+"""
+In-memory directory of the cached chat lists of all accounts.
+
+``signs/<account>/chats_cache.json`` used to be re-read and re-parsed by the
+chat picker on every keystroke and by ``UserSigner._find_cached_chat`` (for
+every other account on a miss). ``ChatDirectory`` parses each file once and
+keeps, per account:
+
+- an id map, looked up with the ``-100`` / sign variants of the wanted id,
+- username and normalized-title maps for exact lookups,
+- a trigram index over ``title / username / id`` for substring search.
+
+A file is reloaded when its size or mtime changes. Writers call
+``invalidate(account)`` so a refresh is visible immediately. Cross-account
+lookups re-check the other accounts at most every
+``CHAT_DIRECTORY_RESCAN_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .utils import read_float_env
+
+CACHE_FILE_NAME = "chats_cache.json"
+_GRAM = 3
+
+
+def normalize_text(value: Any) -> str:
+    """标题/用户名归一化：NFKC + casefold，去掉首尾空白"""
+    if not value:
+        return ""
+    return unicodedata.normalize("NFKC", str(value)).casefold().strip()
+
+
+def id_variants(chat_id: int) -> Set[int]:
+    """同一 chat 的几种 id 写法：原值、取反，以及 -100 前缀的频道 id"""
+    return {chat_id, -chat_id, int(f"-100{abs(chat_id)}")}
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i : i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+class _AccountChats:
+    def __init__(self, signature: Tuple[int, int], chats: List[Dict[str, Any]]):
+        self.signature = signature
+        self.chats = chats
+        self.by_id: Dict[int, int] = {}
+        self.by_username: Dict[str, int] = {}
+        self.by_title: Dict[str, int] = {}
+        # 文本检索：标题、用户名（归一化），以及 id 的字符串形式
+        self.texts: List[str] = []
+        self.id_texts: List[str] = []
+        self.index: Dict[str, Set[int]] = {}
+        for position, chat in enumerate(chats):
+            chat_id = chat.get("id")
+            title = normalize_text(chat.get("title"))
+            username = normalize_text(chat.get("username")).lstrip("@")
+            if isinstance(chat_id, int) and not isinstance(chat_id, bool):
+                self.by_id.setdefault(chat_id, position)
+                id_text = str(chat_id)
+            else:
+                id_text = ""
+            if username:
+                self.by_username.setdefault(username, position)
+            if title:
+                self.by_title.setdefault(title, position)
+            text = f"{title}\n{username}"
+            self.texts.append(text)
+            self.id_texts.append(id_text)
+            for gram in _grams(text) | _grams(id_text):
+                self.index.setdefault(gram, set()).add(position)
+
+    def _candidates(self, needle: str) -> Iterable[int]:
+        if len(needle) < _GRAM:
+            return range(len(self.chats))
+        postings = sorted(
+            (self.index.get(gram, set()) for gram in _grams(needle)), key=len
+        )
+        if not postings or not postings[0]:
+            return ()
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return sorted(result)
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        q = query.strip()
+        if not q:
+            return list(self.chats)
+        if q.lstrip("-").isdigit():
+            # 数字查询只匹配 id，与旧实现一致
+            return [
+                self.chats[position]
+                for position in self._candidates(q)
+                if q in self.id_texts[position]
+            ]
+        needle = normalize_text(q)
+        prefix: List[Dict[str, Any]] = []
+        contains: List[Dict[str, Any]] = []
+        for position in self._candidates(needle):
+            text = self.texts[position]
+            index = text.find(needle)
+            if index < 0:
+                continue
+            # 标题或用户名以查询开头的排在前面
+            if index == 0 or text[index - 1] == "\n":
+                prefix.append(self.chats[position])
+            else:
+                contains.append(self.chats[position])
+        return prefix + contains
+
+    def find(self, candidate_ids: Set[int], name: Optional[str]) -> Optional[Dict[str, Any]]:
+        for chat_id in candidate_ids:
+            position = self.by_id.get(chat_id)
+            if position is not None:
+                return self.chats[position]
+        if name:
+            position = self.by_username.get(normalize_text(name).lstrip("@"))
+            if position is None:
+                position = self.by_title.get(normalize_text(name))
+            if position is not None:
+                return self.chats[position]
+        return None
+
+
+class ChatDirectory:
+    def __init__(self, signs_dir: Path):
+        self.signs_dir = Path(signs_dir)
+        self.rescan_seconds = read_float_env("CHAT_DIRECTORY_RESCAN_SECONDS", 30.0, 0.0)
+        self._accounts: Dict[str, _AccountChats] = {}
+        # 反向索引：chat id -> 缓存中包含该 chat 的账号
+        self._chat_accounts: Dict[int, Set[str]] = {}
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def _cache_file(self, account_name: str) -> Path:
+        return self.signs_dir / account_name / CACHE_FILE_NAME
+
+    def _set_entry(self, account_name: str, entry: Optional[_AccountChats]) -> None:
+        """替换账号的索引并同步反向索引，调用方需持有 self._lock"""
+        old = self._accounts.pop(account_name, None)
+        if old is not None:
+            for chat_id in old.by_id:
+                names = self._chat_accounts.get(chat_id)
+                if names is not None:
+                    names.discard(account_name)
+                    if not names:
+                        del self._chat_accounts[chat_id]
+        if entry is not None:
+            self._accounts[account_name] = entry
+            for chat_id in entry.by_id:
+                self._chat_accounts.setdefault(chat_id, set()).add(account_name)
+
+    def _load(self, account_name: str) -> Optional[_AccountChats]:
+        """返回账号的索引；文件未变化时直接复用，不存在或损坏时返回 None"""
+        cache_file = self._cache_file(account_name)
+        try:
+            stat = cache_file.stat()
+        except OSError:
+            with self._lock:
+                self._set_entry(account_name, None)
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        current = self._accounts.get(account_name)
+        if current is not None and current.signature == signature:
+            self.hits += 1
+            return current
+        try:
+            with open(cache_file, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, list):
+            return None
+        chats = [chat for chat in data if isinstance(chat, dict)]
+        entry = _AccountChats(signature, chats)
+        with self._lock:
+            self._set_entry(account_name, entry)
+            self.loads += 1
+        return entry
+
+    def invalidate(self, account_name: Optional[str] = None) -> None:
+        with self._lock:
+            if account_name is not None:
+                self._set_entry(account_name, None)
+            else:
+                self._accounts.clear()
+                self._chat_accounts.clear()
+            # 新写入的账号要在下一次跨账号查找时被发现
+            self._scanned_at = 0.0
+
+    def get_chats(self, account_name: str) -> Optional[List[Dict[str, Any]]]:
+        """账号的 Chat 列表副本（调用方修改不会影响索引）"""
+        entry = self._load(account_name)
+        if entry is None:
+            return None
+        return [dict(chat) for chat in entry.chats]
+
+    def search(self, account_name: str, query: str) -> List[Dict[str, Any]]:
+        entry = self._load(account_name)
+        if entry is None:
+            return []
+        return entry.search(query or "")
+
+    def _refresh_accounts(self) -> None:
+        now = time.monotonic()
+        if now - self._scanned_at >= self.rescan_seconds:
+            # 定期重新扫描目录：发现新账号、重新加载被外部修改的文件
+            try:
+                names = [
+                    path.name
+                    for path in self.signs_dir.iterdir()
+                    if path.is_dir() and (path / CACHE_FILE_NAME).exists()
+                ]
+            except OSError:
+                names = []
+            for name in names:
+                self._load(name)
+            with self._lock:
+                for stale in set(self._accounts) - set(names):
+                    self._set_entry(stale, None)
+                self._scanned_at = now
+
+    def _other_accounts(self, account_name: str) -> List[str]:
+        self._refresh_accounts()
+        return sorted(name for name in self._accounts if name != account_name)
+
+    def accounts_with_chat(
+        self, chat_id: int, exclude: Optional[str] = None
+    ) -> List[str]:
+        """缓存中包含该 chat id（精确匹配）的账号，查反向索引，不逐个读取账号缓存"""
+        self._refresh_accounts()
+        with self._lock:
+            names = self._chat_accounts.get(chat_id, set())
+            return sorted(name for name in names if name != exclude)
+
+    def find_chat(
+        self, account_name: str, chat_id: int, name: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """先查当前账号，再查其他账号的缓存（按 id 变体、用户名、标题匹配）"""
+        candidate_ids = id_variants(chat_id) if isinstance(chat_id, int) else {chat_id}
+        entry = self._load(account_name)
+        if entry is not None:
+            found = entry.find(candidate_ids, name)
+            if found is not None:
+                return found
+        for other in self._other_accounts(account_name):
+            other_entry = self._accounts.get(other)
+            if other_entry is None:
+                continue
+            found = other_entry.find(candidate_ids, name)
+            if found is not None:
+                return found
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "accounts": len(self._accounts),
+            "chats": sum(len(entry.chats) for entry in self._accounts.values()),
+            "loads": self.loads,
+            "hits": self.hits,
+        }
+
+
+_directories: Dict[Path, ChatDirectory] = {}
+_directories_lock = threading.Lock()
+
+
+def get_chat_directory(signs_dir: Path) -> ChatDirectory:
+    key = Path(signs_dir).resolve()
+    with _directories_lock:
+        directory = _directories.get(key)
+        if directory is None:
+            directory = _directories[key] = ChatDirectory(key)
+        return directory
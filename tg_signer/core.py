@@ -4,7 +4,6 @@ import logging
 import os
 import pathlib
 import random
-import sqlite3
 import time
 import unicodedata
 from collections import Counter, defaultdict
@@ -13,8 +12,8 @@ from datetime import time as dt_time
 from types import SimpleNamespace
 from typing import (
     Any,
-    BinaryIO,
     Generic,
+    Iterable,
     List,
     Optional,
     Type,
@@ -23,7 +22,6 @@ from typing import (
 )
 from urllib import parse
 
-import httpx
 from croniter import CroniterBadCronError, croniter
 from pydantic import BaseModel, Field, ValidationError
 
@@ -54,8 +52,26 @@ from tg_signer.config import (
 
 from .ai_tools import AITools, OpenAIConfigManager
 from .async_utils import create_logged_task
+from .chat_directory import get_chat_directory
+from .forwarding import (
+    acquire_external_forwarder,
+    encode_message,
+    get_external_forwarder,
+    release_external_forwarder,
+)
+from .image_pipeline import download_photo
+from .latency import (
+    FOLLOWUP_LATENCY_KEY,
+    LatencyStats,
+    default_action_timeout,
+    followup_timeout,
+)
+from .math_solver import solve_arithmetic_with_stats, solver_stats
+from .media_sessions import get_media_session_pool, pool_account_id
 from .memory import trim_memory
+from .message_snapshot import MessageRingBuffer, MessageSnapshot
 from .notification.server_chan import sc_send
+from .update_filter import UpdateFilter, short_update_chat_id, update_chat_id
 from .utils import UserInput, atomic_write_json, atomic_write_text, print_to_user
 
 _PYDANTIC_V2 = hasattr(BaseModel, "model_validate")
@@ -65,6 +81,7 @@ try:
     from pyrogram import Client as BaseClient
     from pyrogram import errors, filters, raw
     from pyrogram.enums import ChatMembersFilter, ChatType
+    from pyrogram.file_id import FileId
     from pyrogram.handlers import EditedMessageHandler, MessageHandler
     from pyrogram.methods.utilities.idle import idle
     from pyrogram.session import Session
@@ -183,51 +200,14 @@ else:
     def _raise_pyrogram_import_error() -> None:
         return None
 
-# Monkeypatch sqlite3.connect to increase default timeout
-_original_sqlite3_connect = sqlite3.connect
-
-
-def _patched_sqlite3_connect(*args, **kwargs):
-    # Force timeout to be at least 10 seconds, even if Pyrogram sets it to 1
-    if "timeout" in kwargs:
-        if kwargs["timeout"] < 30:
-            kwargs["timeout"] = 30
-    else:
-        kwargs["timeout"] = 30
-    return _original_sqlite3_connect(*args, **kwargs)
-
-
-sqlite3.connect = _patched_sqlite3_connect
-
-# Monkeypatch pyrogram FileStorage.open to skip VACUUM (causes exclusive locks)
-# and enable WAL mode + busy_timeout immediately on open
+# 文件会话使用 ThreadedFileStorage：SQLite 读写在每个会话库专属的线程中执行，
+# 会话文件被锁时不会阻塞事件循环；TG_SESSION_BACKEND=shared 时改用共享会话库
 try:
-    from pyrogram.storage.file_storage import FileStorage as _PyrogramFileStorage
-
-    _original_file_storage_open = _PyrogramFileStorage.open
-
-    async def _patched_file_storage_open(self):
-        path = self.database
-        file_exists = path.is_file()
-
-        self.conn = _original_sqlite3_connect(str(path), timeout=30, check_same_thread=False)
+    import pyrogram.client as _pyrogram_client_module
 
-        # Enable WAL mode and busy_timeout BEFORE any writes
-        try:
-            self.conn.execute("PRAGMA journal_mode=WAL")
-            self.conn.execute("PRAGMA busy_timeout=30000")
-        except Exception:
-            pass
-
-        if not file_exists:
-            self.create()
-        else:
-            self.update()
-
-        # Skip VACUUM - it requires exclusive lock and blocks other connections.
-        # WAL mode handles fragmentation well enough for session files.
+    from .session_storage import make_file_storage
 
-    _PyrogramFileStorage.open = _patched_file_storage_open
+    _pyrogram_client_module.FileStorage = make_file_storage
 except Exception:
     pass
 
@@ -372,10 +352,165 @@ class Client(BaseClient):
         self._tg_signpulse_no_updates = kwargs.get("no_updates")
         super().__init__(name, *args, **kwargs)
         self.key = key or str(pathlib.Path(self.workdir).joinpath(self.name).resolve())
+        # 只处理已登记 chat 的更新，见 watch_update_chats
+        self.update_filter = UpdateFilter()
+        # 媒体 DC 会话最近一次使用的时间，以及从连接池恢复（非新建）的 DC
+        self._media_session_used: dict[int, float] = {}
+        self._media_session_restored: set[int] = set()
         if self.in_memory and not self.session_string:
             self.load_session_string()
             self.storage = MemoryStorage(self.name, self.session_string)
 
+    def watch_update_chats(self, owner: str, chat_ids: Optional[Iterable[Any]]) -> None:
+        """
+        登记 owner 关心的 chat；有登记时其他 chat 的更新在拉取 difference 前即被丢弃。
+        chat_ids 为 None（或含用户名）表示需要全部更新。TG_UPDATE_FILTER=0 关闭过滤。
+        """
+        if os.getenv("TG_UPDATE_FILTER", "1").strip().lower() in {"0", "false", "no", "off"}:
+            chat_ids = None
+        self.update_filter.watch(owner, chat_ids)
+
+    def unwatch_update_chats(self, owner: str) -> None:
+        self.update_filter.unwatch(owner)
+
+    async def handle_updates(self, updates):
+        update_filter = self.update_filter
+        if isinstance(updates, (raw.types.Updates, raw.types.UpdatesCombined)):
+            received = len(updates.updates)
+            if update_filter.active:
+                kept = [
+                    update
+                    for update in updates.updates
+                    if update_filter.allows(update_chat_id(update))
+                ]
+                if len(kept) != received:
+                    updates.updates = kept
+            update_filter.record(received, len(updates.updates))
+            if not updates.updates:
+                # 全部无关：不解析 peers，不拉取 channel difference
+                self.last_update_time = datetime.now()
+                return
+        elif isinstance(
+            updates, (raw.types.UpdateShortMessage, raw.types.UpdateShortChatMessage)
+        ):
+            allowed = update_filter.allows(short_update_chat_id(updates))
+            update_filter.record(1, int(allowed))
+            if not allowed:
+                # 跳过基类为这条消息发起的 GetDifference
+                self.last_update_time = datetime.now()
+                return
+        elif isinstance(updates, raw.types.UpdateShort):
+            allowed = update_filter.allows(update_chat_id(updates.update))
+            update_filter.record(1, int(allowed))
+            if not allowed:
+                self.last_update_time = datetime.now()
+                return
+        return await super().handle_updates(updates)
+
+    async def _media_pool_account_id(self) -> str:
+        return pool_account_id(self.key, await self.storage.auth_key())
+
+    async def _stop_idle_media_sessions(self, now: float) -> None:
+        idle_seconds = get_media_session_pool().idle_seconds
+        for dc_id, used_at in list(self._media_session_used.items()):
+            if now - used_at <= idle_seconds:
+                continue
+            self._media_session_used.pop(dc_id, None)
+            self._media_session_restored.discard(dc_id)
+            session = self.media_sessions.pop(dc_id, None)
+            if session is not None:
+                try:
+                    await session.stop()
+                except Exception:
+                    pass
+
+    async def _prepare_media_session(self, file_id: str) -> Optional[int]:
+        """
+        下载前准备目标 DC 的媒体会话：运行中的会话直接复用；
+        否则用连接池里已授权的 auth key 建立会话，跳过 DH 交换与 Export/ImportAuthorization。
+        """
+        try:
+            dc_id = FileId.decode(file_id).dc_id
+        except Exception:
+            return None
+        pool = get_media_session_pool()
+        now = time.monotonic()
+        async with self.media_sessions_lock:
+            await self._stop_idle_media_sessions(now)
+            if self.media_sessions.get(dc_id) is not None:
+                pool.reused += 1
+                self._media_session_used[dc_id] = now
+                return dc_id
+            if dc_id == await self.storage.dc_id():
+                return dc_id
+            account_id = await self._media_pool_account_id()
+            auth_key = pool.lookup(account_id, dc_id)
+            if auth_key is None:
+                return dc_id
+            session = Session(
+                self, dc_id, auth_key, await self.storage.test_mode(), is_media=True
+            )
+            try:
+                # Session.start 在连接错误时会无限重试，过期的 key 需要超时兜底
+                await asyncio.wait_for(session.start(), timeout=15)
+            except Exception as exc:
+                logger.debug("Pooled media session for DC%s unusable: %s", dc_id, exc)
+                pool.drop(account_id, dc_id)
+                try:
+                    await session.stop()
+                except Exception:
+                    pass
+                return dc_id
+            self.media_sessions[dc_id] = session
+            self._media_session_restored.add(dc_id)
+            self._media_session_used[dc_id] = now
+            pool.restored += 1
+        return dc_id
+
+    async def _harvest_media_sessions(self) -> None:
+        """把新建的媒体会话计数，并把非主 DC 的已授权 auth key 存入连接池"""
+        pool = get_media_session_pool()
+        home_dc = await self.storage.dc_id()
+        account_id = None
+        now = time.monotonic()
+        for dc_id, session in list(self.media_sessions.items()):
+            if dc_id not in self._media_session_used:
+                self._media_session_used[dc_id] = now
+                if dc_id not in self._media_session_restored:
+                    pool.record_created()
+            if dc_id == home_dc or getattr(session, "is_cdn", False):
+                continue
+            if account_id is None:
+                account_id = await self._media_pool_account_id()
+            pool.store(account_id, dc_id, session.auth_key)
+
+    async def download_media(self, message, *args, **kwargs):
+        if not isinstance(message, str):
+            return await super().download_media(message, *args, **kwargs)
+        dc_id = await self._prepare_media_session(message)
+        restored = dc_id is not None and dc_id in self._media_session_restored
+        result = await super().download_media(message, *args, **kwargs)
+        empty = result is None or (
+            hasattr(result, "getbuffer") and result.getbuffer().nbytes == 0
+        )
+        if restored and empty:
+            # 恢复的授权可能已被服务端撤销：丢弃，下次由 Pyrogram 重新授权
+            pool = get_media_session_pool()
+            pool.drop(await self._media_pool_account_id(), dc_id)
+            self._media_session_restored.discard(dc_id)
+            self._media_session_used.pop(dc_id, None)
+            session = self.media_sessions.pop(dc_id, None)
+            if session is not None:
+                try:
+                    await session.stop()
+                except Exception:
+                    pass
+        else:
+            await self._harvest_media_sessions()
+            if dc_id in self._media_session_used:
+                self._media_session_used[dc_id] = time.monotonic()
+        return result
+
     async def __aenter__(self):
         lock = _CLIENT_ASYNC_LOCKS.get(self.key)
         if lock is None:
@@ -384,71 +519,40 @@ class Client(BaseClient):
         async with lock:
             _CLIENT_REFS[self.key] += 1
             if _CLIENT_REFS[self.key] == 1:
-                # Retry loop for database locks
-                max_retries = 5
-                for attempt in range(max_retries):
-                    try:
-                        if not self.is_connected:
-                            is_authorized = await self.connect()
-                            if not is_authorized:
-                                raise ConnectionError("Session invalid: unauthorized")
-
-                        try:
-                            self.me = await self.get_me()
-                        except Exception as e:
-                            # Prevent interactive login attempt
-                            raise ConnectionError(f"Session invalid: {e}")
-
-                        try:
-                            await self.invoke(raw.functions.updates.GetState())
-                        except ConnectionError as e:
-                            if "already started" not in str(e).lower():
-                                raise e
-                        try:
-                            if not getattr(self, "is_initialized", False):
-                                await self.initialize()
-                        except ConnectionError as e:
-                            if "already initialized" not in str(e).lower():
-                                raise e
-
-                        # Enable WAL mode after start (redundant with patch but safe)
-                        if hasattr(self, "storage") and hasattr(self.storage, "conn"):
-                            try:
-                                self.storage.conn.execute("PRAGMA journal_mode=WAL")
-                                self.storage.conn.execute("PRAGMA busy_timeout=30000")
-                            except Exception as e:
-                                logger.error(f"Failed to enable WAL mode: {e}")
-
-                        # Success! Break loop
-                        break
+                try:
+                    if not self.is_connected:
+                        is_authorized = await self.connect()
+                        if not is_authorized:
+                            raise ConnectionError("Session invalid: unauthorized")
 
+                    try:
+                        self.me = await self.get_me()
                     except Exception as e:
-                        # If this is a database lock and we have retries left, wait and retry
-                        is_locked = "database is locked" in str(e).lower()
-                        if is_locked and attempt < max_retries - 1:
-                            # Cleanup before retry
-                            try:
-                                if self.is_connected:
-                                    await self.stop()
-                            except Exception:
-                                pass
+                        # Prevent interactive login attempt
+                        raise ConnectionError(f"Session invalid: {e}")
 
-                            wait_time = 2 + (attempt * 3)
-                            logger.warning(f"Database locked when starting client {self.name}, retrying in {wait_time}s... ({attempt + 1}/{max_retries})")
-                            await asyncio.sleep(wait_time)
-                            continue
-
-                        # If execution reaches here, it's a fatal error or retries exhausted
-                        # Rollback the ref count
-                        _CLIENT_REFS[self.key] -= 1
-                        if _CLIENT_REFS[self.key] <= 0:
-                            _CLIENT_REFS.pop(self.key, None)
-                            _CLIENT_INSTANCES.pop(self.key, None)
-                            try:
-                                await self.stop()
-                            except Exception:
-                                pass
-                        raise e
+                    try:
+                        await self.invoke(raw.functions.updates.GetState())
+                    except ConnectionError as e:
+                        if "already started" not in str(e).lower():
+                            raise e
+                    try:
+                        if not getattr(self, "is_initialized", False):
+                            await self.initialize()
+                    except ConnectionError as e:
+                        if "already initialized" not in str(e).lower():
+                            raise e
+                except BaseException:
+                    # Rollback the ref count (also on cancellation, e.g. a start timeout)
+                    _CLIENT_REFS[self.key] -= 1
+                    if _CLIENT_REFS[self.key] <= 0:
+                        _CLIENT_REFS.pop(self.key, None)
+                        _CLIENT_INSTANCES.pop(self.key, None)
+                        try:
+                            await self.stop()
+                        except Exception:
+                            pass
+                    raise
             return self
 
     async def clear_client_cache(self):
@@ -457,6 +561,13 @@ class Client(BaseClient):
             # Clean up media sessions (extra DC connections)
             media_sessions = getattr(self, "media_sessions", None)
             if isinstance(media_sessions, dict):
+                # 停止前把已授权的 auth key 留在连接池，下次下载免去重新授权
+                try:
+                    await self._harvest_media_sessions()
+                except Exception as exc:
+                    logger.debug("Media session harvest failed: %s", exc)
+                self._media_session_used.clear()
+                self._media_session_restored.clear()
                 for dc_id, session in list(media_sessions.items()):
                     try:
                         if hasattr(session, "stop"):
@@ -1116,7 +1227,7 @@ class BaseUserWorker(Generic[ConfigT]):
         cfg = self.ensure_ai_cfg()
         signature = self._build_ai_cfg_signature(cfg)
         if self._ai_tools is None or self._ai_cfg_signature != signature:
-            self._ai_tools = AITools(cfg)
+            self._ai_tools = AITools(cfg, cache_dir=self.workdir)
             self._ai_cfg_signature = signature
         return self._ai_tools
 
@@ -1161,7 +1272,7 @@ class UserSignerWorkerContext(BaseModel):
 
     waiter: Waiter
     sign_chats: dict  # 签到配置列表, int -> list[SignChatV3]
-    chat_messages: dict  # 收到的消息, int -> dict[int, Optional[Message]]
+    chat_messages: dict  # 收到的消息, int -> MessageRingBuffer[int, Optional[MessageSnapshot]]
     waiting_message: Optional[Message] = None  # 正在处理的消息
     stop_after_current_action: bool = False
     stop_reason: Optional[str] = None
@@ -1177,12 +1288,22 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
     _tasks_dir = "signs"
     cfg_cls = SignConfigV3
     context: UserSignerWorkerContext
+    # 预热模式：首个动作的目标时间戳，以及实际发送相对目标时间的偏差（秒）
+    fire_at: Optional[float] = None
+    fire_offset: Optional[float] = None
+    # 预热模式下的并发名额：预热与发送阶段持有，等待目标时间期间释放
+    concurrency_slot: Optional[asyncio.Semaphore] = None
+    _slot_held: bool = False
+    # 排队等待并发名额的累计时间（事件循环时间），调用方据此把等待排除在执行超时之外
+    slot_wait_seconds: float = 0.0
+    _slot_wait_started: Optional[float] = None
+    latency_stats: Optional[LatencyStats] = None
 
     def ensure_ctx(self) -> UserSignerWorkerContext:
         return UserSignerWorkerContext(
             waiter=Waiter(),
             sign_chats=defaultdict(list),
-            chat_messages=defaultdict(dict),
+            chat_messages=defaultdict(MessageRingBuffer),
             waiting_message=None,
             stop_after_current_action=False,
             stop_reason=None,
@@ -1193,6 +1314,27 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
             logged_action_message_markers=set(),
         )
 
+    def _adaptive_timeout(
+        self, chat_id: int, action_type: str, default: float, **bounds
+    ) -> float:
+        if self.latency_stats is None:
+            return default
+        return self.latency_stats.timeout_for(chat_id, action_type, default, **bounds)
+
+    def _followup_timeout(self, chat: SignChatV3, timeout: float) -> float:
+        return followup_timeout(self.latency_stats, chat.chat_id, timeout)
+
+    def _record_latency(self, chat_id: int, action_type: str, start: float) -> None:
+        if self.latency_stats is not None:
+            self.latency_stats.record(chat_id, action_type, time.perf_counter() - start)
+
+    def _record_latency_timeout(self, chat_id: int, action_type: str, timeout: float) -> None:
+        if self.latency_stats is not None:
+            self.latency_stats.record_timeout(chat_id, action_type, timeout)
+
+    def _record_action_latency(self, chat: SignChatV3, action, start: float) -> None:
+        self._record_latency(chat.chat_id, type(action).__name__, start)
+
     @staticmethod
     def _resolve_action_delay(action, fallback_delay: float) -> float:
         raw_delay = getattr(action, "delay", None)
@@ -1215,71 +1357,12 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
         except (TypeError, ValueError):
             return max(float(fallback_delay or 0), 0.0)
 
-    def _load_chat_cache(self) -> List[dict]:
-        try:
-            cache_file = self.tasks_dir / self._account / "chats_cache.json"
-            if not cache_file.exists():
-                return []
-            with open(cache_file, "r", encoding="utf-8") as fp:
-                data = json.load(fp)
-            return data if isinstance(data, list) else []
-        except Exception:
-            return []
-
     def _find_cached_chat(self, chat_id: int, name: Optional[str]) -> Optional[dict]:
-        entries = self._load_chat_cache()
-
-        candidate_ids = {chat_id}
-        if isinstance(chat_id, int):
-            candidate_ids.add(-chat_id)
-            try:
-                candidate_ids.add(int(f"-100{abs(chat_id)}"))
-            except Exception:
-                pass
-
-        def _search_entries(cache_entries: List[dict]) -> Optional[dict]:
-            for entry in cache_entries:
-                try:
-                    if entry.get("id") in candidate_ids:
-                        return entry
-                except Exception:
-                    continue
-            if name:
-                name_key = name.strip().lower().lstrip("@")
-                for entry in cache_entries:
-                    username = (entry.get("username") or "").strip().lower()
-                    title = (entry.get("title") or "").strip().lower()
-                    if username and username == name_key:
-                        return entry
-                    if title and title == name.strip().lower():
-                        return entry
-            return None
-
-        # 1. Search current account cache
-        found = _search_entries(entries)
-        if found:
-            return found
-
-        # 2. Search all other accounts caches
+        """在当前账号、再在其他账号的 chats_cache.json 中查找 chat（共享内存索引）"""
         try:
-            for account_dir in self.tasks_dir.iterdir():
-                if not account_dir.is_dir() or account_dir.name == self._account:
-                    continue
-                other_cache_file = account_dir / "chats_cache.json"
-                if other_cache_file.exists():
-                    try:
-                        with open(other_cache_file, "r", encoding="utf-8") as fp:
-                            other_data = json.load(fp)
-                        if isinstance(other_data, list):
-                            found = _search_entries(other_data)
-                            if found:
-                                return found
-                    except Exception:
-                        continue
+            return get_chat_directory(self.tasks_dir).find_chat(self._account, chat_id, name)
         except Exception:
-            pass
-
-        return None
+            return None
 
     @property
     def sign_record_file(self):
@@ -1432,10 +1515,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                 sign_record = json.load(fp)
         return sign_record
 
-    async def sign_a_chat(
-        self,
-        chat: SignChatV3,
-    ):
+    async def _preheat_chat(self, chat: SignChatV3):
         try:
             # 预热会话，确保 peer/access_hash 可用
             await self.app.get_chat(chat.chat_id)
@@ -1540,6 +1620,14 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                 raise RuntimeError(
                     f"Failed to preheat chat_id {chat.chat_id}: {e}"
                 ) from e
+
+    async def sign_a_chat(
+        self,
+        chat: SignChatV3,
+        preheated: bool = False,
+    ):
+        if not preheated:
+            await self._preheat_chat(chat)
         self.log(self._describe_chat_run(chat))
         total_actions = len(chat.actions)
         if total_actions == 0:
@@ -1583,6 +1671,9 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                             action,
                             next_action=next_action,
                         )
+                        if self.fire_at is not None and self.fire_offset is None:
+                            # 首个动作发送完成的时间相对目标时间的偏差
+                            self.fire_offset = time.time() - self.fire_at
                         if result is False:
                             raise RuntimeError(
                                 f"{self._current_action_step_label()}执行失败：{action_description}"
@@ -1607,6 +1698,9 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
             except Exception as exc:
                 last_error = exc
                 self.context.waiting_message = None
+                if self._ai_tools is not None:
+                    # 流程失败时缓存的 AI 答案可能是错的，重试时重新请求模型
+                    self._ai_tools.invalidate_recent_answers()
                 if flow_attempt >= max_flow_attempts:
                     break
                 self.log(
@@ -1655,17 +1749,40 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
             raise RuntimeError("Task config has no chats to execute")
 
         sign_record = self.load_sign_record()
+        self.latency_stats = LatencyStats.for_account(self.tasks_dir, self._account)
         chat_ids = [c.chat_id for c in config.chats]
         need_update_handlers = bool(getattr(config, "requires_updates", True))
         message_handler_ref = None
         edited_handler_ref = None
+        # 共享 client（如关键词监听）按 chat 过滤更新时，登记本任务的 chat
+        update_owner = f"signer:{self.task_name}:{id(self)}"
+
+        async def wait_until_fire_at(preheated_chat_ids: set):
+            for chat in config.chats:
+                try:
+                    await self._preheat_chat(chat)
+                    preheated_chat_ids.add(chat.chat_id)
+                except Exception as e:
+                    # 预热失败时由 sign_a_chat 在执行时重新解析
+                    self.log(f"提前预热会话失败: {e}", level="WARNING")
+            remaining = self.fire_at - time.time()
+            if remaining > 0:
+                self.log(f"预热完成，等待 {remaining:.2f} 秒后执行")
+                self._release_concurrency_slot()
+                await asyncio.sleep(remaining)
+                await self._acquire_concurrency_slot()
 
         async def sign_once():
             success_count = 0
+            preheated_chat_ids: set = set()
+            if self.fire_at is not None:
+                await wait_until_fire_at(preheated_chat_ids)
             for chat in config.chats:
                 self.context.sign_chats[chat.chat_id].append(chat)
                 try:
-                    await self.sign_a_chat(chat)
+                    await self.sign_a_chat(
+                        chat, preheated=chat.chat_id in preheated_chat_ids
+                    )
                     success_count += 1
                 except errors.RPCError as _e:
                     self.log(
@@ -1701,6 +1818,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
         try:
             while True:
                 if need_update_handlers and message_handler_ref is None:
+                    self.app.watch_update_chats(update_owner, chat_ids)
                     message_handler_ref = self.app.add_handler(
                         MessageHandler(self.on_message, filters.chat(chat_ids))
                     )
@@ -1721,7 +1839,11 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                                 delay = random.randint(0, int(config.random_seconds))
                                 if delay > 0:
                                     self.log(f"单次执行随机延迟: {delay} 秒")
-                                    await asyncio.sleep(delay)
+                                    if self.fire_at is not None:
+                                        self.fire_at += delay
+                                    else:
+                                        await asyncio.sleep(delay)
+                            self.fire_offset = None
                             await sign_once()
                     finally:
                         if started_here:
@@ -1747,6 +1869,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                 await asyncio.sleep((next_run - now).total_seconds())
         finally:
             # Always clean up handlers, even on exception
+            self.app.unwatch_update_chats(update_owner)
             if message_handler_ref:
                 try:
                     self.app.remove_handler(*message_handler_ref)
@@ -1764,10 +1887,38 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                 self.context.waiting_message = None
                 if hasattr(self.context, 'logged_action_message_markers'):
                     self.context.logged_action_message_markers.clear()
+            if self.latency_stats is not None:
+                self.latency_stats.flush()
             trim_memory()
 
+    async def _acquire_concurrency_slot(self) -> None:
+        if self.concurrency_slot is not None and not self._slot_held:
+            loop = asyncio.get_running_loop()
+            self._slot_wait_started = loop.time()
+            try:
+                await self.concurrency_slot.acquire()
+            finally:
+                self.slot_wait_seconds += loop.time() - self._slot_wait_started
+                self._slot_wait_started = None
+            self._slot_held = True
+
+    def slot_wait_elapsed(self, now: float) -> float:
+        """已等待并发名额的总时间，包括正在进行的等待"""
+        if self._slot_wait_started is None:
+            return self.slot_wait_seconds
+        return self.slot_wait_seconds + now - self._slot_wait_started
+
+    def _release_concurrency_slot(self) -> None:
+        if self.concurrency_slot is not None and self._slot_held:
+            self._slot_held = False
+            self.concurrency_slot.release()
+
     async def run_once(self, num_of_dialogs: int = 0):
-        return await self.run(num_of_dialogs, only_once=True, force_rerun=True)
+        await self._acquire_concurrency_slot()
+        try:
+            return await self.run(num_of_dialogs, only_once=True, force_rerun=True)
+        finally:
+            self._release_concurrency_slot()
 
     async def send_text(
         self, chat_id: int, text: str, delete_after: int = None, **kwargs
@@ -1808,13 +1959,10 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                 level="WARNING",
             )
             return
-        chat_msgs = self.context.chat_messages[message.chat.id]
-        chat_msgs[message.id] = message
-        # Bound message cache per chat to prevent memory growth
-        if len(chat_msgs) > 200:
-            oldest_keys = sorted(chat_msgs.keys())[:100]
-            for k in oldest_keys:
-                chat_msgs.pop(k, None)
+        # 只保存流程需要的字段，环形缓冲区自动淘汰最早的消息
+        self.context.chat_messages[message.chat.id][message.id] = (
+            MessageSnapshot.from_message(message)
+        )
 
     async def on_message(self, client: Client, message: Message):
         await self._on_message(client, message)
@@ -2417,16 +2565,19 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
             )
             return "success"
 
+        start = time.perf_counter()
         if await self._wait_for_terminal_success(
             chat,
             before_click_state,
             history_limit=history_limit,
             timeout=timeout,
         ):
+            self._record_latency(chat.chat_id, FOLLOWUP_LATENCY_KEY, start)
             self.context.stop_after_current_action = True
             self.log(f"按钮「{action_text}」后已检测到任务完成响应，将跳过后续动作")
             return "success"
 
+        start = time.perf_counter()
         if next_action is not None and await self._wait_for_next_action_candidate(
             chat,
             next_action,
@@ -2434,9 +2585,11 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
             history_limit=history_limit,
             timeout=timeout,
         ):
+            self._record_latency(chat.chat_id, FOLLOWUP_LATENCY_KEY, start)
             self.log(f"按钮「{action_text}」后已检测到下一步动作可执行，继续流程")
             return "next"
 
+        self._record_latency_timeout(chat.chat_id, FOLLOWUP_LATENCY_KEY, timeout)
         return "none"
 
     async def _click_inline_button(self, message: Message, btn) -> bool:
@@ -2454,6 +2607,13 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                 return True
 
         click = getattr(message, "click", None)
+        if click is None and isinstance(message, MessageSnapshot):
+            # 快照不持有 client，需要 Message.click 时再取回完整消息
+            try:
+                full_message = await self.app.get_messages(message.chat.id, message.id)
+                click = getattr(full_message, "click", None)
+            except Exception as e:
+                self.log(f"获取完整消息失败，无法使用 Message.click: {e}", level="WARNING")
         if callable(click):
             for args, kwargs in (
                 ((getattr(btn, "text", None),), {}),
@@ -2556,11 +2716,30 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
         )
         return clicked
 
+    def _solve_calculation_locally(self, action, text: str) -> Optional[str]:
+        """简单算式本地直接求解，失败或使用自定义提示词时返回 None 交给 AI"""
+        if (action.ai_prompt or "").strip():
+            return None
+        if os.getenv("SIGN_TASK_LOCAL_MATH_SOLVER", "1") == "0":
+            return None
+        answer = solve_arithmetic_with_stats(text)
+        stats = solver_stats.snapshot()
+        if answer is None:
+            logger.debug(f"本地计算未命中，交给 AI 处理 (命中率 {stats['hit_rate']:.0%})")
+            return None
+        self.log(f"题目内容：{self._normalize_log_text(text, 220)}")
+        self.log(f"本地计算结果：{answer} (命中率 {stats['hit_rate']:.0%})")
+        return answer
+
     async def _reply_by_calculation_problem(
         self, action: ReplyByCalculationProblemAction, message
     ):
         if message.text:
             self._log_received_target_message(message)
+            local_answer = self._solve_calculation_locally(action, message.text)
+            if local_answer is not None:
+                await self.send_message(message.chat.id, local_answer)
+                return True
             self.log("AI 正在分析计算题")
             self.log(f"题目内容：{self._normalize_log_text(message.text, 220)}")
             if (action.ai_prompt or "").strip():
@@ -2585,17 +2764,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
             return False
         self._log_received_target_message(message)
         self.log("AI 正在分析图片中的文字")
-        image_buffer: BinaryIO = await self.app.download_media(
-            message.photo.file_id, in_memory=True
-        )
-        try:
-            image_buffer.seek(0)
-            image_bytes = image_buffer.read()
-        finally:
-            if hasattr(image_buffer, "close"):
-                image_buffer.close()
-            image_buffer = None
-            trim_memory()
+        image_bytes = await download_photo(self.app, message.photo)
 
         if (action.ai_prompt or "").strip():
             self.log("当前 AI 动作使用自定义提示词")
@@ -2618,18 +2787,20 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
         if not message.text:
             return False
         self._log_received_target_message(message)
-        self.log("AI 正在计算按钮答案")
-        if (action.ai_prompt or "").strip():
-            self.log("当前 AI 动作使用自定义提示词")
-        answer = await self.get_ai_tools().calculate_problem(
-            message.text,
-            system_prompt=action.ai_prompt,
-        )
-        answer = (answer or "").strip()
-        if not answer:
-            self.log("AI 未返回可用于点击的答案", level="WARNING")
-            return False
-        self.log(f"AI 计算结果：{answer}")
+        answer = self._solve_calculation_locally(action, message.text)
+        if answer is None:
+            self.log("AI 正在计算按钮答案")
+            if (action.ai_prompt or "").strip():
+                self.log("当前 AI 动作使用自定义提示词")
+            answer = await self.get_ai_tools().calculate_problem(
+                message.text,
+                system_prompt=action.ai_prompt,
+            )
+            answer = (answer or "").strip()
+            if not answer:
+                self.log("AI 未返回可用于点击的答案", level="WARNING")
+                return False
+            self.log(f"AI 计算结果：{answer}")
         proxy_action = ClickKeyboardByTextAction(text=answer)
         return await self._click_keyboard_by_text(proxy_action, message)
 
@@ -2640,17 +2811,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
         if clickable_buttons:
             self._log_received_target_message(message)
             self.log("AI 正在分析图片并匹配可点击按钮")
-            image_buffer: BinaryIO = await self.app.download_media(
-                message.photo.file_id, in_memory=True
-            )
-            try:
-                image_buffer.seek(0)
-                image_bytes = image_buffer.read()
-            finally:
-                if hasattr(image_buffer, "close"):
-                    image_buffer.close()
-                image_buffer = None
-                trim_memory()
+            image_bytes = await download_photo(self.app, message.photo)
 
             options = [button_text for _, _, button_text in clickable_buttons]
             if not options:
@@ -2707,7 +2868,9 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
         next_action: Optional[ActionT] = None,
     ):
         if timeout is None:
-            timeout = _read_positive_float_env("SIGN_TASK_ACTION_TIMEOUT", 25.0, 5.0)
+            timeout = self._adaptive_timeout(
+                chat.chat_id, type(action).__name__, default_action_timeout()
+            )
         kwargs = {}
         if chat.message_thread_id is not None:
             kwargs["message_thread_id"] = chat.message_thread_id
@@ -2752,9 +2915,11 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                             before_click=remember_before_click,
                             log_not_found=False,
                         )
+                        if ok or matched:
+                            self._record_action_latency(chat, action, start)
                         if ok:
                             if next_action is not None:
-                                follow_timeout = min(6.0, timeout)
+                                follow_timeout = self._followup_timeout(chat, timeout)
                                 await self._handle_post_click_followup(
                                     chat,
                                     action_text=action.text,
@@ -2767,7 +2932,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                             return True
                         if matched:
                             self.context.waiting_message = None
-                            follow_timeout = min(6.0, timeout)
+                            follow_timeout = self._followup_timeout(chat, timeout)
                             if next_action is not None:
                                 followup_state = await self._handle_post_click_followup(
                                     chat,
@@ -2834,9 +2999,11 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                                     before_click=remember_before_click,
                                     log_not_found=False,
                                 )
+                                if ok or matched:
+                                    self._record_action_latency(chat, action, start)
                                 if ok:
                                     if next_action is not None:
-                                        follow_timeout = min(6.0, timeout)
+                                        follow_timeout = self._followup_timeout(chat, timeout)
                                         await self._handle_post_click_followup(
                                             chat,
                                             action_text=action.text,
@@ -2848,7 +3015,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                                     return True
                                 if matched:
                                     self.context.waiting_message = None
-                                    follow_timeout = min(6.0, timeout)
+                                    follow_timeout = self._followup_timeout(chat, timeout)
                                     if next_action is not None:
                                         followup_state = await self._handle_post_click_followup(
                                             chat,
@@ -2922,6 +3089,7 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                     elif isinstance(action, ClickButtonByCalculationProblemAction):
                         ok = await self._click_button_by_calculation_problem(action, message)
                     if ok:
+                        self._record_action_latency(chat, action, start)
                         # 将消息ID对应value置为None，保证收到消息的编辑时消息所处的顺序
                         self.context.chat_messages[chat.chat_id][message.id] = None
                         return None
@@ -2957,10 +3125,13 @@ class UserSigner(BaseUserWorker[SignConfigV3]):
                                 action, message
                             )
                         if ok:
+                            # 超时后才从历史中处理成功，同样计入耗时统计以放宽后续超时
+                            self._record_action_latency(chat, action, start)
                             return None
                 except Exception as e:
                     self.log(f"历史消息回退失败: {e}", level="WARNING")
 
+            self._record_latency_timeout(chat.chat_id, type(action).__name__, timeout)
             self.log(
                 f"{self._current_action_step_label()}等待超时：{self._describe_action(action)}",
                 level="WARNING",
@@ -3224,63 +3395,37 @@ class UserMonitor(BaseUserWorker[MonitorConfig]):
         return config
 
     @classmethod
-    async def udp_forward(cls, f: UDPForward, message: Message):
-        data = str(message).encode("utf-8")
-        loop = asyncio.get_running_loop()
-        transport, protocol = await loop.create_datagram_endpoint(
-            lambda: _UDPProtocol(), remote_addr=(f.host, f.port)
-        )
-        try:
-            transport.sendto(data)
-        finally:
-            transport.close()
+    async def udp_forward(
+        cls, f: UDPForward, message: Message, data: Optional[bytes] = None
+    ):
+        if data is None:
+            data = encode_message(message)
+        await get_external_forwarder().send_udp(f.host, f.port, data)
 
     @classmethod
-    async def http_api_callback(cls, f: HttpCallback, message: Message):
-        headers = dict(f.headers or {})
-        headers.update({"Content-Type": "application/json"})
-        content = str(message).encode("utf-8")
-        timeout = httpx.Timeout(10.0, connect=5.0)
-        limits = httpx.Limits(max_keepalive_connections=5, max_connections=10)
-        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
-            last_error: Exception | None = None
-            for attempt in range(1, 4):
-                try:
-                    response = await client.post(
-                        str(f.url),
-                        content=content,
-                        headers=headers,
-                    )
-                    response.raise_for_status()
-                    return
-                except (httpx.TimeoutException, httpx.NetworkError, httpx.HTTPStatusError) as exc:
-                    last_error = exc
-                    if attempt >= 3:
-                        break
-                    await asyncio.sleep(min(2**(attempt - 1), 4))
-            if last_error is not None:
-                raise last_error
+    async def http_api_callback(
+        cls, f: HttpCallback, message: Message, data: Optional[bytes] = None
+    ):
+        if data is None:
+            data = encode_message(message)
+        await get_external_forwarder().send_http(str(f.url), f.headers, data)
 
     async def forward_to_external(self, match_cfg: MatchConfig, message: Message):
         if not match_cfg.external_forwards:
             return
+        # 同一条消息只序列化一次，复用于所有转发目标
+        data = encode_message(message)
         for forward in match_cfg.external_forwards:
             self.log(f"转发消息至{forward}")
             if isinstance(forward, UDPForward):
                 create_logged_task(
-                    self.udp_forward(
-                        forward,
-                        message,
-                    ),
+                    self.udp_forward(forward, message, data),
                     logger=logger,
                     description=f"UDP forward {forward.host}:{forward.port}",
                 )
             elif isinstance(forward, HttpCallback):
                 create_logged_task(
-                    self.http_api_callback(
-                        forward,
-                        message,
-                    ),
+                    self.http_api_callback(forward, message, data),
                     logger=logger,
                     description=f"HTTP callback {forward.url}",
                 )
@@ -3337,28 +3482,17 @@ class UserMonitor(BaseUserWorker[MonitorConfig]):
         if cfg.requires_ai:
             self.ensure_ai_cfg()
 
+        update_owner = f"monitor:{self.task_name}"
+        self.app.watch_update_chats(update_owner, cfg.chat_ids)
         self.app.add_handler(
             MessageHandler(self.on_message, filters.text & filters.chat(cfg.chat_ids)),
         )
+        acquire_external_forwarder()
         try:
             async with self.app:
                 self.log("开始监控...")
                 await idle()
         finally:
+            self.app.unwatch_update_chats(update_owner)
+            await release_external_forwarder()
             trim_memory()
-
-
-class _UDPProtocol(asyncio.DatagramProtocol):
-    """内部使用的UDP协议处理类"""
-
-    def __init__(self):
-        self.transport = None
-
-    def connection_made(self, transport):
-        self.transport = transport
-
-    def datagram_received(self, data, addr):
-        pass  # 不需要处理接收的数据
-
-    def error_received(self, exc):
-        print(f"UDP error received: {exc}")
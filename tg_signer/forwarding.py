@@ -0,0 +1,268 @@
+"""
+Outbound forwarding of monitored messages to external UDP/HTTP sinks.
+
+One long-lived ``httpx.AsyncClient`` and one datagram transport per UDP
+destination are reused for every message. Messages are serialized once per
+match: by default the payload is Pyrogram's ``str(message)`` as before, and
+``MONITOR_FORWARD_PAYLOAD=compact`` opts into a smaller JSON payload (a subset
+of the same keys). HTTP forwarding can optionally micro-batch: up to
+``MONITOR_FORWARD_BATCH_SIZE`` messages or ``MONITOR_FORWARD_BATCH_MS``
+milliseconds per POST, sent as a JSON array.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from .async_utils import create_logged_task
+from .utils import read_int_env
+
+logger = logging.getLogger("tg-signer")
+
+
+def payload_mode() -> str:
+    """full（默认，与旧版一致，发送 str(message)）或 compact（需显式开启）"""
+    mode = os.getenv("MONITOR_FORWARD_PAYLOAD", "full").strip().lower()
+    return "compact" if mode == "compact" else "full"
+
+
+def _without_none(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in data.items() if value is not None}
+
+
+def _user_dict(user: Any) -> Optional[Dict[str, Any]]:
+    if user is None:
+        return None
+    return _without_none({
+        "id": getattr(user, "id", None),
+        "is_bot": getattr(user, "is_bot", None),
+        "username": getattr(user, "username", None),
+        "first_name": getattr(user, "first_name", None),
+        "last_name": getattr(user, "last_name", None),
+    })
+
+
+def _chat_dict(chat: Any) -> Optional[Dict[str, Any]]:
+    if chat is None:
+        return None
+    chat_type = getattr(chat, "type", None)
+    return _without_none({
+        "id": getattr(chat, "id", None),
+        "type": getattr(chat_type, "value", chat_type),
+        "title": getattr(chat, "title", None),
+        "username": getattr(chat, "username", None),
+    })
+
+
+def serialize_message(message: Any) -> Dict[str, Any]:
+    """只保留转发方常用的字段，键名与 Pyrogram 的 str(message) 一致"""
+    date = getattr(message, "date", None)
+    media = getattr(message, "media", None)
+    data = {
+        "_": "Message",
+        "id": getattr(message, "id", None),
+        "date": date.isoformat(sep=" ") if date is not None else None,
+        "chat": _chat_dict(getattr(message, "chat", None)),
+        "from_user": _user_dict(getattr(message, "from_user", None)),
+        "text": getattr(message, "text", None),
+        "caption": getattr(message, "caption", None),
+        "media": getattr(media, "value", media),
+        "reply_to_message_id": getattr(message, "reply_to_message_id", None),
+    }
+    return _without_none(data)
+
+
+def encode_message(message: Any) -> bytes:
+    if payload_mode() == "full":
+        return str(message).encode("utf-8")
+    return json.dumps(
+        serialize_message(message), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    """内部使用的UDP协议处理类"""
+
+    def __init__(self):
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        pass  # 不需要处理接收的数据
+
+    def error_received(self, exc):
+        logger.warning(f"UDP error received: {exc}")
+
+
+class _HttpBatch:
+    __slots__ = ("items", "flush_task")
+
+    def __init__(self):
+        self.items: List[bytes] = []
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+class ExternalForwarder:
+    def __init__(self):
+        self.batch_size = read_int_env("MONITOR_FORWARD_BATCH_SIZE", 1, 1)
+        self.batch_ms = read_int_env("MONITOR_FORWARD_BATCH_MS", 200, 0)
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._udp: Dict[Tuple[str, int], asyncio.DatagramTransport] = {}
+        self._udp_lock = asyncio.Lock()
+        self._batches: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _HttpBatch] = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            )
+        return self._http_client
+
+    async def send_udp(self, host: str, port: int, data: bytes) -> None:
+        key = (host, port)
+        transport = self._udp.get(key)
+        if transport is None or transport.is_closing():
+            async with self._udp_lock:
+                transport = self._udp.get(key)
+                if transport is None or transport.is_closing():
+                    loop = asyncio.get_running_loop()
+                    transport, _ = await loop.create_datagram_endpoint(
+                        _UDPProtocol, remote_addr=key
+                    )
+                    self._udp[key] = transport
+        transport.sendto(data)
+
+    async def _post(self, url: str, headers: Dict[str, str], content: bytes) -> None:
+        client = self._client()
+        last_error: Exception | None = None
+        for attempt in range(1, 4):
+            try:
+                response = await client.post(url, content=content, headers=headers)
+                response.raise_for_status()
+                return
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.HTTPStatusError) as exc:
+                last_error = exc
+                if attempt >= 3:
+                    break
+                await asyncio.sleep(min(2**(attempt - 1), 4))
+        if last_error is not None:
+            raise last_error
+
+    async def send_http(
+        self, url: str, headers: Optional[Dict[str, str]], data: bytes
+    ) -> None:
+        """未开启批量时直接 POST；否则加入该目标的批次，满 N 条或 T 毫秒后发送"""
+        headers = dict(headers or {})
+        headers["Content-Type"] = "application/json"
+        if self.batch_size <= 1:
+            await self._post(url, headers, data)
+            return
+
+        key = (url, tuple(sorted(headers.items())))
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _HttpBatch()
+        batch.items.append(data)
+        if len(batch.items) >= self.batch_size:
+            await self._flush(key)
+        elif batch.flush_task is None:
+            batch.flush_task = create_logged_task(
+                self._flush_later(key),
+                logger=logger,
+                description=f"HTTP forward batch {url}",
+            )
+
+    async def _flush_later(self, key) -> None:
+        await asyncio.sleep(self.batch_ms / 1000)
+        batch = self._batches.get(key)
+        if batch is not None:
+            batch.flush_task = None
+        await self._flush(key)
+
+    async def _flush(self, key) -> None:
+        batch = self._batches.pop(key, None)
+        if batch is None or not batch.items:
+            return
+        if batch.flush_task is not None and batch.flush_task is not asyncio.current_task():
+            batch.flush_task.cancel()
+        url, headers = key
+        content = b"[" + b",".join(batch.items) + b"]"
+        await self._post(url, dict(headers), content)
+
+    async def flush(self) -> None:
+        """立即发送所有未满的批次"""
+        for key in list(self._batches):
+            try:
+                await self._flush(key)
+            except Exception as e:
+                logger.warning(f"发送剩余批量转发失败: {e}")
+
+    def _close_transports(self) -> None:
+        for transport in self._udp.values():
+            with contextlib.suppress(RuntimeError):
+                transport.close()
+        self._udp.clear()
+
+    async def aclose(self) -> None:
+        await self.flush()
+        self._close_transports()
+        client, self._http_client = self._http_client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    def discard(self) -> None:
+        """所属事件循环已关闭时的同步清理：无法再 await，只能关闭 UDP 并丢弃批次"""
+        dropped = sum(len(batch.items) for batch in self._batches.values())
+        if dropped:
+            logger.warning(f"事件循环已关闭，丢弃 {dropped} 条未发送的批量转发")
+        self._batches.clear()
+        self._close_transports()
+        self._http_client = None
+
+
+_forwarders: Dict[asyncio.AbstractEventLoop, ExternalForwarder] = {}
+_forwarder_users: Dict[asyncio.AbstractEventLoop, int] = {}
+
+
+def get_external_forwarder() -> ExternalForwarder:
+    """每个事件循环一个实例（transport 与连接池不能跨循环使用）"""
+    loop = asyncio.get_running_loop()
+    forwarder = _forwarders.get(loop)
+    if forwarder is None:
+        # 清理已关闭事件循环遗留的实例；其他仍在运行的循环继续使用各自的实例
+        for stale_loop in [item for item in _forwarders if item.is_closed()]:
+            _forwarders.pop(stale_loop).discard()
+            _forwarder_users.pop(stale_loop, None)
+        forwarder = _forwarders[loop] = ExternalForwarder()
+    return forwarder
+
+
+def acquire_external_forwarder() -> ExternalForwarder:
+    """登记一个使用者（如一个运行中的 UserMonitor），与 release_external_forwarder 成对调用"""
+    forwarder = get_external_forwarder()
+    loop = asyncio.get_running_loop()
+    _forwarder_users[loop] = _forwarder_users.get(loop, 0) + 1
+    return forwarder
+
+
+async def release_external_forwarder() -> None:
+    """注销一个使用者：仍有其他使用者时只发送剩余批次，最后一个使用者退出时才关闭"""
+    loop = asyncio.get_running_loop()
+    forwarder = _forwarders.get(loop)
+    if forwarder is None:
+        return
+    users = _forwarder_users.get(loop, 0) - 1
+    if users > 0:
+        _forwarder_users[loop] = users
+        await forwarder.flush()
+        return
+    _forwarder_users.pop(loop, None)
+    await forwarder.aclose()
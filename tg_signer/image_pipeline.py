@@ -0,0 +1,79 @@
+"""
+Image pipeline for vision actions.
+
+Picks the smallest Telegram photo size that is still large enough for the
+model, keeps the downloaded bytes as a memoryview of the download buffer
+instead of copying them out, and optionally downscales before upload.
+"""
+
+import io
+import logging
+from typing import Any, Optional, Union
+
+from .utils import read_int_env
+
+logger = logging.getLogger("tg-signer")
+
+ImageData = Union[bytes, memoryview]
+
+
+def get_min_side() -> int:
+    """所选尺寸的短边下限（像素），0 表示总是下载原图"""
+    return read_int_env("AI_IMAGE_MIN_SIDE", 640, 0)
+
+
+def get_max_side() -> int:
+    """上传前缩放的长边上限（像素），0 表示不缩放（默认）"""
+    return read_int_env("AI_IMAGE_MAX_SIDE", 0, 0)
+
+
+def pick_photo_file_id(photo: Any, min_side: Optional[int] = None) -> str:
+    """
+    在原图与各缩略尺寸中选择短边不小于 min_side 的最小一张；
+    都不够大时使用原图。
+    """
+    min_side = get_min_side() if min_side is None else min_side
+    if min_side <= 0:
+        return photo.file_id
+
+    candidates = [(photo.width or 0, photo.height or 0, photo.file_id)]
+    for thumb in getattr(photo, "thumbs", None) or []:
+        file_id = getattr(thumb, "file_id", None)
+        if file_id:
+            candidates.append((thumb.width or 0, thumb.height or 0, file_id))
+
+    adequate = [c for c in candidates if min(c[0], c[1]) >= min_side]
+    if not adequate:
+        return photo.file_id
+    return min(adequate, key=lambda c: c[0] * c[1])[2]
+
+
+def downscale_image(image: ImageData, max_side: Optional[int] = None) -> ImageData:
+    """长边超过 max_side 时缩放并重新编码为 JPEG；未安装 Pillow 时原样返回"""
+    max_side = get_max_side() if max_side is None else max_side
+    if max_side <= 0:
+        return image
+    try:
+        from PIL import Image
+    except ImportError:
+        return image
+
+    try:
+        with Image.open(io.BytesIO(image)) as img:
+            if max(img.size) <= max_side:
+                return image
+            img.thumbnail((max_side, max_side))
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=85)
+            return out.getbuffer()
+    except Exception as e:
+        logger.debug(f"图片缩放失败，使用原图: {e}")
+        return image
+
+
+async def download_photo(client: Any, photo: Any) -> ImageData:
+    """下载合适尺寸的图片，返回下载缓冲区的 memoryview（不复制）"""
+    buffer = await client.download_media(pick_photo_file_id(photo), in_memory=True)
+    return downscale_image(buffer.getbuffer())
@@ -0,0 +1,332 @@
+"""
+Per-(chat, action type) response latency histograms.
+
+Samples are recorded while a sign task runs and persisted per account, so
+later runs can derive action timeouts (p99 × factor, within bounds) instead
+of waiting the fixed SIGN_TASK_ACTION_TIMEOUT for every bot. The feature is
+opt-in (``SIGN_TASK_ADAPTIVE_TIMEOUT=1``).
+
+A wait that times out is recorded as a censored sample at the timeout that
+was used: the real latency is at least that long. While a recent timeout is
+in the histogram, the derived timeout is at least ``timeout × factor``, so
+the timeout grows again after a slow response instead of only shrinking.
+Old samples decay with a half-life of
+``SIGN_TASK_ADAPTIVE_TIMEOUT_HALF_LIFE_HOURS`` (default one week).
+"""
+
+import bisect
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .utils import atomic_write_json, read_float_env, read_int_env
+
+logger = logging.getLogger("tg-signer")
+
+LATENCY_STATS_FILENAME = "latency_stats.json"
+
+# 按钮点击后等待下一步/成功回复的耗时统计键
+FOLLOWUP_LATENCY_KEY = "PostClickFollowup"
+# 点击后等待回复的默认上限（秒），不超过动作超时
+FOLLOWUP_DEFAULT_TIMEOUT = 6.0
+
+# 桶上界（毫秒），最后一个桶收纳所有更慢的样本
+BUCKET_BOUNDS_MS: Tuple[int, ...] = (
+    100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 4000,
+    5000, 7500, 10000, 15000, 20000, 30000, 45000, 60000,
+)
+
+# 衰减后权重低于该值的桶视为空
+_MIN_WEIGHT = 0.01
+
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def adaptive_timeouts_enabled() -> bool:
+    return os.getenv("SIGN_TASK_ADAPTIVE_TIMEOUT", "0") == "1"
+
+
+def default_action_timeout() -> float:
+    """未启用自适应或样本不足时使用的动作超时（秒）"""
+    return read_float_env("SIGN_TASK_ACTION_TIMEOUT", 25.0, 5.0)
+
+
+def _half_life_seconds() -> float:
+    return read_float_env("SIGN_TASK_ADAPTIVE_TIMEOUT_HALF_LIFE_HOURS", 168.0, 0.0) * 3600
+
+
+def _file_lock(path: pathlib.Path) -> threading.Lock:
+    key = str(path)
+    with _file_locks_guard:
+        lock = _file_locks.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _file_locks[key] = lock
+        return lock
+
+
+class LatencyHistogram:
+    """
+    Bucketed latency samples. Counts are weights that decay over time, so
+    they may be fractional. ``timeouts`` / ``timeout_ms`` track censored
+    samples (waits that hit the timeout).
+    """
+
+    __slots__ = ("buckets", "count", "max_ms", "timeouts", "timeout_ms", "updated_at")
+
+    def __init__(
+        self,
+        buckets: Optional[List[float]] = None,
+        count: float = 0,
+        max_ms: float = 0.0,
+        timeouts: float = 0,
+        timeout_ms: float = 0.0,
+        updated_at: Optional[float] = None,
+    ):
+        size = len(BUCKET_BOUNDS_MS) + 1
+        self.buckets = [float(value) for value in list(buckets or [])[:size]]
+        self.buckets += [0.0] * (size - len(self.buckets))
+        self.count = float(count)
+        self.max_ms = float(max_ms)
+        self.timeouts = float(timeouts)
+        self.timeout_ms = float(timeout_ms)
+        self.updated_at = time.time() if updated_at is None else float(updated_at)
+
+    def decay(self, now: float) -> None:
+        """按半衰期衰减旧样本的权重，并把时间戳推进到 now"""
+        elapsed = now - self.updated_at
+        half_life = _half_life_seconds()
+        if elapsed <= 0:
+            return
+        self.updated_at = now
+        if half_life <= 0:
+            return
+        factor = 0.5 ** (elapsed / half_life)
+        self.buckets = [
+            value * factor if value * factor >= _MIN_WEIGHT else 0.0
+            for value in self.buckets
+        ]
+        self.count = sum(self.buckets)
+        self.timeouts *= factor
+        if self.timeouts < _MIN_WEIGHT:
+            self.timeouts = 0.0
+            self.timeout_ms = 0.0
+        # 最慢样本所在的桶衰减为空后，max_ms 收缩到仍有样本的最高桶上界
+        highest = max((i for i, value in enumerate(self.buckets) if value), default=None)
+        if highest is None:
+            self.max_ms = 0.0
+        elif highest < len(BUCKET_BOUNDS_MS):
+            self.max_ms = min(self.max_ms, BUCKET_BOUNDS_MS[highest])
+
+    def add(self, seconds: float, *, censored: bool = False, now: Optional[float] = None) -> None:
+        self.decay(time.time() if now is None else now)
+        ms = max(seconds, 0.0) * 1000
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.max_ms = max(self.max_ms, ms)
+        if censored:
+            self.timeouts += 1
+            self.timeout_ms = max(self.timeout_ms, ms)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        now = max(self.updated_at, other.updated_at)
+        self.decay(now)
+        other.decay(now)
+        for i, value in enumerate(other.buckets):
+            self.buckets[i] += value
+        self.count += other.count
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.timeouts += other.timeouts
+        self.timeout_ms = max(self.timeout_ms, other.timeout_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """返回分位数所在桶的上界（秒），没有样本时返回 None"""
+        if self.count <= 0:
+            return None
+        rank = q * self.count
+        seen = 0.0
+        for i, value in enumerate(self.buckets):
+            seen += value
+            if seen >= rank and value:
+                if i < len(BUCKET_BOUNDS_MS):
+                    return min(BUCKET_BOUNDS_MS[i], self.max_ms) / 1000
+                return self.max_ms / 1000
+        return self.max_ms / 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": [round(value, 3) for value in self.buckets],
+            "count": round(self.count, 3),
+            "max_ms": round(self.max_ms, 1),
+            "timeouts": round(self.timeouts, 3),
+            "timeout_ms": round(self.timeout_ms, 1),
+            "updated_at": round(self.updated_at, 1),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        return cls(
+            data.get("buckets"),
+            data.get("count", 0),
+            data.get("max_ms", 0.0),
+            data.get("timeouts", 0),
+            data.get("timeout_ms", 0.0),
+            data.get("updated_at"),
+        )
+
+
+def _stats_key(chat_id: int, action_type: str) -> str:
+    return f"{chat_id}:{action_type}"
+
+
+class LatencyStats:
+    """
+    One account's latency histograms, keyed by ``"<chat_id>:<action_type>"``.
+
+    New samples are kept in ``_pending`` and merged into the file on
+    ``flush`` so concurrent runs of the same account do not overwrite
+    each other.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self._histograms: Dict[str, LatencyHistogram] = self._load()
+        self._pending: Dict[str, LatencyHistogram] = {}
+
+    @classmethod
+    def for_account(cls, tasks_dir, account: str) -> "LatencyStats":
+        return cls(pathlib.Path(tasks_dir) / account / LATENCY_STATS_FILENAME)
+
+    def _load(self) -> Dict[str, LatencyHistogram]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except Exception as e:
+            logger.debug(f"读取响应耗时统计失败: {e}")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {
+            str(key): LatencyHistogram.from_dict(value)
+            for key, value in data.items()
+            if isinstance(value, dict)
+        }
+
+    def record(self, chat_id: int, action_type: str, seconds: float) -> None:
+        self._add(chat_id, action_type, seconds, censored=False)
+
+    def record_timeout(self, chat_id: int, action_type: str, timeout: float) -> None:
+        """等待超时：记为删失样本（真实耗时至少为本次使用的超时）"""
+        self._add(chat_id, action_type, timeout, censored=True)
+
+    def _add(self, chat_id: int, action_type: str, seconds: float, *, censored: bool) -> None:
+        key = _stats_key(chat_id, action_type)
+        now = time.time()
+        for target in (self._histograms, self._pending):
+            target.setdefault(key, LatencyHistogram(updated_at=now)).add(
+                seconds, censored=censored, now=now
+            )
+
+    def get(self, chat_id: int, action_type: str) -> Optional[LatencyHistogram]:
+        return self._histograms.get(_stats_key(chat_id, action_type))
+
+    def timeout_for(
+        self,
+        chat_id: int,
+        action_type: str,
+        default: float,
+        *,
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None,
+    ) -> float:
+        """
+        样本足够时返回 p99 × factor（限制在 [minimum, maximum] 内），否则返回 default。
+        近期有超时样本时，结果至少为「超时值 × factor」，超时后会向上退避。
+        """
+        if not adaptive_timeouts_enabled():
+            return default
+        histogram = self.get(chat_id, action_type)
+        if histogram is None:
+            return default
+        histogram.decay(time.time())
+        min_samples = read_int_env("SIGN_TASK_ADAPTIVE_TIMEOUT_MIN_SAMPLES", 5, 1)
+        if histogram.count < min_samples:
+            return default
+        p99 = histogram.quantile(0.99)
+        if p99 is None:
+            return default
+        factor = read_float_env("SIGN_TASK_ADAPTIVE_TIMEOUT_FACTOR", 2.0, 1.0)
+        timeout = p99 * factor
+        # 衰减后仍保留至少半个超时样本（约一个半衰期内）时，按超时值退避
+        if histogram.timeouts >= 0.5:
+            timeout = max(timeout, histogram.timeout_ms / 1000 * factor)
+        if minimum is None:
+            minimum = read_float_env("SIGN_TASK_ADAPTIVE_TIMEOUT_MIN", 3.0, 0.5)
+        if maximum is None:
+            maximum = read_float_env("SIGN_TASK_ADAPTIVE_TIMEOUT_MAX", 60.0, 1.0)
+        return min(max(timeout, minimum), max(maximum, minimum))
+
+    def summary(self) -> List[dict]:
+        items = []
+        now = time.time()
+        for key, histogram in sorted(self._histograms.items()):
+            histogram.decay(now)
+            chat_id, _, action_type = key.partition(":")
+            try:
+                chat_id = int(chat_id)
+            except ValueError:
+                continue
+            items.append(
+                {
+                    "chat_id": chat_id,
+                    "action_type": action_type,
+                    "count": round(histogram.count, 3),
+                    "timeouts": round(histogram.timeouts, 3),
+                    "p50": histogram.quantile(0.5),
+                    "p90": histogram.quantile(0.9),
+                    "p99": histogram.quantile(0.99),
+                    "max": round(histogram.max_ms / 1000, 3),
+                }
+            )
+        return items
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with _file_lock(self.path):
+            merged = self._load()
+            for key, histogram in self._pending.items():
+                merged.setdefault(key, LatencyHistogram()).merge(histogram)
+            try:
+                atomic_write_json(
+                    self.path,
+                    {key: value.to_dict() for key, value in merged.items()},
+                )
+            except Exception as e:
+                logger.warning(f"保存响应耗时统计失败: {e}")
+                return
+        self._histograms = merged
+        self._pending = {}
+
+
+def followup_timeout(
+    stats: Optional[LatencyStats], chat_id: int, action_timeout: float
+) -> float:
+    """按钮点击后等待下一步/成功回复的超时：默认 min(6s, 动作超时)，有统计时自适应"""
+    default = min(FOLLOWUP_DEFAULT_TIMEOUT, action_timeout)
+    if stats is None:
+        return default
+    return stats.timeout_for(
+        chat_id,
+        FOLLOWUP_LATENCY_KEY,
+        default,
+        minimum=1.0,
+        maximum=action_timeout,
+    )
@@ -0,0 +1,263 @@
+"""
+Local solver for simple arithmetic captchas.
+
+Handles problems such as ``12 + 7 = ?`` or ``三加五等于多少`` without an LLM
+round trip. Anything it cannot parse unambiguously returns ``None`` so the
+caller falls back to ``AITools.calculate_problem``.
+
+An expression is only treated as a problem when it is followed by ``=`` /
+``等于`` / ``?`` or the text asks for a calculation (``计算``, ``多少`` ...).
+Dates, phone numbers and codes such as ``2024-10-19`` or ``1234-5678`` are
+never evaluated.
+"""
+
+import ast
+import operator
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Union
+
+Number = Union[int, float]
+
+_CN_DIGITS = {
+    "零": 0, "〇": 0,
+    "一": 1, "壹": 1,
+    "二": 2, "两": 2, "贰": 2,
+    "三": 3, "叁": 3,
+    "四": 4, "肆": 4,
+    "五": 5, "伍": 5,
+    "六": 6, "陆": 6,
+    "七": 7, "柒": 7,
+    "八": 8, "捌": 8,
+    "九": 9, "玖": 9,
+}
+_CN_UNITS = {"十": 10, "拾": 10, "百": 100, "佰": 100, "千": 1000, "仟": 1000}
+_CN_SECTION_UNITS = {"万": 10_000, "萬": 10_000, "亿": 100_000_000}
+_CN_NUMERAL_RE = re.compile(
+    "[" + "".join(_CN_DIGITS) + "".join(_CN_UNITS) + "".join(_CN_SECTION_UNITS) + "]+"
+)
+# 「二十一点五」：整数部分 + 点 + 逐位读的小数部分
+_CN_DECIMAL_RE = re.compile(
+    "(" + _CN_NUMERAL_RE.pattern + ")点([" + "".join(_CN_DIGITS) + "]+)"
+)
+
+# 长词优先，避免「乘以」被拆成「乘」+「以」
+_OPERATOR_WORDS = (
+    ("加上", "+"),
+    ("减去", "-"),
+    ("乘以", "*"),
+    ("乘上", "*"),
+    ("除以", "/"),
+    ("加", "+"),
+    ("减", "-"),
+    ("乘", "*"),
+    ("负", "-"),
+)
+_SYMBOL_MAP = str.maketrans({
+    "×": "*",
+    "✖": "*",
+    "·": "*",
+    "÷": "/",
+    "−": "-",
+    "–": "-",
+    "—": "-",
+    "＋": "+",
+    "（": "(",
+    "）": ")",
+})
+_TIMES_LETTER_RE = re.compile(r"(?<=[\d)])\s*[xX]\s*(?=[\d(])")
+_EXPRESSION_RE = re.compile(r"[\d.\s+\-*/()]+")
+_OPERATOR_BETWEEN_RE = re.compile(r"[\d)]\s*[+\-*/]\s*[-(]*\s*[\d(]")
+_EQUALS_AFTER_RE = re.compile(r"^\s*(=|＝|等于|是多少|得多少|结果|[?？])")
+_PROBLEM_KEYWORDS = ("计算", "算一算", "算算", "多少", "等于几", "结果", "答案", "求")
+# 仅由 - 或 / 连接的数字段（无空格），例如日期、电话号码、验证码
+_DIGIT_GROUPS_RE = re.compile(r"\d+(?:([-/])\d+)+")
+# 千分位或小数逗号（1,000 / 3,5 / 12'000）：表达式会从分隔符处被截断，交给 LLM
+_GROUPED_NUMBER_RE = re.compile(r"\d[,，'’_]\d")
+
+_MAX_NUMBER_DIGITS = 12
+_MAX_OPERATORS = 8
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+def chinese_to_int(text: str) -> Optional[int]:
+    """Convert a Chinese numeral (``三``, ``十五``, ``一百零三``, ``两万``) to int."""
+    if not text:
+        return None
+    if all(ch in _CN_DIGITS for ch in text) and len(text) > 1:
+        # 逐位读法，例如「一二三」
+        return int("".join(str(_CN_DIGITS[ch]) for ch in text))
+
+    total = 0
+    section = 0
+    digit: Optional[int] = None
+    for ch in text:
+        if ch in _CN_DIGITS:
+            digit = _CN_DIGITS[ch]
+        elif ch in _CN_UNITS:
+            section += (1 if digit is None else digit) * _CN_UNITS[ch]
+            digit = None
+        elif ch in _CN_SECTION_UNITS:
+            section += digit or 0
+            if section == 0:
+                return None
+            total += section * _CN_SECTION_UNITS[ch]
+            section = 0
+            digit = None
+        else:
+            return None
+    section += digit or 0
+    return total + section
+
+
+def _replace_decimal(match: re.Match) -> str:
+    integer = chinese_to_int(match.group(1))
+    if integer is None:
+        return match.group(0)
+    fraction = "".join(str(_CN_DIGITS[ch]) for ch in match.group(2))
+    return f" {integer}.{fraction} "
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).translate(_SYMBOL_MAP)
+    text = _CN_DECIMAL_RE.sub(_replace_decimal, text)
+    for word, symbol in _OPERATOR_WORDS:
+        text = text.replace(word, f" {symbol} ")
+
+    def _replace_numeral(match: re.Match) -> str:
+        value = chinese_to_int(match.group(0))
+        return match.group(0) if value is None else f" {value} "
+
+    text = _CN_NUMERAL_RE.sub(_replace_numeral, text)
+    return _TIMES_LETTER_RE.sub("*", text)
+
+
+def _eval_node(node: ast.AST) -> Number:
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"unsupported expression node: {type(node).__name__}")
+
+
+def evaluate_expression(expression: str) -> Optional[Number]:
+    """Safely evaluate ``+ - * /`` arithmetic; returns None for anything else."""
+    expression = expression.strip()
+    if not expression or "**" in expression or "//" in expression:
+        return None
+    if any(len(num) > _MAX_NUMBER_DIGITS for num in re.findall(r"\d+", expression)):
+        return None
+    if len(re.findall(r"[+\-*/]", expression)) > _MAX_OPERATORS:
+        return None
+    try:
+        return _eval_node(ast.parse(expression, mode="eval"))
+    except (SyntaxError, ValueError, ZeroDivisionError, TypeError, RecursionError):
+        return None
+
+
+def _format_result(value: Number) -> Optional[str]:
+    if isinstance(value, float):
+        if not value.is_integer():
+            # 非整数答案的格式各机器人不一致，交给 LLM
+            return None
+        value = int(value)
+    return str(value)
+
+
+def _looks_like_identifier(expression: str) -> bool:
+    """日期 / 电话 / 验证码：三段及以上、两段都是 4 位以上，或带前导零的数字段"""
+    match = _DIGIT_GROUPS_RE.fullmatch(expression.strip())
+    if match is None:
+        return False
+    groups = re.split(r"[-/]", match.group(0))
+    if len(groups) >= 3:
+        return True
+    if any(len(group) > 1 and group.startswith("0") for group in groups):
+        return True
+    return match.group(1) == "-" and all(len(group) >= 4 for group in groups)
+
+
+def _candidate_expressions(text: str) -> List[re.Match]:
+    return [
+        match
+        for match in _EXPRESSION_RE.finditer(text)
+        if _OPERATOR_BETWEEN_RE.search(match.group(0))
+        and not _looks_like_identifier(match.group(0))
+    ]
+
+
+def solve_arithmetic(text: str) -> Optional[str]:
+    """
+    Return the answer of the single arithmetic problem in ``text``.
+
+    The expression must be followed by ``=``/``等于``/``?``; a single
+    expression is also accepted when the text asks for a calculation. If
+    several expressions qualify, returns None.
+    """
+    if not text:
+        return None
+    normalized = _normalize(text)
+    candidates = _candidate_expressions(normalized)
+    marked = [
+        match
+        for match in candidates
+        if _EQUALS_AFTER_RE.match(normalized[match.end():])
+    ]
+    if not marked and len(candidates) == 1 and any(
+        keyword in text for keyword in _PROBLEM_KEYWORDS
+    ):
+        marked = candidates
+    if len(marked) != 1:
+        return None
+    start, end = marked[0].span()
+    if _GROUPED_NUMBER_RE.search(normalized[max(start - 2, 0):end + 2]):
+        return None
+    value = evaluate_expression(marked[0].group(0))
+    if value is None:
+        return None
+    return _format_result(value)
+
+
+class _SolverStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.fallbacks = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.local_hits += 1
+            else:
+                self.fallbacks += 1
+
+    def snapshot(self) -> Dict[str, Number]:
+        with self._lock:
+            total = self.local_hits + self.fallbacks
+            return {
+                "local_hits": self.local_hits,
+                "fallbacks": self.fallbacks,
+                "hit_rate": round(self.local_hits / total, 4) if total else 0.0,
+            }
+
+
+solver_stats = _SolverStats()
+
+
+def solve_arithmetic_with_stats(text: str) -> Optional[str]:
+    """``solve_arithmetic`` that also updates the process-wide hit-rate counter."""
+    answer = solve_arithmetic(text)
+    solver_stats.record(answer is not None)
+    return answer
@@ -0,0 +1,117 @@
+"""
+Per-account pool of media DC authorizations.
+
+Pyrogram opens a media session per DC on the first download from that DC.
+For a DC other than the account's home DC, that means generating a new auth
+key (DH exchange) and an ExportAuthorization / ImportAuthorization round trip.
+When the last reference to a shared client leaves, ``Client.clear_client_cache``
+stops those sessions. So every avatar or captcha photo download after an
+idle period paid the full setup again.
+
+``MediaSessionPool`` keeps the authorized auth key of each media DC per
+account, keyed by the account's home auth key so a re-login never reuses
+keys authorized for an old session. ``Client.download_media`` restores a
+pooled key as a new media session (connect + ping only) and reuses live
+sessions while the client is running. Live sessions idle longer than
+``MEDIA_SESSION_IDLE_SECONDS`` are stopped, and pooled keys expire after the
+same idle time. ``MEDIA_SESSION_POOL_SIZE`` caps how many DCs are kept per
+account.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+from .utils import read_float_env, read_int_env
+
+
+def pool_account_id(client_key: str, home_auth_key: Optional[bytes]) -> str:
+    """池中账号的标识：client key + 主 DC auth key 指纹（重新登录后自动失效）"""
+    digest = hashlib.sha1(home_auth_key or b"").hexdigest()[:12]
+    return f"{client_key}#{digest}"
+
+
+@dataclass
+class _PooledKey:
+    auth_key: bytes
+    last_used: float
+
+
+class MediaSessionPool:
+    def __init__(self) -> None:
+        self.idle_seconds = read_float_env("MEDIA_SESSION_IDLE_SECONDS", 900.0, 10.0)
+        self.max_per_account = read_int_env("MEDIA_SESSION_POOL_SIZE", 3, 1)
+        self._keys: Dict[str, "OrderedDict[int, _PooledKey]"] = {}
+        self._created_at: Deque[float] = deque()
+        self.created = 0
+        self.restored = 0
+        self.reused = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def _sweep(self, now: float) -> None:
+        for account_id in list(self._keys):
+            entries = self._keys[account_id]
+            for dc_id in [dc for dc, entry in entries.items() if now - entry.last_used > self.idle_seconds]:
+                del entries[dc_id]
+                self.expired += 1
+            if not entries:
+                del self._keys[account_id]
+        cutoff = now - 3600
+        while self._created_at and self._created_at[0] < cutoff:
+            self._created_at.popleft()
+
+    def lookup(self, account_id: str, dc_id: int) -> Optional[bytes]:
+        now = time.monotonic()
+        self._sweep(now)
+        entry = self._keys.get(account_id, {}).get(dc_id)
+        if entry is None:
+            return None
+        entry.last_used = now
+        self._keys[account_id].move_to_end(dc_id)
+        return entry.auth_key
+
+    def store(self, account_id: str, dc_id: int, auth_key: bytes) -> None:
+        entries = self._keys.setdefault(account_id, OrderedDict())
+        entries[dc_id] = _PooledKey(auth_key=auth_key, last_used=time.monotonic())
+        entries.move_to_end(dc_id)
+        while len(entries) > self.max_per_account:
+            entries.popitem(last=False)
+
+    def drop(self, account_id: str, dc_id: int) -> None:
+        entries = self._keys.get(account_id)
+        if entries is not None and entries.pop(dc_id, None) is not None:
+            self.invalidated += 1
+            if not entries:
+                del self._keys[account_id]
+
+    def record_created(self) -> None:
+        self.created += 1
+        self._created_at.append(time.monotonic())
+
+    def stats(self) -> Dict[str, int]:
+        self._sweep(time.monotonic())
+        return {
+            "accounts": len(self._keys),
+            "pooled_dcs": sum(len(entries) for entries in self._keys.values()),
+            "created_last_hour": len(self._created_at),
+            "created_total": self.created,
+            "restored": self.restored,
+            "reused": self.reused,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+        }
+
+
+_media_session_pool: Optional[MediaSessionPool] = None
+
+
+def get_media_session_pool() -> MediaSessionPool:
+    global _media_session_pool
+    if _media_session_pool is None:
+        _media_session_pool = MediaSessionPool()
+    return _media_session_pool
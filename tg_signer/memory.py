@@ -1,26 +1,198 @@
 from __future__ import annotations
 
+import asyncio
 import ctypes
 import gc
 import logging
+import os
 import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .utils import read_float_env, read_int_env
 
 _logger = logging.getLogger("tg_signer.memory")
 
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（Linux 读取 /proc/self/statm，其他平台返回 None）"""
+    try:
+        with open("/proc/self/statm", "rb") as fp:
+            return int(fp.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _load_malloc_trim():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL("libc.so.6")
+        return getattr(libc, "malloc_trim", None)
+    except Exception:
+        return None
+
+
+class MemoryTrimmer:
+    """
+    按需回收内存。
+
+    ``request()`` 只在 RSS 相对上次回收增长超过阈值、或距上次回收超过
+    间隔时才真正执行 gc + malloc_trim，两次回收之间至少间隔
+    ``min_interval`` 秒。
+
+    注意：gc.collect 全程持有 GIL，放到线程池执行也会让事件循环停顿同样
+    的时间，线程池只能让 malloc_trim（ctypes 调用时释放 GIL）不占用事件
+    循环。因此常规回收只收集到 ``MEMORY_TRIM_GC_GENERATION`` 代（默认 1，
+    只扫描新生代，停顿短），老年代交给解释器自身的阈值触发；只有
+    force=True（如进程退出）才做完整的 gc.collect(2)。
+    """
+
+    def __init__(self):
+        self.growth_threshold = int(
+            read_float_env("MEMORY_TRIM_RSS_GROWTH_MB", 64.0, 0.0) * 1024 * 1024
+        )
+        self.interval = read_float_env("MEMORY_TRIM_INTERVAL_SECONDS", 300.0, 0.0)
+        self.min_interval = read_float_env("MEMORY_TRIM_MIN_INTERVAL_SECONDS", 30.0, 0.0)
+        self.gc_generation = min(read_int_env("MEMORY_TRIM_GC_GENERATION", 1, 0), 2)
+        self._malloc_trim = _load_malloc_trim()
+        self._lock = threading.Lock()
+        self._running = False
+        self._last_trim = time.monotonic()
+        self._baseline_rss = get_rss_bytes()
+
+        self.requests = 0
+        self.trims = 0
+        self.last_reason: Optional[str] = None
+        self.last_gc_ms = 0.0
+        self.max_gc_ms = 0.0
+        self.total_gc_ms = 0.0
+        self.last_malloc_trim_ms = 0.0
+        self.last_released_bytes = 0
+        self.total_released_bytes = 0
+
+    def _due(self, now: float) -> Optional[str]:
+        if self._running:
+            return None
+        elapsed = now - self._last_trim
+        if elapsed < self.min_interval:
+            return None
+        rss = get_rss_bytes()
+        if (
+            rss is not None
+            and self._baseline_rss is not None
+            and rss - self._baseline_rss >= self.growth_threshold
+        ):
+            return "rss_growth"
+        if elapsed >= self.interval:
+            return "interval"
+        return None
+
+    def request(self, force: bool = False) -> bool:
+        """请求一次回收，返回是否已安排执行"""
+        with self._lock:
+            self.requests += 1
+            reason = "forced" if force and not self._running else self._due(time.monotonic())
+            if reason is None:
+                return False
+            self._running = True
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or force:
+            self._trim(reason)
+        else:
+            loop.run_in_executor(None, self._trim, reason)
+        return True
+
+    def _trim(self, reason: str) -> None:
+        try:
+            rss_before = get_rss_bytes()
+            start = time.perf_counter()
+            gc.collect(2 if reason == "forced" else self.gc_generation)
+            gc_ms = (time.perf_counter() - start) * 1000
+            trim_ms = 0.0
+            if self._malloc_trim is not None:
+                start = time.perf_counter()
+                self._malloc_trim(0)
+                trim_ms = (time.perf_counter() - start) * 1000
+            rss_after = get_rss_bytes()
+            released = (
+                max(rss_before - rss_after, 0)
+                if rss_before is not None and rss_after is not None
+                else 0
+            )
+            with self._lock:
+                self.trims += 1
+                self.last_reason = reason
+                self.last_gc_ms = gc_ms
+                self.max_gc_ms = max(self.max_gc_ms, gc_ms)
+                self.total_gc_ms += gc_ms
+                self.last_malloc_trim_ms = trim_ms
+                self.last_released_bytes = released
+                self.total_released_bytes += released
+                self._baseline_rss = rss_after
+            _logger.debug(
+                "trim_memory(%s): gc %.1fms, malloc_trim %.1fms, released %d bytes",
+                reason,
+                gc_ms,
+                trim_ms,
+                released,
+            )
+        except Exception as exc:
+            _logger.debug("trim_memory failed: %s", exc)
+        finally:
+            with self._lock:
+                self._running = False
+                self._last_trim = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rss_bytes": get_rss_bytes(),
+                "baseline_rss_bytes": self._baseline_rss,
+                "growth_threshold_bytes": self.growth_threshold,
+                "interval_seconds": self.interval,
+                "min_interval_seconds": self.min_interval,
+                "gc_generation": self.gc_generation,
+                "requests": self.requests,
+                "trims": self.trims,
+                "skipped": self.requests - self.trims,
+                "last_reason": self.last_reason,
+                "last_gc_ms": round(self.last_gc_ms, 2),
+                "max_gc_ms": round(self.max_gc_ms, 2),
+                "avg_gc_ms": round(self.total_gc_ms / self.trims, 2) if self.trims else None,
+                "last_malloc_trim_ms": round(self.last_malloc_trim_ms, 2),
+                "last_released_bytes": self.last_released_bytes,
+                "total_released_bytes": self.total_released_bytes,
+            }
+
+
+_trimmer: Optional[MemoryTrimmer] = None
+_trimmer_lock = threading.Lock()
+
+
+def get_memory_trimmer() -> MemoryTrimmer:
+    global _trimmer
+    if _trimmer is None:
+        with _trimmer_lock:
+            if _trimmer is None:
+                _trimmer = MemoryTrimmer()
+    return _trimmer
+
 
-def trim_memory() -> None:
+def trim_memory(force: bool = False) -> None:
     """
-    强制执行 Python 垃圾回收并尝试将未使用的内存页归还给操作系统。
-    在 Linux (glibc) 环境下调用 malloc_trim(0)。
+    请求执行垃圾回收并将未使用的内存页归还给操作系统（Linux glibc 下调用
+    malloc_trim(0)）。默认只在 RSS 增长超过阈值或到达间隔时执行，
+    force=True 时立即同步执行（用于进程退出等场景）。
     """
     try:
-        gc.collect()
-        if sys.platform.startswith("linux"):
-            try:
-                libc = ctypes.CDLL("libc.so.6")
-                if hasattr(libc, "malloc_trim"):
-                    libc.malloc_trim(0)
-            except Exception:
-                pass
+        get_memory_trimmer().request(force=force)
     except Exception as exc:
         _logger.debug("trim_memory failed: %s", exc)
@@ -0,0 +1,146 @@
+"""
+Compact snapshots of Pyrogram messages for the sign/monitor flows.
+
+A ``Message`` keeps references to the client, full ``Chat``/``User``
+objects, entities and more. The flows only need a handful of fields, so
+received messages are reduced to a slotted ``MessageSnapshot`` exposing the
+same attribute names (``id``, ``chat.id``, ``text``, ``caption``,
+``photo``, ``reply_markup`` ...), and each chat keeps a fixed-size
+``MessageRingBuffer`` instead of an unbounded dict.
+
+``reply_markup`` is kept as-is: keyboard markups hold only button data and
+no client reference, and keeping the original type leaves the existing
+``isinstance`` checks untouched.
+"""
+
+from typing import Any, Optional, Tuple
+
+from .utils import read_int_env
+
+
+def get_chat_buffer_size() -> int:
+    """每个 chat 保留的最近消息条数"""
+    return read_int_env("SIGN_TASK_CHAT_BUFFER_SIZE", 100, 10)
+
+
+class ChatRef:
+    __slots__ = ("id",)
+
+    def __init__(self, chat_id: Any):
+        self.id = chat_id
+
+    def __repr__(self) -> str:
+        return f"ChatRef(id={self.id!r})"
+
+
+class PhotoRef:
+    """下载所需的图片信息（见 ``image_pipeline.pick_photo_file_id``）"""
+
+    __slots__ = ("file_id", "width", "height", "thumbs")
+
+    def __init__(
+        self,
+        file_id: str,
+        width: int = 0,
+        height: int = 0,
+        thumbs: Tuple["PhotoRef", ...] = (),
+    ):
+        self.file_id = file_id
+        self.width = width
+        self.height = height
+        self.thumbs = thumbs
+
+    @classmethod
+    def from_photo(cls, photo: Any) -> Optional["PhotoRef"]:
+        if photo is None:
+            return None
+        thumbs = tuple(
+            cls(thumb.file_id, thumb.width or 0, thumb.height or 0)
+            for thumb in (getattr(photo, "thumbs", None) or [])
+            if getattr(thumb, "file_id", None)
+        )
+        return cls(photo.file_id, photo.width or 0, photo.height or 0, thumbs)
+
+
+class MessageSnapshot:
+    __slots__ = (
+        "id",
+        "chat",
+        "message_thread_id",
+        "reply_to_top_message_id",
+        "text",
+        "caption",
+        "media",
+        "photo",
+        "reply_markup",
+        "edit_date",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        chat: ChatRef,
+        *,
+        message_thread_id: Optional[int] = None,
+        reply_to_top_message_id: Optional[int] = None,
+        text: Optional[str] = None,
+        caption: Optional[str] = None,
+        media: Any = None,
+        photo: Optional[PhotoRef] = None,
+        reply_markup: Any = None,
+        edit_date: Any = None,
+    ):
+        self.id = id
+        self.chat = chat
+        self.message_thread_id = message_thread_id
+        self.reply_to_top_message_id = reply_to_top_message_id
+        self.text = text
+        self.caption = caption
+        self.media = media
+        self.photo = photo
+        self.reply_markup = reply_markup
+        self.edit_date = edit_date
+
+    @classmethod
+    def from_message(cls, message: Any) -> "MessageSnapshot":
+        if isinstance(message, cls):
+            return message
+        chat = getattr(message, "chat", None)
+        text = getattr(message, "text", None)
+        caption = getattr(message, "caption", None)
+        return cls(
+            message.id,
+            ChatRef(getattr(chat, "id", None)),
+            message_thread_id=getattr(message, "message_thread_id", None),
+            reply_to_top_message_id=getattr(message, "reply_to_top_message_id", None),
+            # Pyrogram 的 Str 子类带有 entities 等附加信息，这里只保留纯文本
+            text=str(text) if text is not None else None,
+            caption=str(caption) if caption is not None else None,
+            media=getattr(message, "media", None),
+            photo=PhotoRef.from_photo(getattr(message, "photo", None)),
+            reply_markup=getattr(message, "reply_markup", None),
+            edit_date=getattr(message, "edit_date", None),
+        )
+
+    def __repr__(self) -> str:
+        return f"MessageSnapshot(id={self.id!r}, chat_id={self.chat.id!r})"
+
+
+class MessageRingBuffer(dict):
+    """
+    按接收顺序保存最近 ``capacity`` 条消息（message_id -> snapshot）。
+
+    对已有 key 赋值（消息编辑、处理后置为 None）不改变其位置；新增 key
+    超出容量时淘汰最早的一条。
+    """
+
+    __slots__ = ("capacity",)
+
+    def __init__(self, capacity: Optional[int] = None):
+        super().__init__()
+        self.capacity = capacity or get_chat_buffer_size()
+
+    def __setitem__(self, key, value) -> None:
+        if key not in self and len(self) >= self.capacity:
+            del self[next(iter(self))]
+        super().__setitem__(key, value)
@@ -0,0 +1,585 @@
+"""
+Pyrogram session storage that keeps SQLite off the event loop.
+
+Pyrogram's ``SQLiteStorage`` exposes ``async`` methods but runs every query
+synchronously, so a session file locked by another process (or a slow disk)
+stalls the loop that drives all MTProto connections for up to the SQLite
+busy timeout. ``ThreadedFileStorage`` runs all work for one ``.session``
+database on a dedicated single-thread executor: the connection is only used
+from that thread, queries for the same database stay ordered, and a lock
+wait only blocks that database's thread.
+
+The database is opened in WAL mode with a busy timeout, and the ``VACUUM``
+Pyrogram runs on open is skipped (it needs an exclusive lock).
+
+With ``TG_SESSION_BACKEND=shared`` file-mode clients use
+``SharedSessionStorage`` instead: every account's auth key, peers,
+usernames and update state live in one indexed ``sessions.db`` next to the
+per-account files (one connection, one WAL, one writer thread). Existing
+``.session`` files are imported with ``python -m tools.migrate_session_db``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from pyrogram.storage import FileStorage, Storage
+from pyrogram.storage.sqlite_storage import SQLiteStorage, get_input_peer
+
+from .utils import read_float_env
+
+SHARED_DB_NAME = "sessions.db"
+SESSION_COLUMNS = ("dc_id", "api_id", "test_mode", "auth_key", "date", "user_id", "is_bot")
+
+
+def get_busy_timeout() -> float:
+    """会话库加锁时的最长等待秒数（只阻塞该会话的存储线程）"""
+    return read_float_env("SESSION_DB_BUSY_TIMEOUT", 30.0, 1.0)
+
+
+def get_session_backend() -> str:
+    """file: 每个账号一个 .session 文件；shared: 所有账号共用 sessions.db"""
+    backend = os.getenv("TG_SESSION_BACKEND", "file").strip().lower()
+    return "shared" if backend == "shared" else "file"
+
+
+def _run_sync(coro) -> Any:
+    """在当前线程执行一个不含 await 的协程（Pyrogram SQLiteStorage 的方法）"""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("storage coroutine suspended unexpectedly")
+
+
+class ThreadedFileStorage(FileStorage):
+    def __init__(self, name: str, workdir: Path):
+        super().__init__(name, workdir)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix=f"session-{Path(self.name).name}",
+            )
+        return self._executor
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def _call_parent(self, coro) -> Any:
+        return await self._call(_run_sync, coro)
+
+    def _open_sync(self) -> None:
+        path = self.database
+        file_exists = path.is_file()
+        timeout = get_busy_timeout()
+        self.conn = sqlite3.connect(str(path), timeout=timeout, check_same_thread=False)
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+        except sqlite3.Error:
+            pass
+        if not file_exists:
+            self.create()
+        else:
+            self.update()
+
+    async def open(self):
+        await self._call(self._open_sync)
+
+    def _save_sync(self) -> None:
+        self._column("date", int(time.time()))
+        self.conn.commit()
+
+    async def save(self):
+        await self._call(self._save_sync)
+
+    async def close(self):
+        executor = self._executor
+        try:
+            if self.conn is not None:
+                await self._call(self.conn.close)
+        finally:
+            self._executor = None
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    async def delete(self):
+        await self._call(os.remove, self.database)
+
+    async def update_peers(self, peers: List[Tuple[int, int, str, str]]):
+        return await self._call_parent(super().update_peers(peers))
+
+    async def update_usernames(self, usernames: List[Tuple[int, List[str]]]):
+        return await self._call_parent(super().update_usernames(usernames))
+
+    async def update_state(self, value: Tuple[int, int, int, int, int] = object):
+        return await self._call_parent(super().update_state(value))
+
+    async def get_peer_by_id(self, peer_id: int):
+        return await self._call_parent(super().get_peer_by_id(peer_id))
+
+    async def get_peer_by_username(self, username: str):
+        return await self._call_parent(super().get_peer_by_username(username))
+
+    async def get_peer_by_phone_number(self, phone_number: str):
+        return await self._call_parent(super().get_peer_by_phone_number(phone_number))
+
+    def _column(self, column: str, value: Any = object) -> Any:
+        # 上游 _get/_set 通过 inspect.stack() 推断列名，这里直接指定
+        if value is object:
+            return self.conn.execute(f"SELECT {column} FROM sessions").fetchone()[0]
+        with self.conn:
+            self.conn.execute(f"UPDATE sessions SET {column} = ?", (value,))
+
+    async def dc_id(self, value: int = object):
+        return await self._call(self._column, "dc_id", value)
+
+    async def api_id(self, value: int = object):
+        return await self._call(self._column, "api_id", value)
+
+    async def test_mode(self, value: bool = object):
+        return await self._call(self._column, "test_mode", value)
+
+    async def auth_key(self, value: bytes = object):
+        return await self._call(self._column, "auth_key", value)
+
+    async def date(self, value: int = object):
+        return await self._call(self._column, "date", value)
+
+    async def user_id(self, value: int = object):
+        return await self._call(self._column, "user_id", value)
+
+    async def is_bot(self, value: bool = object):
+        return await self._call(self._column, "is_bot", value)
+
+
+# language=SQLite
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions
+(
+    account   TEXT PRIMARY KEY,
+    dc_id     INTEGER,
+    api_id    INTEGER,
+    test_mode INTEGER,
+    auth_key  BLOB,
+    date      INTEGER NOT NULL DEFAULT 0,
+    user_id   INTEGER,
+    is_bot    INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS peers
+(
+    account        TEXT    NOT NULL,
+    id             INTEGER NOT NULL,
+    access_hash    INTEGER,
+    type           TEXT    NOT NULL,
+    phone_number   TEXT,
+    last_update_on INTEGER NOT NULL DEFAULT (CAST(STRFTIME('%s', 'now') AS INTEGER)),
+    PRIMARY KEY (account, id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS usernames
+(
+    account  TEXT    NOT NULL,
+    id       INTEGER NOT NULL,
+    username TEXT    NOT NULL,
+    PRIMARY KEY (account, username, id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS update_state
+(
+    account TEXT    NOT NULL,
+    id      INTEGER NOT NULL,
+    pts     INTEGER,
+    qts     INTEGER,
+    date    INTEGER,
+    seq     INTEGER,
+    PRIMARY KEY (account, id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_peers_phone_number ON peers (account, phone_number);
+CREATE INDEX IF NOT EXISTS idx_usernames_id ON usernames (account, id);
+"""
+
+
+class SharedSessionDatabase:
+    """
+    所有账号共用的会话库。
+
+    连接只有一个，所有访问都在 ``_lock`` 下进行。协程必须使用 ``call`` /
+    ``async_*`` 方法（在专属的单线程执行器中执行），``call_sync`` 只用于
+    已经在工作线程中的同步代码（启动时导出 session_string、线程池中的路由）。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            timeout = get_busy_timeout()
+            conn = sqlite3.connect(str(self.path), timeout=timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+            with conn:
+                conn.executescript(SHARED_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def call_sync(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            return func(self._connect(), *args)
+
+    async def call(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="session-shared"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.call_sync, func, *args)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _list_accounts(conn: sqlite3.Connection) -> List[str]:
+        return [
+            row[0]
+            for row in conn.execute(
+                "SELECT account FROM sessions WHERE auth_key IS NOT NULL ORDER BY account"
+            )
+        ]
+
+    def list_accounts(self) -> List[str]:
+        return self.call_sync(self._list_accounts)
+
+    async def async_list_accounts(self) -> List[str]:
+        return await self.call(self._list_accounts)
+
+    def get_session_row(self, account: str) -> Optional[Tuple[Any, ...]]:
+        return self.call_sync(
+            lambda conn: conn.execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM sessions WHERE account = ?",
+                (account,),
+            ).fetchone()
+        )
+
+    def get_export_row(self, account: str) -> Optional[Tuple[Any, ...]]:
+        """(dc_id, api_id, test_mode, auth_key, user_id, is_bot)，与 .session 文件的导出查询一致"""
+        return self.call_sync(
+            lambda conn: conn.execute(
+                "SELECT dc_id, api_id, test_mode, auth_key, user_id, is_bot "
+                "FROM sessions WHERE account = ?",
+                (account,),
+            ).fetchone()
+        )
+
+    @staticmethod
+    def _has_account(conn: sqlite3.Connection, account: str) -> bool:
+        row = conn.execute(
+            "SELECT auth_key FROM sessions WHERE account = ?", (account,)
+        ).fetchone()
+        return row is not None and row[0] is not None
+
+    def has_account(self, account: str) -> bool:
+        return bool(self.call_sync(self._has_account, account))
+
+    async def async_has_account(self, account: str) -> bool:
+        return bool(await self.call(self._has_account, account))
+
+    @staticmethod
+    def _delete_account(conn: sqlite3.Connection, account: str) -> int:
+        with conn:
+            for table in ("peers", "usernames", "update_state"):
+                conn.execute(f"DELETE FROM {table} WHERE account = ?", (account,))
+            return conn.execute("DELETE FROM sessions WHERE account = ?", (account,)).rowcount
+
+    def delete_account(self, account: str) -> bool:
+        return bool(self.call_sync(self._delete_account, account))
+
+    async def async_delete_account(self, account: str) -> bool:
+        return bool(await self.call(self._delete_account, account))
+
+    @classmethod
+    def _rename_account(cls, conn: sqlite3.Connection, old: str, new: str) -> int:
+        if conn.execute("SELECT 1 FROM sessions WHERE account = ?", (old,)).fetchone() is None:
+            return 0
+        cls._delete_account(conn, new)
+        with conn:
+            for table in ("peers", "usernames", "update_state"):
+                conn.execute(f"UPDATE {table} SET account = ? WHERE account = ?", (new, old))
+            return conn.execute(
+                "UPDATE sessions SET account = ? WHERE account = ?", (new, old)
+            ).rowcount
+
+    def rename_account(self, old: str, new: str) -> bool:
+        return bool(self.call_sync(self._rename_account, old, new))
+
+    async def async_rename_account(self, old: str, new: str) -> bool:
+        return bool(await self.call(self._rename_account, old, new))
+
+    def import_session_file(self, account: str, session_file: Union[str, Path]) -> bool:
+        """把单个 Pyrogram .session 文件的数据导入（覆盖）到共享库"""
+
+        def _import(conn: sqlite3.Connection) -> bool:
+            conn.execute("ATTACH DATABASE ? AS src", (str(session_file),))
+            try:
+                row = conn.execute(
+                    f"SELECT {', '.join(SESSION_COLUMNS)} FROM src.sessions"
+                ).fetchone()
+                if row is None:
+                    return False
+                self._delete_account(conn, account)
+                with conn:
+                    conn.execute(
+                        f"INSERT INTO sessions (account, {', '.join(SESSION_COLUMNS)}) "
+                        f"VALUES (?, {', '.join('?' * len(SESSION_COLUMNS))})",
+                        (account, *row),
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO peers "
+                        "(account, id, access_hash, type, phone_number, last_update_on) "
+                        "SELECT ?, id, access_hash, type, phone_number, last_update_on "
+                        "FROM src.peers",
+                        (account,),
+                    )
+                    tables = {
+                        name
+                        for (name,) in conn.execute(
+                            "SELECT name FROM src.sqlite_master WHERE type = 'table'"
+                        )
+                    }
+                    if "usernames" in tables:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO usernames (account, id, username) "
+                            "SELECT ?, id, username FROM src.usernames "
+                            "WHERE username IS NOT NULL",
+                            (account,),
+                        )
+                    if "update_state" in tables:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO update_state "
+                            "(account, id, pts, qts, date, seq) "
+                            "SELECT ?, id, pts, qts, date, seq FROM src.update_state",
+                            (account,),
+                        )
+                return True
+            finally:
+                conn.execute("DETACH DATABASE src")
+
+        return self.call_sync(_import)
+
+
+_shared_databases: Dict[str, SharedSessionDatabase] = {}
+_shared_databases_lock = threading.Lock()
+
+
+def get_shared_session_db(path: Union[str, Path]) -> SharedSessionDatabase:
+    key = os.path.abspath(str(path))
+    with _shared_databases_lock:
+        db = _shared_databases.get(key)
+        if db is None:
+            db = _shared_databases[key] = SharedSessionDatabase(key)
+        return db
+
+
+def close_shared_session_dbs() -> None:
+    with _shared_databases_lock:
+        databases = list(_shared_databases.values())
+        _shared_databases.clear()
+    for db in databases:
+        db.close()
+
+
+class SharedSessionStorage(Storage):
+    """单个账号在共享会话库中的视图，接口与 Pyrogram SQLiteStorage 一致"""
+
+    USERNAME_TTL = SQLiteStorage.USERNAME_TTL
+
+    def __init__(self, name: str, db: SharedSessionDatabase):
+        super().__init__(name)
+        self.account = Path(name).name
+        self.db = db
+
+    async def open(self):
+        def _open(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO sessions (account, dc_id, date) VALUES (?, 2, 0)",
+                    (self.account,),
+                )
+
+        await self.db.call(_open)
+
+    async def save(self):
+        await self.date(int(time.time()))
+
+    async def close(self):
+        pass
+
+    async def delete(self):
+        await self.db.call(SharedSessionDatabase._delete_account, self.account)
+
+    async def update_peers(self, peers: List[Tuple[int, int, str, str]]):
+        rows = [(self.account, *peer) for peer in peers]
+
+        def _update(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.executemany(
+                    "REPLACE INTO peers (account, id, access_hash, type, phone_number) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+        await self.db.call(_update)
+
+    async def update_usernames(self, usernames: List[Tuple[int, List[str]]]):
+        account = self.account
+
+        def _update(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.executemany(
+                    "DELETE FROM usernames WHERE account = ? AND id = ?",
+                    [(account, peer_id) for peer_id, _ in usernames],
+                )
+                conn.executemany(
+                    "REPLACE INTO usernames (account, id, username) VALUES (?, ?, ?)",
+                    [
+                        (account, peer_id, username)
+                        for peer_id, names in usernames
+                        for username in names
+                    ],
+                )
+
+        await self.db.call(_update)
+
+    async def update_state(self, value: Tuple[int, int, int, int, int] = object):
+        account = self.account
+
+        def _state(conn: sqlite3.Connection):
+            if value is object:
+                return conn.execute(
+                    "SELECT id, pts, qts, date, seq FROM update_state "
+                    "WHERE account = ? ORDER BY date ASC",
+                    (account,),
+                ).fetchall()
+            with conn:
+                if isinstance(value, int):
+                    conn.execute(
+                        "DELETE FROM update_state WHERE account = ? AND id = ?",
+                        (account, value),
+                    )
+                else:
+                    conn.execute(
+                        "REPLACE INTO update_state (account, id, pts, qts, date, seq) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (account, *value),
+                    )
+            return None
+
+        return await self.db.call(_state)
+
+    async def _fetch_peer(self, sql: str, key: Any, error: str):
+        row = await self.db.call(
+            lambda conn: conn.execute(sql, (self.account, key)).fetchone()
+        )
+        if row is None:
+            raise KeyError(f"{error}: {key}")
+        return row
+
+    async def get_peer_by_id(self, peer_id: int):
+        row = await self._fetch_peer(
+            "SELECT id, access_hash, type FROM peers WHERE account = ? AND id = ?",
+            peer_id,
+            "ID not found",
+        )
+        return get_input_peer(*row)
+
+    async def get_peer_by_username(self, username: str):
+        row = await self._fetch_peer(
+            "SELECT p.id, p.access_hash, p.type, p.last_update_on FROM usernames u "
+            "JOIN peers p ON p.account = u.account AND p.id = u.id "
+            "WHERE u.account = ? AND u.username = ? "
+            "ORDER BY p.last_update_on DESC",
+            username,
+            "Username not found",
+        )
+        if abs(time.time() - row[3]) > self.USERNAME_TTL:
+            raise KeyError(f"Username expired: {username}")
+        return get_input_peer(*row[:3])
+
+    async def get_peer_by_phone_number(self, phone_number: str):
+        row = await self._fetch_peer(
+            "SELECT id, access_hash, type FROM peers WHERE account = ? AND phone_number = ?",
+            phone_number,
+            "Phone number not found",
+        )
+        return get_input_peer(*row)
+
+    async def _column(self, column: str, value: Any = object) -> Any:
+        account = self.account
+
+        def _access(conn: sqlite3.Connection):
+            if value is object:
+                row = conn.execute(
+                    f"SELECT {column} FROM sessions WHERE account = ?", (account,)
+                ).fetchone()
+                return row[0] if row else None
+            with conn:
+                conn.execute(
+                    f"UPDATE sessions SET {column} = ? WHERE account = ?", (value, account)
+                )
+            return None
+
+        return await self.db.call(_access)
+
+    async def dc_id(self, value: int = object):
+        return await self._column("dc_id", value)
+
+    async def api_id(self, value: int = object):
+        return await self._column("api_id", value)
+
+    async def test_mode(self, value: bool = object):
+        return await self._column("test_mode", value)
+
+    async def auth_key(self, value: bytes = object):
+        return await self._column("auth_key", value)
+
+    async def date(self, value: int = object):
+        return await self._column("date", value)
+
+    async def user_id(self, value: int = object):
+        return await self._column("user_id", value)
+
+    async def is_bot(self, value: bool = object):
+        return await self._column("is_bot", value)
+
+
+def make_file_storage(name: str, workdir: Path) -> Storage:
+    """替换 Pyrogram Client 中的 ``FileStorage(name, workdir)``"""
+    if get_session_backend() == "shared":
+        session_dir = (Path(workdir) / name).parent
+        return SharedSessionStorage(name, get_shared_session_db(session_dir / SHARED_DB_NAME))
+    return ThreadedFileStorage(name, workdir)
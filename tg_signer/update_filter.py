@@ -0,0 +1,121 @@
+"""
+Per-client update filtering by chat id.
+
+A client started with updates enabled receives every update of every chat the
+account is in, and Pyrogram issues ``GetChannelDifference`` / ``GetDifference``
+for many of them before any handler sees the update. ``UpdateFilter`` keeps the
+set of chat ids that the client's users (keyword monitor, running signers)
+actually handle; updates for other chats are dropped in ``Client.handle_updates``
+before any difference is fetched or anything is dispatched.
+
+Each user registers its chats under an owner key, and the effective filter is
+the union. Registering ``None`` (e.g. chats given as usernames that cannot be
+matched against raw peers) disables filtering while that owner is registered,
+as does having no owners at all.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional
+
+
+def _peer_id(peer: Any) -> Optional[int]:
+    user_id = getattr(peer, "user_id", None)
+    if user_id is not None:
+        return int(user_id)
+    chat_id = getattr(peer, "chat_id", None)
+    if chat_id is not None:
+        return -int(chat_id)
+    channel_id = getattr(peer, "channel_id", None)
+    if channel_id is not None:
+        return _channel_peer_id(channel_id)
+    return None
+
+
+def _channel_peer_id(channel_id: int) -> int:
+    # 与 pyrogram.utils.get_channel_id 一致：-100xxxxxxxxxx
+    return -1000000000000 - int(channel_id)
+
+
+def update_chat_id(update: Any) -> Optional[int]:
+    """更新所属 chat 的 id（Pyrogram Message.chat.id 格式），无法归属时返回 None"""
+    message = getattr(update, "message", None)
+    peer = getattr(message, "peer_id", None)
+    if peer is not None:
+        return _peer_id(peer)
+    channel_id = getattr(update, "channel_id", None)
+    if channel_id is not None:
+        return _channel_peer_id(channel_id)
+    peer = getattr(update, "peer", None)
+    if peer is not None:
+        return _peer_id(peer)
+    return None
+
+
+def short_update_chat_id(updates: Any) -> Optional[int]:
+    """UpdateShortMessage / UpdateShortChatMessage 所属 chat 的 id"""
+    chat_id = getattr(updates, "chat_id", None)
+    if chat_id is not None:
+        return -int(chat_id)
+    user_id = getattr(updates, "user_id", None)
+    if user_id is not None:
+        return int(user_id)
+    return None
+
+
+class UpdateFilter:
+    def __init__(self) -> None:
+        self._owners: Dict[str, Optional[frozenset]] = {}
+        self._chat_ids: Optional[frozenset] = None
+        self.received = 0
+        self.dispatched = 0
+
+    def watch(self, owner: str, chat_ids: Optional[Iterable[Any]]) -> None:
+        ids: Optional[frozenset] = None
+        if chat_ids is not None:
+            values = list(chat_ids)
+            if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+                ids = frozenset(values)
+        self._owners[owner] = ids
+        self._rebuild()
+
+    def unwatch(self, owner: str) -> None:
+        if owner in self._owners:
+            del self._owners[owner]
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        if not self._owners or any(ids is None for ids in self._owners.values()):
+            self._chat_ids = None
+            return
+        merged: set = set()
+        for ids in self._owners.values():
+            merged.update(ids)
+        self._chat_ids = frozenset(merged)
+
+    @property
+    def active(self) -> bool:
+        return self._chat_ids is not None
+
+    @property
+    def chat_ids(self) -> Optional[frozenset]:
+        return self._chat_ids
+
+    def allows(self, chat_id: Optional[int]) -> bool:
+        chat_ids = self._chat_ids
+        # 无法归属 chat 的更新（在线状态等）不涉及 difference，直接放行
+        return chat_ids is None or chat_id is None or chat_id in chat_ids
+
+    def record(self, received: int, dispatched: int) -> None:
+        self.received += received
+        self.dispatched += dispatched
+
+    def stats(self) -> Dict[str, Any]:
+        chat_ids = self._chat_ids
+        return {
+            "filtering": chat_ids is not None,
+            "chat_ids": sorted(chat_ids) if chat_ids is not None else None,
+            "received": self.received,
+            "dispatched": self.dispatched,
+            "dropped": self.received - self.dispatched,
+        }
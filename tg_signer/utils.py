@@ -1,3 +1,4 @@
+import os
 import sys
 from typing import Dict, Literal
 
@@ -329,3 +330,46 @@ def atomic_write_text(file_path, text: str, encoding: str = "utf-8") -> None:
             with contextlib.suppress(Exception):
                 temp_file.unlink()
         raise
+
+
+def atomic_write_bytes(file_path, data: bytes) -> None:
+    """Safely write binary data using atomic replace to prevent corrupt files."""
+    import contextlib
+    import os
+    import time
+    from pathlib import Path
+
+    path = Path(file_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = path.with_suffix(f".tmp.{os.getpid()}.{time.time_ns()}")
+    try:
+        with open(temp_file, "wb") as f:
+            f.write(data)
+        os.replace(temp_file, path)
+    except Exception:
+        if temp_file.exists():
+            with contextlib.suppress(Exception):
+                temp_file.unlink()
+        raise
+
+
+def read_int_env(name: str, default: int, minimum: int) -> int:
+    """读取整数环境变量：未设置或无法解析时返回 default，否则不小于 minimum"""
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(int(raw), minimum)
+    except (TypeError, ValueError):
+        return default
+
+
+def read_float_env(name: str, default: float, minimum: float) -> float:
+    """读取浮点数环境变量：未设置或无法解析时返回 default，否则不小于 minimum"""
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    try:
+        return max(float(raw), minimum)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,236 @@
+"""
+Benchmark UserMonitor external forwarding against local HTTP/UDP sinks.
+
+Compares the old path (a new httpx client / datagram endpoint per message,
+payload ``str(message)``) with the pooled forwarder, with and without
+HTTP micro-batching.
+
+    python -m tools.bench_forwarding
+    python -m tools.bench_forwarding --messages 5000 --batch-size 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+
+from tg_signer.forwarding import ExternalForwarder, _UDPProtocol, encode_message
+
+
+def _sample_message():
+    from pyrogram import enums, types
+
+    chat = types.Chat(
+        id=-1001234567890,
+        type=enums.ChatType.SUPERGROUP,
+        title="Benchmark group",
+        username="bench_group",
+    )
+    user = types.User(
+        id=123456789,
+        is_bot=False,
+        first_name="Bench",
+        last_name="User",
+        username="bench_user",
+        language_code="en",
+    )
+    replied = types.Message(
+        id=41,
+        chat=chat,
+        from_user=user,
+        date=datetime(2024, 1, 1, 8, 0, 0),
+        text="previous message " * 5,
+    )
+    return types.Message(
+        id=42,
+        chat=chat,
+        from_user=user,
+        date=datetime(2024, 1, 1, 8, 0, 1),
+        text="签到成功，获得 10 积分 https://example.com/checkin " * 3,
+        entities=[
+            types.MessageEntity(type=enums.MessageEntityType.URL, offset=20, length=29),
+            types.MessageEntity(type=enums.MessageEntityType.BOLD, offset=0, length=4),
+        ],
+        reply_to_message_id=41,
+        reply_to_message=replied,
+    )
+
+
+class _HttpSink:
+    """最小的 keep-alive HTTP 服务器，统计请求数与字节数"""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = await reader.readexactly(length)
+                self.requests += 1
+                self.bytes += len(body)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class _UdpSink(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.datagrams = 0
+        self.bytes = 0
+
+    def datagram_received(self, data, addr):
+        self.datagrams += 1
+        self.bytes += len(data)
+
+
+async def _legacy_http(url: str, message) -> None:
+    content = str(message).encode("utf-8")
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
+    ) as client:
+        response = await client.post(
+            url, content=content, headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+
+
+async def _legacy_udp(host: str, port: int, message) -> None:
+    data = str(message).encode("utf-8")
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        _UDPProtocol, remote_addr=(host, port)
+    )
+    try:
+        transport.sendto(data)
+    finally:
+        transport.close()
+
+
+async def _run(label: str, count: int, concurrency: int, send_one, finish=None):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one():
+        async with semaphore:
+            await send_one()
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(count)))
+    if finish is not None:
+        await finish()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    print(
+        f"{label:<28} {elapsed:8.3f}s {count / elapsed:10.0f} msg/s "
+        f"{cpu * 1e6 / count:10.1f} µs CPU/msg"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    message = _sample_message()
+    print(
+        f"payload size: str(message)={len(str(message).encode())} B, "
+        f"compact={len(encode_message(message))} B"
+    )
+
+    http_sink = _HttpSink()
+    server = await asyncio.start_server(http_sink.handle, "127.0.0.1", 0)
+    http_port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{http_port}/hook"
+
+    loop = asyncio.get_running_loop()
+    udp_transport, udp_sink = await loop.create_datagram_endpoint(
+        _UdpSink, local_addr=("127.0.0.1", 0)
+    )
+    udp_port = udp_transport.get_extra_info("sockname")[1]
+
+    n, c = args.messages, args.concurrency
+    print(f"{n} messages, concurrency {c}\n")
+
+    def _report_http(before):
+        print(
+            f"{'':<28} -> {http_sink.requests - before[0]} requests, "
+            f"{(http_sink.bytes - before[1]) / 1024:.0f} KiB"
+        )
+
+    before = (http_sink.requests, http_sink.bytes)
+    await _run("http legacy", n, c, lambda: _legacy_http(url, message))
+    _report_http(before)
+
+    forwarder = ExternalForwarder()
+    forwarder.batch_size = 1
+    before = (http_sink.requests, http_sink.bytes)
+    await _run(
+        "http pooled",
+        n,
+        c,
+        lambda: forwarder.send_http(url, None, encode_message(message)),
+    )
+    _report_http(before)
+
+    batched = ExternalForwarder()
+    batched.batch_size = args.batch_size
+    batched.batch_ms = args.batch_ms
+    before = (http_sink.requests, http_sink.bytes)
+    await _run(
+        f"http pooled+batch({args.batch_size})",
+        n,
+        c,
+        lambda: batched.send_http(url, None, encode_message(message)),
+        finish=batched.aclose,
+    )
+    _report_http(before)
+
+    async def _report_udp(before):
+        await asyncio.sleep(0.2)
+        # 本机 UDP 在突发下会因接收缓冲区满而丢包，两种方式同样受影响
+        print(
+            f"{'':<28} -> {udp_sink.datagrams - before[0]} datagrams received, "
+            f"{(udp_sink.bytes - before[1]) / 1024:.0f} KiB"
+        )
+
+    print()
+    before = (udp_sink.datagrams, udp_sink.bytes)
+    await _run("udp legacy", n, c, lambda: _legacy_udp("127.0.0.1", udp_port, message))
+    await _report_udp(before)
+    before = (udp_sink.datagrams, udp_sink.bytes)
+    await _run(
+        "udp pooled",
+        n,
+        c,
+        lambda: forwarder.send_udp("127.0.0.1", udp_port, encode_message(message)),
+    )
+    await _report_udp(before)
+
+    await forwarder.aclose()
+    udp_transport.close()
+    server.close()
+    await server.wait_closed()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--batch-ms", type=int, default=50)
+    asyncio.run(main_async(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
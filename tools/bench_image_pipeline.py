@@ -0,0 +1,101 @@
+"""
+Benchmark the vision image pipeline.
+
+Compares the old path (BytesIO.read() copy + base64 + utf-8 decode) with the
+memoryview path, and reports payload sizes after optional downscaling.
+
+    python -m tools.bench_image_pipeline
+    python -m tools.bench_image_pipeline --images ./samples --max-side 1024
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import random
+import time
+from pathlib import Path
+
+from tg_signer.ai_tools import encode_image
+from tg_signer.image_pipeline import downscale_image
+
+
+def _synthetic_images() -> list[tuple[str, bytes]]:
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(0)
+    samples = []
+    for width, height in ((320, 320), (800, 600), (1280, 960), (2560, 1920)):
+        img = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(img)
+        for _ in range(width * height // 2000):
+            x, y = rng.randrange(width), rng.randrange(height)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            draw.rectangle([x, y, x + 12, y + 12], fill=color)
+        draw.text((width // 4, height // 2), "12 + 7 = ?", fill="black")
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=90)
+        samples.append((f"synthetic_{width}x{height}.jpg", out.getvalue()))
+    return samples
+
+
+def _load_images(directory: Path) -> list[tuple[str, bytes]]:
+    return [
+        (path.name, path.read_bytes())
+        for path in sorted(directory.iterdir())
+        if path.suffix.lower() in {".jpg", ".jpeg", ".png", ".webp"}
+    ]
+
+
+def _old_path(data: bytes) -> str:
+    buffer = io.BytesIO(data)
+    buffer.seek(0)
+    image_bytes = buffer.read()
+    buffer.close()
+    return f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode('utf-8')}"
+
+
+def _new_path(data: bytes, max_side: int) -> str:
+    buffer = io.BytesIO(data)
+    image = downscale_image(buffer.getbuffer(), max_side)
+    return f"data:image/jpeg;base64,{encode_image(image)}"
+
+
+def _bench(func, *args, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(*args)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the vision image pipeline")
+    parser.add_argument("--images", type=Path, default=None, help="Directory of sample images")
+    parser.add_argument("--max-side", type=int, default=1024, help="Downscale bound (0 = off)")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    samples = _load_images(args.images) if args.images else _synthetic_images()
+    if not samples:
+        print("No sample images found.")
+        return 1
+
+    print(
+        f"{'image':<28}{'bytes':>10}{'old ms':>10}{'zero-copy ms':>14}"
+        f"{'scaled ms':>11}{'payload':>10}{'scaled':>10}"
+    )
+    for name, data in samples:
+        old_ms = _bench(_old_path, data, rounds=args.rounds)
+        new_ms = _bench(_new_path, data, 0, rounds=args.rounds)
+        scaled_ms = _bench(_new_path, data, args.max_side, rounds=max(args.rounds // 5, 1))
+        print(
+            f"{name:<28}{len(data):>10}{old_ms:>10.2f}{new_ms:>14.2f}"
+            f"{scaled_ms:>11.2f}{len(_new_path(data, 0)):>10}"
+            f"{len(_new_path(data, args.max_side)):>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,180 @@
+"""
+Benchmark memory held by the per-chat message cache of a sign run.
+
+Simulates one account receiving messages in 20 chats and compares the old
+cache (full Pyrogram ``Message`` objects in a dict trimmed from 200 to 100)
+with ``MessageSnapshot`` objects in a ``MessageRingBuffer``. Each mode runs
+in its own subprocess so RSS numbers are not polluted by the other.
+
+    python -m tools.bench_message_snapshots
+    python -m tools.bench_message_snapshots --chats 20 --messages 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+
+def _rss_kib() -> int:
+    try:
+        with open("/proc/self/status", encoding="ascii") as fp:
+            for line in fp:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _make_message(types, enums, chat_id: int, message_id: int):
+    chat = types.Chat(
+        id=chat_id,
+        type=enums.ChatType.PRIVATE,
+        first_name="SignBot",
+        username=f"sign_bot_{chat_id}",
+    )
+    user = types.User(
+        id=chat_id,
+        is_bot=True,
+        first_name="SignBot",
+        username=f"sign_bot_{chat_id}",
+    )
+    markup = types.InlineKeyboardMarkup(
+        [
+            [
+                types.InlineKeyboardButton("签到", callback_data=f"checkin:{message_id}"),
+                types.InlineKeyboardButton("余额", callback_data=f"balance:{message_id}"),
+            ],
+            [
+                types.InlineKeyboardButton("帮助", callback_data="help"),
+                types.InlineKeyboardButton("官网", url="https://example.com"),
+            ],
+        ]
+    )
+    photo = None
+    if message_id % 5 == 0:
+        photo = types.Photo(
+            file_id=f"AgACAgUAAxkBAAI{message_id:012d}",
+            file_unique_id=f"AQAD{message_id:08d}",
+            width=1280,
+            height=960,
+            file_size=120_000,
+            date=datetime(2024, 1, 1),
+            thumbs=[
+                types.Thumbnail(
+                    file_id=f"AgACAgUAAxkBAAI{message_id:012d}_m",
+                    file_unique_id=f"AQAD{message_id:08d}m",
+                    width=320,
+                    height=240,
+                    file_size=12_000,
+                )
+            ],
+        )
+    text = f"签到成功！今日获得 {message_id % 50} 积分，当前余额 {message_id * 3} 积分。" * 2
+    return types.Message(
+        id=message_id,
+        chat=chat,
+        from_user=user,
+        date=datetime(2024, 1, 1, 8, 0, 0),
+        text=None if photo else text,
+        caption=text if photo else None,
+        photo=photo,
+        entities=[
+            types.MessageEntity(type=enums.MessageEntityType.BOLD, offset=0, length=4)
+        ],
+        reply_markup=markup,
+    )
+
+
+def _store_legacy(cache, message) -> None:
+    chat_msgs = cache[message.chat.id]
+    chat_msgs[message.id] = message
+    if len(chat_msgs) > 200:
+        for key in sorted(chat_msgs.keys())[:100]:
+            chat_msgs.pop(key, None)
+
+
+def _store_snapshot(cache, message) -> None:
+    from tg_signer.message_snapshot import MessageSnapshot
+
+    cache[message.chat.id][message.id] = MessageSnapshot.from_message(message)
+
+
+def run_mode(mode: str, chats: int, messages: int) -> dict:
+    from pyrogram import enums, types
+
+    from tg_signer.message_snapshot import MessageRingBuffer
+
+    gc.collect()
+    rss_before = _rss_kib()
+    tracemalloc.start()
+    if mode == "legacy":
+        cache, store = defaultdict(dict), _store_legacy
+    else:
+        cache, store = defaultdict(MessageRingBuffer), _store_snapshot
+
+    for message_id in range(1, messages + 1):
+        for index in range(chats):
+            store(cache, _make_message(types, enums, 100_000 + index, message_id))
+
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mode": mode,
+        "cached": sum(len(v) for v in cache.values()),
+        "retained_kib": retained // 1024,
+        "peak_kib": peak // 1024,
+        "rss_delta_kib": _rss_kib() - rss_before,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-chat message cache memory")
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=1000, help="Messages per chat")
+    parser.add_argument("--mode", choices=("legacy", "snapshot"), default=None)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.chats, args.messages)))
+        return 0
+
+    print(f"{args.chats} chats x {args.messages} messages per chat\n")
+    print(f"{'mode':<10}{'cached':>8}{'retained KiB':>14}{'peak KiB':>10}{'RSS +KiB':>10}")
+    for mode in ("legacy", "snapshot"):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "tools.bench_message_snapshots",
+                "--mode",
+                mode,
+                "--chats",
+                str(args.chats),
+                "--messages",
+                str(args.messages),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['mode']:<10}{result['cached']:>8}{result['retained_kib']:>14}"
+            f"{result['peak_kib']:>10}{result['rss_delta_kib']:>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+"""
+Compare startup session export: one .session file per account vs. sessions.db.
+
+Creates N synthetic Pyrogram session files in a temporary directory, imports
+them into the shared session database, then times the startup path
+(``load_session_string_file`` for every account with no ``.session_string``
+cache yet) for both backends, plus a burst of storage opens as clients do on
+connect.
+
+    python -m tools.bench_session_db
+    python -m tools.bench_session_db --accounts 2000 --peers 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from pyrogram.storage.sqlite_storage import SCHEMA, SQLiteStorage
+
+from backend.utils.tg_session import load_session_string_file, session_string_file_path
+from tg_signer.session_storage import (
+    SHARED_DB_NAME,
+    close_shared_session_dbs,
+    get_shared_session_db,
+    make_file_storage,
+)
+
+
+def _create_session_file(path: Path, index: int, peers: int) -> None:
+    conn = sqlite3.connect(str(path))
+    try:
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO version VALUES (?)", (SQLiteStorage.VERSION,))
+            conn.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (2, 12345, 0, os.urandom(256), int(time.time()), 10_000 + index, 0),
+            )
+            conn.executemany(
+                "INSERT INTO peers (id, access_hash, type, phone_number) VALUES (?, ?, ?, ?)",
+                [(1_000_000 + p, p * 7, "user", None) for p in range(peers)],
+            )
+    finally:
+        conn.close()
+
+
+def _clear_string_cache(session_dir: Path, accounts: list[str]) -> None:
+    for account in accounts:
+        session_string_file_path(session_dir, account).unlink(missing_ok=True)
+
+
+def _time_export(session_dir: Path, accounts: list[str]) -> tuple[float, int]:
+    _clear_string_cache(session_dir, accounts)
+    start = time.perf_counter()
+    exported = sum(1 for account in accounts if load_session_string_file(session_dir, account))
+    return time.perf_counter() - start, exported
+
+
+async def _time_open(session_dir: Path, accounts: list[str]) -> float:
+    start = time.perf_counter()
+    storages = [make_file_storage(account, session_dir) for account in accounts]
+    for storage in storages:
+        await storage.open()
+        await storage.auth_key()
+    for storage in storages:
+        await storage.close()
+    return time.perf_counter() - start
+
+
+def _run_backend(backend: str, session_dir: Path, accounts: list[str]) -> None:
+    os.environ["TG_SESSION_BACKEND"] = backend
+    export_seconds, exported = _time_export(session_dir, accounts)
+    open_seconds = asyncio.run(_time_open(session_dir, accounts))
+    close_shared_session_dbs()
+    print(
+        f"{backend:<8}{exported:>10}{export_seconds:>12.3f}"
+        f"{export_seconds * 1000 / max(exported, 1):>12.3f}{open_seconds:>12.3f}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--peers", type=int, default=50, help="Cached peers per account")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-session-db-") as tmp:
+        session_dir = Path(tmp)
+        accounts = [f"acc{index:05d}" for index in range(args.accounts)]
+        for index, account in enumerate(accounts):
+            _create_session_file(session_dir / f"{account}.session", index, args.peers)
+
+        db = get_shared_session_db(session_dir / SHARED_DB_NAME)
+        start = time.perf_counter()
+        for account in accounts:
+            db.import_session_file(account, session_dir / f"{account}.session")
+        print(f"imported {len(accounts)} accounts in {time.perf_counter() - start:.2f}s\n")
+        close_shared_session_dbs()
+
+        print(f"{'backend':<8}{'exported':>10}{'export s':>12}{'ms/account':>12}{'open s':>12}")
+        for backend in ("file", "shared"):
+            _run_backend(backend, session_dir, accounts)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+"""
+Measure backend cold start: time to ``/readyz`` and to the first scheduled run.
+
+Creates a temporary data dir with N accounts (synthetic Pyrogram .session files
+and one daily sign task shared by all of them, plus a per-second task on the
+first account), starts ``uvicorn backend.main:app`` in a subprocess and polls
+``/readyz`` and the scheduler job state table until the first sign job fires.
+Times are measured from process spawn. Later ``--runs`` reuse the persisted job
+store, so a per-second tick missed while stopped goes through startup catch-up
+(``SCHEDULER_CATCHUP_SPREAD_SECONDS``) like any other missed sign job.
+
+    python -m tools.bench_startup
+    python -m tools.bench_startup --accounts 2000 --runs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+from tools.bench_session_db import _create_session_file
+
+_CHATS = [{"chat_id": 1, "name": "bench", "actions": [{"action": 1, "text": "hi"}]}]
+
+
+def _prepare_data_dir(data_dir: Path, accounts: list[str], peers: int) -> None:
+    # Settings 在首次导入时读取 APP_DATA_DIR，需在导入 backend 之前设置
+    os.environ["APP_DATA_DIR"] = str(data_dir)
+    from backend.core.config import get_settings
+    from backend.services.sign_tasks import get_sign_task_service
+
+    session_dir = get_settings().resolve_session_dir()
+    session_dir.mkdir(parents=True, exist_ok=True)
+    for index, account in enumerate(accounts):
+        _create_session_file(session_dir / f"{account}.session", index, peers)
+
+    service = get_sign_task_service()
+    service.create_task(
+        "daily", sign_at="0 8 * * *", chats=_CHATS, account_name=accounts[0], account_names=accounts
+    )
+    service.create_task("tick", sign_at="* * * * * *", chats=_CHATS, account_name=accounts[0])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _is_ready(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1) as resp:
+            return resp.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def _first_sign_fired(db_path: Path) -> bool:
+    if not db_path.exists():
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=1)
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM scheduler_job_state"
+                " WHERE job_id LIKE 'sign-%' AND last_fire_time IS NOT NULL LIMIT 1"
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return row is not None
+
+
+def _measure(data_dir: Path, timeout: float) -> tuple[Optional[float], Optional[float]]:
+    port = _free_port()
+    db_path = data_dir / "db.sqlite"
+    with sqlite3.connect(db_path) as conn:
+        # 清掉上一轮的触发记录
+        try:
+            conn.execute("DELETE FROM scheduler_job_state")
+        except sqlite3.Error:
+            pass
+    env = dict(os.environ, APP_DATA_DIR=str(data_dir))
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "backend.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    ready_at = fired_at = None
+    try:
+        while time.perf_counter() - start < timeout and (ready_at is None or fired_at is None):
+            if proc.poll() is not None:
+                break
+            now = time.perf_counter() - start
+            if ready_at is None and _is_ready(port):
+                ready_at = now
+            if fired_at is None and _first_sign_fired(db_path):
+                fired_at = now
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return ready_at, fired_at
+
+
+def _fmt(value: Optional[float]) -> str:
+    return f"{value:.3f}" if value is not None else "timeout"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--peers", type=int, default=50, help="Cached peers per account")
+    parser.add_argument("--runs", type=int, default=1, help="Restarts against the same data dir")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        data_dir = Path(tmp)
+        accounts = [f"acc{index:05d}" for index in range(args.accounts)]
+        start = time.perf_counter()
+        _prepare_data_dir(data_dir, accounts, args.peers)
+        print(f"prepared {len(accounts)} accounts in {time.perf_counter() - start:.2f}s\n")
+
+        print(f"{'run':<6}{'readyz s':>12}{'first run s':>14}")
+        for run in range(1, args.runs + 1):
+            ready_at, fired_at = _measure(data_dir, args.timeout)
+            print(f"{run:<6}{_fmt(ready_at):>12}{_fmt(fired_at):>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
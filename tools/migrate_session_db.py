@@ -0,0 +1,155 @@
+"""
+Import per-account Pyrogram .session files into the shared session database.
+
+After migrating, start the backend with ``TG_SESSION_BACKEND=shared`` so
+file-mode clients read and write ``sessions.db`` instead of one SQLite file
+per account. The import is a local SQL copy (no Telegram connection) and
+overwrites any rows the shared database already has for the account.
+
+    python -m tools.migrate_session_db
+    python -m tools.migrate_session_db --account alice --remove-files
+    python -m tools.migrate_session_db --compare
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+from backend.core.config import get_settings
+from backend.utils.tg_session import _pack_session_string, _read_session_file_row
+from tg_signer.session_storage import SHARED_DB_NAME, SharedSessionDatabase
+
+_SESSION_FILE_SUFFIXES = (".session", ".session-journal", ".session-wal", ".session-shm")
+
+
+def _remove_session_files(session_dir: Path, account_name: str) -> None:
+    for suffix in _SESSION_FILE_SUFFIXES:
+        path = session_dir / f"{account_name}{suffix}"
+        if path.exists():
+            path.unlink()
+
+
+def _file_session_string(session_file: Path) -> str | None:
+    row = _read_session_file_row(session_file)
+    return _pack_session_string(row) if row else None
+
+
+def _run_migration(
+    session_dir: Path, accounts: list[str], db: SharedSessionDatabase, remove_files: bool
+) -> int:
+    failures = 0
+    for account_name in accounts:
+        session_file = session_dir / f"{account_name}.session"
+        if not session_file.exists():
+            print(f"[SKIP] {account_name}: session file not found")
+            failures += 1
+            continue
+        try:
+            imported = db.import_session_file(account_name, session_file)
+        except Exception as exc:
+            print(f"[FAIL] {account_name}: {exc}")
+            failures += 1
+            continue
+        if not imported:
+            print(f"[FAIL] {account_name}: no session row")
+            failures += 1
+            continue
+
+        # 校验导入结果与原文件导出的 session_string 一致后才删除原文件
+        migrated = _pack_session_string(db.get_export_row(account_name))
+        if migrated != _file_session_string(session_file):
+            print(f"[FAIL] {account_name}: verification mismatch")
+            failures += 1
+            continue
+        if remove_files:
+            _remove_session_files(session_dir, account_name)
+        print(f"[OK] {account_name}: imported{' (files removed)' if remove_files else ''}")
+
+    return 1 if failures else 0
+
+
+def _compare_startup(session_dir: Path, accounts: list[str], db: SharedSessionDatabase) -> None:
+    """对比启动时逐个读取 .session 文件与从共享库读取的耗时"""
+    start = time.perf_counter()
+    file_exported = sum(
+        1
+        for account_name in accounts
+        if _file_session_string(session_dir / f"{account_name}.session")
+    )
+    file_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    shared_exported = 0
+    for account_name in db.list_accounts():
+        if _pack_session_string(db.get_export_row(account_name)):
+            shared_exported += 1
+    shared_seconds = time.perf_counter() - start
+
+    print(f"\n{'backend':<10}{'accounts':>10}{'seconds':>10}{'ms/account':>12}")
+    for label, count, seconds in (
+        ("file", file_exported, file_seconds),
+        ("shared", shared_exported, shared_seconds),
+    ):
+        per_account = seconds * 1000 / count if count else 0.0
+        print(f"{label:<10}{count:>10}{seconds:>10.3f}{per_account:>12.3f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Import Pyrogram .session files into the shared session database"
+    )
+    parser.add_argument(
+        "--session-dir",
+        dest="session_dir",
+        default=None,
+        help="Session directory (default: APP_DATA_DIR/sessions)",
+    )
+    parser.add_argument(
+        "--account",
+        dest="account",
+        default=None,
+        help="Only migrate a single account name",
+    )
+    parser.add_argument(
+        "--remove-files",
+        action="store_true",
+        help="Delete each .session file (and its -wal/-shm/-journal) after a verified import",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Time reading every account from .session files vs. the shared database",
+    )
+    args = parser.parse_args()
+
+    if args.session_dir:
+        session_dir = Path(args.session_dir)
+    else:
+        settings = get_settings()
+        session_dir = settings.resolve_session_dir()
+
+    session_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.account:
+        accounts = [args.account]
+    else:
+        accounts = sorted(p.stem for p in session_dir.glob("*.session"))
+
+    if not accounts:
+        print("No session files found.")
+        return 1
+
+    db = SharedSessionDatabase(session_dir / SHARED_DB_NAME)
+    try:
+        if args.compare:
+            _compare_startup(session_dir, accounts, db)
+            return 0
+        return _run_migration(session_dir, accounts, db, args.remove_files)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())